@@ -1,12 +1,27 @@
 from celery import Celery
 
+from app.celery_queues import configure_queues
 from config import Config
 
 
 def make_celery(app_name=__name__):
     backend = Config.CELERY_RESULT_BACKEND
     broker = Config.CELERY_BROKER_URL
-    return Celery(app_name, backend=backend, broker=broker)
+    celery = Celery(app_name, backend=backend, broker=broker)
+    configure_queues(celery, broker)
+    celery.conf.beat_schedule = {
+        "reconcile-upload-quotas": {
+            "task": "app.workers.quota_worker.reconcile_upload_quotas",
+            "schedule": Config.UPLOAD_QUOTA_RECONCILE_INTERVAL,
+        },
+        "relay-outbox": {
+            "task": "app.workers.outbox_worker.relay_outbox",
+            "schedule": Config.OUTBOX_RELAY_INTERVAL,
+            # runs missed while the workers were busy are dropped, not queued
+            "options": {"expires": Config.OUTBOX_RELAY_INTERVAL},
+        },
+    }
+    return celery
 
 
 celery = make_celery()
@@ -0,0 +1,126 @@
+from fnmatch import fnmatch
+
+from kombu import Exchange, Queue
+
+# Workers are started per queue (CELERY_WORKER_QUEUES) so long tasks never
+# hold the slots of quick ones. Each queue sets the concurrency and prefetch
+# multiplier of its workers and whether the task of a worker dying mid-task
+# (OOM kill, crash) is redelivered. All tasks ack late, so only tasks safe to
+# run twice redeliver; poison tasks killing their worker would loop otherwise.
+QUEUES = {
+    "default": {
+        "concurrency": 4,
+        "prefetch_multiplier": 1,
+        "reject_on_worker_lost": False,
+    },
+    # short SMTP round trips, prefetch hides the broker latency
+    "mail": {
+        "concurrency": 8,
+        "prefetch_multiplier": 4,
+        "reject_on_worker_lost": False,
+    },
+    # idempotent periodic tasks
+    "maintenance": {
+        "concurrency": 1,
+        "prefetch_multiplier": 1,
+        "reject_on_worker_lost": True,
+    },
+    # spreadsheets and other tasks taking minutes and a lot of memory
+    "bulk": {
+        "concurrency": 2,
+        "prefetch_multiplier": 1,
+        "reject_on_worker_lost": False,
+    },
+}
+DEFAULT_QUEUE = "default"
+
+# task name or pattern: queue and priority from 0 (lowest) to MAX_PRIORITY
+ROUTES = {
+    "app.workers.user_worker.user_email_worker": ("mail", 8),
+    "app.workers.user_worker.user_email_batch_worker": ("mail", 3),
+    "app.workers.outbox_worker.relay_outbox": ("maintenance", 9),
+    "app.workers.quota_worker.reconcile_upload_quotas": ("maintenance", 5),
+    "app.workers.spreadsheet_worker.*": ("bulk", 5),
+}
+MAX_PRIORITY = 9
+DEFAULT_PRIORITY = 5
+
+
+def configure_queues(celery, broker_url):
+    """Declare the queues, routes and delivery policies on `celery`."""
+    redis = broker_url.startswith(("redis://", "rediss://"))
+    celery.conf.update(
+        task_queues=[
+            Queue(name, Exchange(name), routing_key=name, max_priority=MAX_PRIORITY)
+            for name in QUEUES
+        ],
+        task_default_queue=DEFAULT_QUEUE,
+        task_default_priority=broker_priority(DEFAULT_PRIORITY, redis),
+        task_queue_max_priority=MAX_PRIORITY,
+        task_routes={
+            pattern: {"queue": queue, "priority": broker_priority(priority, redis)}
+            for pattern, (queue, priority) in ROUTES.items()
+        },
+        task_annotations=[QueuePolicies()],
+        task_acks_late=True,
+        # one prefetched task per process unless the worker's queues say more
+        worker_prefetch_multiplier=1,
+    )
+    if redis:
+        # redis keeps one list per priority step within every queue; the
+        # queues of a worker are still polled round robin, each queue has
+        # its own workers so none waits behind another
+        celery.conf.broker_transport_options = {
+            "priority_steps": list(range(MAX_PRIORITY + 1)),
+            "sep": ":",
+        }
+
+
+def broker_priority(priority, redis):
+    # redis serves the lowest priority number first, RabbitMQ the highest
+    return MAX_PRIORITY - priority if redis else priority
+
+
+def queue_of(task_name):
+    for pattern, (queue, _) in ROUTES.items():
+        if fnmatch(task_name, pattern):
+            return queue
+    return DEFAULT_QUEUE
+
+
+def worker_settings(queue_names):
+    """
+    Concurrency and prefetch multiplier of a worker consuming `queue_names`:
+    the concurrency of all of them and the smallest prefetch multiplier.
+    """
+    queues = [QUEUES[name] for name in queue_names]
+    return {
+        "worker_concurrency": sum(queue["concurrency"] for queue in queues),
+        "worker_prefetch_multiplier": min(
+            queue["prefetch_multiplier"] for queue in queues
+        ),
+    }
+
+
+def worker_arguments(queue_names):
+    """Command line options of a worker consuming `queue_names`."""
+    settings = worker_settings(queue_names)
+    concurrency = settings["worker_concurrency"]
+    return [
+        f"--concurrency={concurrency}",
+        f"--prefetch-multiplier={settings['worker_prefetch_multiplier']}",
+        # the pool is sized between one process and the queue's concurrency
+        f"--autoscale={concurrency},1",
+    ]
+
+
+class QueuePolicies(object):
+    """Task annotation applying the delivery policy of the task's queue."""
+
+    def annotate(self, task):
+        return {
+            "acks_late": True,
+            "reject_on_worker_lost": QUEUES[queue_of(task.name)][
+                "reject_on_worker_lost"
+            ],
+        }
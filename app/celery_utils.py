@@ -1,5 +1,13 @@
 def init_celery(celery, app):
-    celery.conf.update(app.config)
+    # broker and backend are set by make_celery, the old style CELERY_ names
+    # cannot be mixed with the lowercase settings of the queue topology
+    celery.conf.update(
+        {
+            key: value
+            for key, value in app.config.items()
+            if not key.startswith("CELERY_")
+        }
+    )
     TaskBase = celery.Task
 
     class ContextTask(TaskBase):
@@ -0,0 +1,85 @@
+from http import HTTPStatus
+
+from flask import request
+
+from app.api_routes import api_bp
+from app.support.auth_helper import api_token_required
+from app.support.memory_profiler import (
+    ACTIONS,
+    DEFAULT_FRAMES,
+    DEFAULT_LIMIT,
+    MAX_FRAMES,
+    memory_profiler,
+)
+from app.support.response_cache import response_cache
+from app.support.responses import json_response
+
+
+@api_bp.route("/admin/memory", methods=["GET"])
+@api_token_required("admin_resource")
+def getMemoryReportAPI(current_user):
+    try:
+        limit = memory_report_limit()
+        if not memory_profiler.is_tracing:
+            return json_response(
+                HTTPStatus.OK,
+                "success",
+                "memory profiler is not running",
+                memory=memory_profiler.status(),
+            )
+
+        return json_response(
+            HTTPStatus.OK,
+            "success",
+            "memory report generated",
+            memory=memory_profiler.report(limit),
+        )
+    except Exception as e:
+        return json_response(HTTPStatus.BAD_REQUEST, "failed", format(e))
+
+
+@api_bp.route("/admin/memory/<action>", methods=["POST"])
+@api_token_required("admin_resource")
+def postMemoryActionAPI(current_user, action):
+    if action not in ACTIONS:
+        return json_response(
+            HTTPStatus.NOT_FOUND,
+            "failed",
+            f"unknown memory profiler action '{action}'",
+        )
+
+    try:
+        limit = memory_report_limit()
+        frames = int(request.args.get("frames", DEFAULT_FRAMES))
+        if not 1 <= frames <= MAX_FRAMES:
+            raise ValueError(f"frames must be between 1 and {MAX_FRAMES}")
+    except ValueError as e:
+        return json_response(HTTPStatus.BAD_REQUEST, "failed", format(e))
+
+    try:
+        return json_response(
+            HTTPStatus.OK,
+            "success",
+            f"memory profiler {action} done",
+            memory=memory_profiler.dispatch(action, limit=limit, frames=frames),
+        )
+    except Exception as e:
+        return json_response(HTTPStatus.BAD_REQUEST, "failed", format(e))
+
+
+def memory_report_limit():
+    limit = int(request.args.get("limit", DEFAULT_LIMIT))
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return limit
+
+
+@api_bp.route("/admin/cache", methods=["GET"])
+@api_token_required("admin_resource")
+def getCacheStatsAPI(current_user):
+    return json_response(
+        HTTPStatus.OK,
+        "success",
+        "response cache stats fetched",
+        cache=response_cache.stats(),
+    )
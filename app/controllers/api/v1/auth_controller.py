@@ -1,44 +1,69 @@
+from datetime import datetime
 from http import HTTPStatus
 
-from flask import jsonify, make_response, request
+from flask import request
 
+from app import Config
 from app.api_routes import api_bp
 from app.models.user import User
-from app.support.auth_helper import encode_jwt_token
+from app.support.auth_helper import decode_jwt_token, encode_jwt_token, get_jwt_token
+from app.support.rate_limit import rate_limit
+from app.support.responses import envelope_response, json_response
+from app.support.revocation import revocation_list
 
 
 @api_bp.route("/token", methods=["POST"])
+@rate_limit(Config.RATE_LIMIT_TOKEN)
 def getTokenAPI():
     try:
         post_data = request.get_json()
 
         # Check if email is provided
         if not post_data or "email" not in post_data:
-            responseObject = {"status": "failed", "message": "email is required"}
-            return make_response(jsonify(responseObject)), HTTPStatus.BAD_REQUEST
+            return envelope_response(
+                HTTPStatus.BAD_REQUEST, "failed", "email is required"
+            )
 
         user = User.query.filter_by(email=post_data["email"]).first()
         if not user:
-            responseObject = {"status": "failed", "message": "user not found"}
-            return make_response(jsonify(responseObject)), HTTPStatus.NOT_FOUND
+            return envelope_response(HTTPStatus.NOT_FOUND, "failed", "user not found")
         else:
             try:
                 token = encode_jwt_token(user)
                 if token:
-                    responseObject = {"status": "success", "token": token}
-                    return make_response(jsonify(responseObject)), HTTPStatus.ACCEPTED
+                    return json_response(HTTPStatus.ACCEPTED, "success", token=token)
                 else:
-                    responseObject = {
-                        "status": "failed",
-                        "message": "token generation failed",
-                    }
-                    return (
-                        make_response(jsonify(responseObject)),
-                        HTTPStatus.BAD_REQUEST,
+                    return envelope_response(
+                        HTTPStatus.BAD_REQUEST, "failed", "token generation failed"
                     )
             except Exception as e:
-                responseObject = {"status": "failed", "message": format(e)}
-                return make_response(jsonify(responseObject)), HTTPStatus.BAD_REQUEST
+                return json_response(HTTPStatus.BAD_REQUEST, "failed", format(e))
     except Exception as e:
-        responseObject = {"status": "failed", "message": format(e)}
-        return make_response(jsonify(responseObject)), HTTPStatus.BAD_REQUEST
+        return json_response(HTTPStatus.BAD_REQUEST, "failed", format(e))
+
+
+@api_bp.route("/token/revoke", methods=["POST"])
+def revokeTokenAPI():
+    token = get_jwt_token(request)
+    if not token:
+        return envelope_response(HTTPStatus.UNAUTHORIZED, "failed", "token is missing")
+
+    try:
+        payload = decode_jwt_token(token)
+    except Exception as e:
+        return json_response(HTTPStatus.UNAUTHORIZED, "failed", format(e))
+
+    if "jti" not in payload:
+        return envelope_response(
+            HTTPStatus.BAD_REQUEST, "failed", "token can not be revoked"
+        )
+
+    try:
+        revocation_list.revoke(
+            payload["jti"],
+            datetime.utcfromtimestamp(payload["exp"]),
+            payload.get("userId"),
+        )
+        return envelope_response(HTTPStatus.OK, "success", "token revoked")
+    except Exception as e:
+        return json_response(HTTPStatus.BAD_REQUEST, "failed", format(e))
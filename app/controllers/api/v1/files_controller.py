@@ -1,32 +1,39 @@
 from http import HTTPStatus
 
-from flask import jsonify, make_response, request
+from flask import request
 from werkzeug.exceptions import RequestEntityTooLarge
 
+from app import Config
 from app.api_routes import api_bp
+from app.models.file import File
 from app.support.auth_helper import api_token_required
+from app.support.deadline import deadline
+from app.support.files_bundler import FilesBundler
 from app.support.files_uploader import FilesUploader
+from app.support.pagination import keyset_page
+from app.support.rate_limit import rate_limit
+from app.support.responses import envelope_response, json_response
 from app.support.s3_helper import generate_presigned_s3_url
+from app.support.upload_quota import upload_quota
 
 
 @api_bp.route("/files/upload-files", methods=["POST"])
 @api_token_required("user_resource")
+@rate_limit(Config.RATE_LIMIT_UPLOAD, key="user")
+@upload_quota.enforce
+@deadline(Config.UPLOAD_DEADLINE)
 def uploadAPI(current_user):
     try:
-        response = FilesUploader.perform(request, current_user)
+        response = FilesUploader(request, current_user).perform()
         return response
     except RequestEntityTooLarge:
-        responseObject = {
-            "status": "failed",
-            "message": "Please upload files less then 2000 Mib",
-        }
-        return (
-            make_response(jsonify(responseObject)),
+        return envelope_response(
             HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+            "failed",
+            "Please upload files less then 2000 Mib",
         )
     except Exception as e:
-        responseObject = {"status": "failed", "message": str(e)}
-        return make_response(jsonify(responseObject)), HTTPStatus.INTERNAL_SERVER_ERROR
+        return json_response(HTTPStatus.INTERNAL_SERVER_ERROR, "failed", str(e))
 
 
 @api_bp.route("/files/presigned_url", methods=["GET"])
@@ -37,5 +44,41 @@ def getPresignedUrl(current_user):
         file_name = request.args.get("file_name")
         return generate_presigned_s3_url(file_type, file_name)
     except Exception as e:
-        responseObject = {"status": "failed", "message": str(e)}
-        return make_response(jsonify(responseObject)), HTTPStatus.INTERNAL_SERVER_ERROR
+        return json_response(HTTPStatus.INTERNAL_SERVER_ERROR, "failed", str(e))
+
+
+@api_bp.route("/files", methods=["GET"])
+@api_token_required("user_resource")
+def getFilesAPI(current_user):
+    try:
+        page_size = min(
+            int(request.args.get("pageSize", Config.FILES_PAGE_SIZE)),
+            Config.FILES_MAX_PAGE_SIZE,
+        )
+        if page_size < 1:
+            raise ValueError("pageSize must be positive")
+        cursor = request.args.get("cursor")
+
+        # served from the files table, S3 is never listed
+        files, next_cursor = keyset_page(
+            File.query.filter_by(user_id=current_user["id"]), File, cursor, page_size
+        )
+        return json_response(
+            HTTPStatus.OK,
+            "success",
+            f"{len(files)} files fetched",
+            files=[f.serialize for f in files],
+            pagination={"per_page": page_size, "next_cursor": next_cursor},
+        )
+    except ValueError as e:
+        return json_response(HTTPStatus.BAD_REQUEST, "failed", str(e))
+
+
+@api_bp.route("/files/bundle", methods=["GET"])
+@api_token_required("user_resource")
+@deadline(Config.BUNDLE_DEADLINE)
+def getFilesBundleAPI(current_user):
+    try:
+        return FilesBundler(request, current_user).perform()
+    except Exception as e:
+        return json_response(HTTPStatus.INTERNAL_SERVER_ERROR, "failed", str(e))
@@ -1,15 +1,26 @@
 from http import HTTPStatus
 
-from flask import jsonify, make_response, request
+from flask import request
+from sqlalchemy import func
 from werkzeug.exceptions import NotFound
 
 from app.api_routes import api_bp
+from app.factory import db
+from app.models.role import Role
 from app.models.user import User
 from app.services.users.saver import UserSaver
 from app.support.auth_helper import api_token_required
+from app.support.etag import (
+    collection_etag,
+    is_not_modified,
+    not_modified_response,
+    user_etag,
+    with_etag,
+)
+from app.support.response_cache import response_cache
+from app.support.responses import envelope_response, json_response
 from app.validators.api.data_validator import DataValidator
 from app.validators.api.schema_validator import SchemaValidator
-from app.workers.user_worker import user_email_worker
 
 
 @api_bp.route("/users", methods=["POST"])
@@ -20,42 +31,38 @@ def postUserAPI(current_user):
     # validate request body schema
     schema_errors = SchemaValidator(post_data=post_data).validate_user_schema()
     if len(schema_errors) > 0:
-        responseObject = {"status": "failed", "message": ", ".join(schema_errors)}
-        return make_response(jsonify(responseObject)), HTTPStatus.BAD_REQUEST
+        return json_response(HTTPStatus.BAD_REQUEST, "failed", ", ".join(schema_errors))
 
     # validate request body data
     data_errors = DataValidator(post_data=post_data).validate_data()
     if len(data_errors) > 0:
-        responseObject = {"status": "errors", "message": ", ".join(data_errors)}
-
-        return make_response(jsonify(responseObject)), HTTPStatus.BAD_REQUEST
+        return json_response(HTTPStatus.BAD_REQUEST, "errors", ", ".join(data_errors))
 
     user_saver = UserSaver(post_data)
     user = user_saver.save()
     if user is not None:
-        async_result = user_email_worker.delay(user.id)
-        responseObject = {
-            "status": "success",
-            "message": "User created successfully, they will receive an email with their credentials",
-            "user": user.serialize,
-            "job_result": {
-                "job_id": async_result.task_id,
+        return json_response(
+            HTTPStatus.CREATED,
+            "success",
+            "User created successfully, they will receive an email with their credentials",
+            user=user.serialize,
+            job_result={
+                "job_id": user_saver.task_id,
             },
-        }
-
-        return make_response(jsonify(responseObject)), HTTPStatus.CREATED
+        )
 
     else:
-        responseObject = {
-            "status": "failed",
-            "message": "User creation failed",
-            "errors": user_saver.errors,
-        }
-        return make_response(jsonify(responseObject)), HTTPStatus.BAD_REQUEST
+        return json_response(
+            HTTPStatus.BAD_REQUEST,
+            "failed",
+            "User creation failed",
+            errors=user_saver.errors,
+        )
 
 
 @api_bp.route("/users", methods=["GET"])
 @api_token_required("user_resource")
+@response_cache.cached("users")
 def getAllUsersAPI(current_user):
     try:
         records = User.query.order_by(User.id.desc())
@@ -67,52 +74,73 @@ def getAllUsersAPI(current_user):
             # default per_page = 10
             page_size = int(request.args.get("pageSize", 10))
 
+            # answer polling clients before paginating and serializing
+            state = db.session.query(
+                func.count(User.id),
+                func.max(User.id),
+                func.sum(User.version),
+                # the pages show role names
+                db.session.query(func.max(Role.updated_at)).scalar_subquery(),
+            ).one()
+            etag = collection_etag("users", state, page_number, page_size)
+            if is_not_modified(etag):
+                return not_modified_response(etag)
+
             # query - default descending order
             users = records.paginate(page=page_number, per_page=page_size)
-            responseObject = {
-                "status": "success",
-                "message": f"{len(users.items)} users fetched",
-                "users": [u.serialize for u in users.items],
-                "pagination": {
-                    "total": users.total,
-                    "page": page_number,
-                    "per_page": page_size,
-                    "pages": users.pages,
-                },
-            }
-            return make_response(jsonify(responseObject)), HTTPStatus.ACCEPTED
+            return with_etag(
+                json_response(
+                    HTTPStatus.ACCEPTED,
+                    "success",
+                    f"{len(users.items)} users fetched",
+                    users=[u.serialize for u in users.items],
+                    pagination={
+                        "total": users.total,
+                        "page": page_number,
+                        "per_page": page_size,
+                        "pages": users.pages,
+                    },
+                ),
+                etag,
+            )
         else:
-            responseObject = {"status": "failed", "message": "user query failed"}
-            return make_response(jsonify(responseObject)), HTTPStatus.NO_CONTENT
+            return envelope_response(
+                HTTPStatus.NO_CONTENT, "failed", "user query failed"
+            )
     except NotFound:
-        responseObject = {
-            "status": "failed",
-            "message": "error fetching users",
-            "pagination": {
+        return json_response(
+            HTTPStatus.NOT_FOUND,
+            "failed",
+            "error fetching users",
+            pagination={
                 "page": page_number,
                 "per_page": page_size,
             },
-        }
-        return make_response(jsonify(responseObject)), HTTPStatus.NOT_FOUND
+        )
 
 
 @api_bp.route("/users/<id>", methods=["GET"])
 @api_token_required("user_resource")
+@response_cache.cached("users")
 def getUserAPI(current_user, id):
     try:
         user = User.query.filter_by(id=id).first()
         if user:
-            responseObject = {
-                "status": "success",
-                "message": "user record fetched",
-                "user": user.serialize,
-            }
-            return make_response(jsonify(responseObject)), HTTPStatus.OK
+            etag = user_etag(user)
+            if is_not_modified(etag):
+                return not_modified_response(etag)
+
+            return with_etag(
+                json_response(
+                    HTTPStatus.OK, "success", "user record fetched", user=user.serialize
+                ),
+                etag,
+            )
         else:
             raise (UnboundLocalError)
     except UnboundLocalError:
-        responseObject = {"status": "failed", "message": "User record not found"}
-        return make_response(jsonify(responseObject)), HTTPStatus.NOT_FOUND
+        return envelope_response(
+            HTTPStatus.NOT_FOUND, "failed", "User record not found"
+        )
     except Exception as e:
-        responseObject = {"status": "failed", "message": format(e)}
-        return make_response(jsonify(responseObject)), HTTPStatus.BAD_REQUEST
+        return json_response(HTTPStatus.BAD_REQUEST, "failed", format(e))
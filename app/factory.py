@@ -3,30 +3,39 @@ import os
 
 from flask import Flask
 from flask_mail import Mail
-from flask_migrate import Migrate
-from flask_seeder import FlaskSeeder
 from flask_sqlalchemy import SQLAlchemy
-from flask_swagger_ui import get_swaggerui_blueprint
-from healthcheck import HealthCheck
 
 from config import Config
 
 from .celery_utils import init_celery
+from .support.invalidation import invalidation_bus
 
 PKG_NAME = os.path.dirname(os.path.realpath(__file__)).split("/")[-1]
 
 db = SQLAlchemy()
-migrate = Migrate()
 mail = Mail()
 
 
 def create_app(app_name=PKG_NAME, config_override=None, **kwargs):
+    # web only dependencies, imported here to keep them out of the workers
+    from flask_migrate import Migrate
+    from flask_seeder import FlaskSeeder
+    from flask_swagger_ui import get_swaggerui_blueprint
+    from healthcheck import HealthCheck
+
+    from .support.compression import CompressionMiddleware
+    from .support.deadline import init_deadlines
+    from .support.json_provider import OrjsonProvider
+    from .support.load_shedding import LoadSheddingMiddleware
+    from .support.metrics import metrics_view
+
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s %(levelname)s %(name)s %(threadName)s : %(message)s",
     )
 
     app = Flask(app_name)
+    app.json = OrjsonProvider(app)
 
     # Apply base configuration
     app.config.from_object(Config)
@@ -40,8 +49,10 @@ def create_app(app_name=PKG_NAME, config_override=None, **kwargs):
 
     # register orm with app
     db.init_app(app)
-    migrate.init_app(app, db)
+    Migrate(app, db)
     mail.init_app(app)
+    invalidation_bus.init_app(app)
+    init_deadlines(app)
 
     # register seed
     seeder = FlaskSeeder()
@@ -68,10 +79,60 @@ def create_app(app_name=PKG_NAME, config_override=None, **kwargs):
     health = HealthCheck()
     app.add_url_rule("/healthcheck", "healthcheck", view_func=lambda: health.run())
 
+    # register prometheus metrics
+    app.add_url_rule("/metrics", "metrics", view_func=metrics_view)
+
+    # register response compression
+    if app.config.get("COMPRESSION_ENABLED"):
+        app.wsgi_app = CompressionMiddleware(
+            app.wsgi_app,
+            level=app.config["COMPRESSION_LEVEL"],
+            min_size=app.config["COMPRESSION_MIN_SIZE"],
+            brotli_quality=app.config["COMPRESSION_BROTLI_QUALITY"],
+        )
+
+    # register load shedding, outermost so shed requests cost no work
+    if app.config.get("LOAD_SHEDDING_ENABLED"):
+        app.wsgi_app = LoadSheddingMiddleware(
+            app.wsgi_app,
+            initial=app.config["LOAD_SHEDDING_INITIAL_LIMIT"],
+            min_limit=app.config["LOAD_SHEDDING_MIN_LIMIT"],
+            max_limit=app.config["LOAD_SHEDDING_MAX_LIMIT"],
+            tolerance=app.config["LOAD_SHEDDING_TOLERANCE"],
+            min_latency=app.config["LOAD_SHEDDING_MIN_LATENCY"],
+        )
+
+    register_models()
+
+    return app
+
+
+def create_worker_app(app_name=PKG_NAME, config_override=None):
+    """
+    App for celery workers: configuration, ORM and mail. Routes, Swagger UI,
+    health check, seeder, migrations and middleware are left out, and celery
+    sets up the logging of its processes.
+    """
+    app = Flask(app_name)
+    app.config.from_object(Config)
+    if config_override:
+        app.config.update(config_override)
+
+    db.init_app(app)
+    mail.init_app(app)
+    # commits made by tasks still evict the cached rows of the web workers
+    invalidation_bus.install_hooks()
+    register_models()
+
+    return app
+
+
+def register_models():
     # register models (to be picked by flask migrate command)
     from app.models.feature import Feature  # noqa: F401
     from app.models.feature_role import FeatureRole  # noqa: F401
+    from app.models.file import File  # noqa: F401
+    from app.models.outbox_message import OutboxMessage  # noqa: F401
+    from app.models.revoked_token import RevokedToken  # noqa: F401
     from app.models.role import Role  # noqa: F401
     from app.models.user import User  # noqa: F401
-
-    return app
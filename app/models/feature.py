@@ -9,7 +9,9 @@ class Feature(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), index=True, unique=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
     feature_roles = db.relationship("FeatureRole", backref="feature", lazy="dynamic")
 
     def __repr__(self):
@@ -20,6 +22,6 @@ class Feature(db.Model):
         return {
             "id": self.id,
             "name": self.name,
-            "created_at": self.created_at.strftime("%Y/%m/%d %H:%M:%S"),
-            "updated_at": self.updated_at.strftime("%Y/%m/%d %H:%M:%S"),
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
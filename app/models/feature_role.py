@@ -14,7 +14,9 @@ class FeatureRole(db.Model):
         db.Integer(), db.ForeignKey("roles.id", ondelete="CASCADE"), nullable=False
     )
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
 
     @property
     def serialize(self):
@@ -22,6 +24,6 @@ class FeatureRole(db.Model):
             "id": self.id,
             "feature": self.feature.name,
             "role": self.role.name,
-            "created_at": self.created_at.strftime("%Y/%m/%d %H:%M:%S"),
-            "updated_at": self.updated_at.strftime("%Y/%m/%d %H:%M:%S"),
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
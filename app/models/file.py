@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from app.factory import db
+
+
+class File(db.Model):
+    __tablename__ = "files"
+    # listing pages through a user's files newest first by (created_at, id)
+    __table_args__ = (
+        db.Index("ix_files_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(1024), nullable=False)
+    name = db.Column(db.String(255), nullable=False)
+    original_name = db.Column(db.String(255))
+    file_type = db.Column(db.String(50), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    content_type = db.Column(db.String(255))
+    # set when the object is stored compressed, size stays the original size
+    content_encoding = db.Column(db.String(20))
+    stored_size = db.Column(db.BigInteger)
+    # hex SHA-256 of the original content
+    digest = db.Column(db.String(64))
+    user_id = db.Column(
+        db.Integer(), db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    # the quota reconciliation sums the files of the current window
+    created_at = db.Column(
+        db.DateTime, index=True, nullable=False, default=datetime.utcnow
+    )
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    def __repr__(self):
+        return "<File {}>".format(self.key)
+
+    @property
+    def serialize(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "original_name": self.original_name,
+            "file_type": self.file_type,
+            "size": self.size,
+            "content_type": self.content_type,
+            "content_encoding": self.content_encoding,
+            "stored_size": self.stored_size,
+            "digest": self.digest,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
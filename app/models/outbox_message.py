@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from app.factory import db
+
+
+class OutboxMessage(db.Model):
+    """A celery task written in the transaction of the change it follows."""
+
+    __tablename__ = "outbox_messages"
+
+    id = db.Column(db.Integer, primary_key=True)
+    # assigned when enqueued so the caller can hand it out before publishing
+    task_id = db.Column(db.String(36), index=True, unique=True, nullable=False)
+    task_name = db.Column(db.String(255), nullable=False)
+    args = db.Column(db.JSON, nullable=False, default=list)
+    kwargs = db.Column(db.JSON, nullable=False, default=dict)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    published_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    # the relay pages through the pending (NULL) rows in id order, the purge
+    # deletes the old published ones
+    __table_args__ = (db.Index("ix_outbox_messages_published_at", "published_at"),)
+
+    def __repr__(self):
+        return "<OutboxMessage {} {}>".format(self.task_name, self.task_id)
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from app.factory import db
+
+
+class RevokedToken(db.Model):
+    __tablename__ = "revoked_tokens"
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), index=True, unique=True, nullable=False)
+    user_id = db.Column(
+        db.Integer(), db.ForeignKey("users.id", ondelete="CASCADE"), index=True
+    )
+    expires_at = db.Column(db.DateTime, index=True, nullable=False)
+    created_at = db.Column(db.DateTime, index=True, default=datetime.utcnow)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    def __repr__(self):
+        return "<RevokedToken {}>".format(self.jti)
@@ -8,8 +8,14 @@ class Role(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), index=True, unique=True, nullable=False)
+    # bumped whenever the role's features change, outdates permission claims
+    permissions_version = db.Column(
+        db.Integer, nullable=False, default=1, server_default="1"
+    )
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
     users = db.relationship("User", backref="role", lazy="dynamic")
     feature_roles = db.relationship("FeatureRole", backref="role", lazy="dynamic")
 
@@ -21,6 +27,6 @@ class Role(db.Model):
         return {
             "id": self.id,
             "name": self.name,
-            "created_at": self.created_at.strftime("%Y/%m/%d %H:%M:%S"),
-            "updated_at": self.updated_at.strftime("%Y/%m/%d %H:%M:%S"),
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
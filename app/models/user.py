@@ -1,6 +1,7 @@
 from datetime import datetime
 
 from flask_login import UserMixin
+from sqlalchemy import text
 
 from app.factory import db
 
@@ -14,7 +15,17 @@ class User(UserMixin, db.Model):
     role_id = db.Column(db.Integer, db.ForeignKey("roles.id"), index=True)
     active = db.Column(db.Boolean(), index=True, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+    # bumped by every update, updated_at only has whole seconds on MySQL
+    version = db.Column(
+        db.Integer,
+        nullable=False,
+        default=1,
+        server_default="1",
+        onupdate=text("version + 1"),
+    )
 
     def __repr__(self):
         return "<User {}>".format(self.name)
@@ -27,6 +38,6 @@ class User(UserMixin, db.Model):
             "email": self.email,
             "role": self.role.name if self.role is not None else None,
             "active": self.active,
-            "created_at": self.created_at.strftime("%Y/%m/%d %H:%M:%S"),
-            "updated_at": self.updated_at.strftime("%Y/%m/%d %H:%M:%S"),
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
@@ -1,12 +1,15 @@
 from app.factory import db
 from app.models.role import Role
 from app.models.user import User
+from app.support.outbox import outbox
+from app.workers.user_worker import user_email_worker
 
 
 class UserSaver:
     def __init__(self, user_data):
         self.user_data = user_data
         self.errors = []
+        self.task_id = None
 
     def save(self):
         try:
@@ -17,6 +20,9 @@ class UserSaver:
             )
             user.role = self.get_role(self.user_data["role"])
             db.session.add(user)
+            db.session.flush()
+            # published by the outbox relay once the user is committed
+            self.task_id = outbox.enqueue(user_email_worker, user.id)
             db.session.commit()
             db.session.refresh(user)
             return user
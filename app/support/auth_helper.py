@@ -1,17 +1,37 @@
 import datetime
 import time
+import uuid
 from datetime import timezone
 from functools import wraps
 from http import HTTPStatus
 
 import jwt
-from flask import jsonify, make_response, render_template, request, session
+from flask import current_app, render_template, request, session
 
 from app import Config
 from app.models.feature import Feature
 from app.models.feature_role import FeatureRole
 from app.models.role import Role
 from app.models.user import User
+from app.support.invalidation import invalidation_bus
+from app.support.local_cache import LocalCache
+from app.support.permission_claims import (
+    authorize_from_claims,
+    build_permission_claims,
+    stateless_auth_enabled,
+)
+from app.support.responses import envelope_response, json_response
+from app.support.revocation import revocation_list
+from app.support.single_flight import SingleFlight
+
+# coalesces identical user and permission lookups of concurrent requests
+lookups = SingleFlight()
+
+# in-process caches, evicted through the invalidation bus on commit
+principals = LocalCache("principals", maxsize=4096, ttl=Config.LOCAL_CACHE_TTL)
+permissions = LocalCache("permissions", maxsize=1024, ttl=Config.LOCAL_CACHE_TTL)
+invalidation_bus.register("users", principals)
+invalidation_bus.register(["roles", "features", "feature_roles"], permissions, True)
 
 
 # decorator for verifying the JWT for UI routes
@@ -22,18 +42,16 @@ def web_token_required(allowed_feature):
         def decorated(*args, **kwargs):
             current_user = None
             error_msg = None
-            token = None
+            now = int(time.time())
 
             # using session variables
-            if session and session.get("token"):
-                token = session.get("token")
-            else:
-                token = get_jwt_token(request)
+            token = get_session_token(now) or get_jwt_token(request)
 
             if token:
                 try:
                     # Getting user info from JWT token
-                    current_user = get_user_info(token)
+                    payload = decode_jwt_token(token)
+                    current_user = load_user_info(payload)
                     if current_user:
                         valid_access = validate_user_permission(
                             allowed_feature, current_user["role"]
@@ -41,14 +59,16 @@ def web_token_required(allowed_feature):
                         if not valid_access:
                             error_msg = "User does not have sufficient permission to view this page. Please contact your administrator!"
                         else:
-                            session["token"] = encode_jwt_token(current_user)
-                            session["expire_at"] = int(time.time()) + int(
-                                Config.SESSION_TIME
-                            )
+                            slide_session(token, current_user, payload, now)
 
                     else:
                         error_msg = "User is inactive or does not exit. Please contact your administrator!"
 
+                except jwt.ExpiredSignatureError:
+                    session.clear()
+                    error_msg = (
+                        "Session timeout. Please visit application to connect to tool!"
+                    )
                 except Exception:
                     error_msg = (
                         "Something went wrong. Please contact your administrator!"
@@ -72,6 +92,33 @@ def web_token_required(allowed_feature):
     return decorator
 
 
+def get_session_token(now):
+    if not session or not session.get("token"):
+        return None
+    # expired sessions are dropped before any lookup
+    if session.get("expire_at", 0) <= now:
+        session.clear()
+        return None
+    return session["token"]
+
+
+# sliding sessions are only re-issued once they are about to run out, a
+# refresh costs a token signature and a Set-Cookie on the response
+def slide_session(token, current_user, payload, now):
+    threshold = current_app.config["SESSION_REFRESH_THRESHOLD"]
+    # short lived (stateless) tokens are renewed in their second half only
+    token_threshold = min(threshold, (payload["exp"] - payload.get("iat", 0)) // 2)
+    token_expiring = payload["exp"] - now < token_threshold
+    session_expiring = session.get("expire_at", 0) - now < threshold
+    if session.get("token") == token and not token_expiring and not session_expiring:
+        return
+
+    if token_expiring:
+        token = encode_jwt_token(User.query.get(current_user["id"]))
+    session["token"] = token
+    session["expire_at"] = now + int(current_app.config["SESSION_TIME"])
+
+
 # decorator for verifying the JWT for API endpoints
 def api_token_required(allowed_feature):
     def decorator(view_func):
@@ -80,38 +127,28 @@ def api_token_required(allowed_feature):
             token = get_jwt_token(request)
 
             if not token:
-                responseObject = {"status": "failed", "message": "token is missing"}
-                return make_response(jsonify(responseObject)), HTTPStatus.UNAUTHORIZED
+                return envelope_response(
+                    HTTPStatus.UNAUTHORIZED, "failed", "token is missing"
+                )
 
             try:
-                # Getting user info from JWT token
-                current_user = get_user_info(token)
+                current_user, valid_access = authorize(token, allowed_feature)
                 if not current_user:
-                    responseObject = {
-                        "status": "failed",
-                        "message": "User is inactive or does not exit. Please contact your administrator!",
-                    }
-                    return (
-                        make_response(jsonify(responseObject)),
+                    return envelope_response(
                         HTTPStatus.UNAUTHORIZED,
+                        "failed",
+                        "User is inactive or does not exit. Please contact your administrator!",
                     )
 
-                valid_access = validate_user_permission(
-                    allowed_feature, current_user["role"]
-                )
                 if not valid_access:
-                    responseObject = {
-                        "status": "failed",
-                        "message": "User does not have sufficient permission to make this request. Please contact your administrator!",
-                    }
-                    return (
-                        make_response(jsonify(responseObject)),
+                    return envelope_response(
                         HTTPStatus.UNAUTHORIZED,
+                        "failed",
+                        "User does not have sufficient permission to make this request. Please contact your administrator!",
                     )
 
             except Exception as e:
-                responseObject = {"status": "failed", "message": format(e)}
-                return make_response(jsonify(responseObject)), HTTPStatus.UNAUTHORIZED
+                return json_response(HTTPStatus.UNAUTHORIZED, "failed", format(e))
 
             # returns the current logged in users contex to the routes
             return view_func(current_user, *args, **kwargs)
@@ -121,8 +158,33 @@ def api_token_required(allowed_feature):
     return decorator
 
 
+# resolves the user of a token and whether it may use the feature
+def authorize(token, allowed_feature):
+    if stateless_auth_enabled():
+        claims = authorize_from_claims(decode_jwt_token(token), allowed_feature)
+        if claims is not None:
+            # authorized from the token alone, no database lookup
+            return claims
+
+    current_user = get_user_info(token)
+    if not current_user:
+        return None, False
+    return current_user, validate_user_permission(allowed_feature, current_user["role"])
+
+
 # validate user permission with roles
 def validate_user_permission(feature_name, role_name):
+    return permissions.get_or_load(
+        (feature_name, role_name),
+        lambda: lookups.do(
+            ("permission", feature_name, role_name),
+            lambda: find_user_permission(feature_name, role_name),
+            current_app.config["SINGLE_FLIGHT_TIMEOUT"],
+        ),
+    )
+
+
+def find_user_permission(feature_name, role_name):
     feature = Feature.query.filter_by(name=feature_name).first()
     role = Role.query.filter_by(name=role_name).first()
 
@@ -134,8 +196,28 @@ def validate_user_permission(feature_name, role_name):
 
 
 def get_user_info(token):
-    payload = decode_jwt_token(token)
-    user = User.query.filter_by(email=payload["userEmail"], active=True).first()
+    return load_user_info(decode_jwt_token(token))
+
+
+def load_user_info(payload):
+    email = payload["userEmail"]
+    user_info = principals.get_or_load(
+        payload["userId"],
+        lambda: lookups.do(
+            ("user", email),
+            lambda: find_user_info(email),
+            current_app.config["SINGLE_FLIGHT_TIMEOUT"],
+        ),
+    )
+    if user_info is not None and user_info["email"] != email:
+        # the email changed since the token was issued
+        return None
+    # every caller gets its own copy of the shared result
+    return dict(user_info) if user_info is not None else None
+
+
+def find_user_info(email):
+    user = User.query.filter_by(email=email, active=True).first()
     return user.serialize if user is not None else None
 
 
@@ -159,11 +241,18 @@ def encode_jwt_token(user):
             "exp": datetime.datetime.now(timezone.utc)
             + datetime.timedelta(days=30, hours=0, minutes=0, seconds=0),
             "iat": datetime.datetime.now(timezone.utc),
+            "jti": uuid.uuid4().hex,
             "userEmail": user.email,
             "userId": user.id,
             "userName": user.name,
             "userRole": user.role.name,
         }
+        if stateless_auth_enabled():
+            # short lived, the claims go stale when the role's features change
+            payload["exp"] = payload["iat"] + datetime.timedelta(
+                minutes=current_app.config["JWT_STATELESS_TTL"]
+            )
+            payload.update(build_permission_claims(user.role))
         return jwt.encode(payload, Config.SECRET_KEY, algorithm="HS256")
     except Exception as e:
         raise (e)
@@ -172,6 +261,8 @@ def encode_jwt_token(user):
 def decode_jwt_token(token):
     try:
         payload = jwt.decode(token, Config.SECRET_KEY, algorithms=["HS256"])
+        if revocation_list.is_revoked(payload.get("jti")):
+            raise jwt.InvalidTokenError("Token has been revoked")
         return payload
     except jwt.ExpiredSignatureError as e:
         raise (e)
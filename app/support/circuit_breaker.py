@@ -0,0 +1,135 @@
+import logging
+import random
+import threading
+import time
+
+from app.support import deadline
+from app.support.metrics import CIRCUIT_STATE, RETRIES
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """The dependency is failing, the call was rejected without trying it."""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} is unavailable, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker(object):
+    """
+    Stops calling a failing dependency until it had time to recover.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls fail immediately with CircuitOpenError. Once `recovery_timeout`
+    seconds passed it turns half open and lets `half_open_calls` probes
+    through: a successful probe closes it again, a failed one reopens it.
+    Only exceptions `is_failure` accepts count, a missing key says nothing
+    about the health of S3.
+    """
+
+    def __init__(
+        self,
+        name,
+        failure_threshold=5,
+        recovery_timeout=30,
+        half_open_calls=1,
+        is_failure=None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_calls = half_open_calls
+        self.is_failure = is_failure or (lambda error: True)
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def call(self, fn, *args, **kwargs):
+        self.acquire()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    def acquire(self):
+        with self._lock:
+            if self.state == OPEN:
+                waited = time.monotonic() - self._opened_at
+                if waited < self.recovery_timeout:
+                    raise CircuitOpenError(self.name, self.recovery_timeout - waited)
+                self.transition(HALF_OPEN)
+                self._probes = 0
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_calls:
+                    raise CircuitOpenError(self.name, self.recovery_timeout)
+                self._probes += 1
+
+    def retry_after(self):
+        """Seconds until an open circuit lets a probe through, else 0."""
+        with self._lock:
+            if self.state != OPEN:
+                return 0
+            waited = time.monotonic() - self._opened_at
+            return max(self.recovery_timeout - waited, 0)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                logging.info(f"circuit {self.name} closed")
+                self.transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logging.warning(
+                        f"circuit {self.name} opened after {self.failures} failures"
+                    )
+                self.transition(OPEN)
+                self._opened_at = time.monotonic()
+
+    def transition(self, state):
+        self.state = state
+        CIRCUIT_STATE.labels(circuit=self.name).set(STATE_VALUES[state])
+
+    def reset(self):
+        with self._lock:
+            self.failures = 0
+            self.transition(CLOSED)
+
+
+def retry(fn, should_retry, attempts=3, base_delay=0.1, max_delay=2.0, name="call"):
+    """
+    Call `fn` up to `attempts` times while it raises errors `should_retry`
+    accepts, sleeping a random time up to base_delay * 2^attempt (full
+    jitter) in between. No retry is started past the request deadline.
+    """
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt + 1 >= attempts or not should_retry(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2**attempt))
+            left = deadline.remaining()
+            if left is not None and left <= delay:
+                raise
+            RETRIES.labels(operation=name).inc()
+            logging.warning(f"{name} failed ({e}), retrying in {delay:.2f}s")
+            time.sleep(delay)
@@ -0,0 +1,162 @@
+import itertools
+import zlib
+
+from werkzeug.http import parse_accept_header
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+# content types that are already compressed, recompressing them only burns CPU
+SKIP_CONTENT_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "font/woff",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/x-bzip2",
+    "application/x-7z-compressed",
+    "application/x-rar-compressed",
+    "application/pdf",
+    "application/octet-stream",
+    "application/vnd.openxmlformats-officedocument",
+)
+
+
+class CompressionMiddleware(object):
+    """
+    WSGI middleware compressing response bodies with gzip, or brotli when
+    the module is installed and the client prefers it.
+
+    Bodies with a known Content-Length below `min_size` are sent as is.
+    Responses without a Content-Length are treated as streams and every
+    chunk is compressed and flushed as it is produced, nothing is buffered.
+    """
+
+    def __init__(self, wsgi_app, level=6, min_size=500, brotli_quality=4):
+        self.wsgi_app = wsgi_app
+        self.level = level
+        self.min_size = min_size
+        self.brotli_quality = brotli_quality
+        self.encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+    def __call__(self, environ, start_response):
+        encoding = self.negotiate(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None or environ.get("REQUEST_METHOD") == "HEAD":
+            return self.wsgi_app(environ, start_response)
+
+        state = {"started": False, "compress": False, "streamed": False}
+
+        def compressing_start_response(status, headers, exc_info=None):
+            state["started"] = True
+            if self.should_compress(status, headers):
+                state["compress"] = True
+                state["streamed"] = True
+                vary = None
+                kept = []
+                for key, value in headers:
+                    name = key.lower()
+                    if name == "content-length":
+                        state["streamed"] = False
+                    elif name == "vary":
+                        vary = value
+                    else:
+                        kept.append((key, value))
+                kept.append(("Content-Encoding", encoding))
+                kept.append(("Vary", self.vary(vary)))
+                headers = kept
+            return start_response(status, headers, exc_info)
+
+        app_iter = self.wsgi_app(environ, compressing_start_response)
+        if not state["started"]:
+            # generator apps only call start_response on the first iteration
+            return self.deferred(app_iter, encoding, state)
+        if not state["compress"]:
+            return app_iter
+
+        return self.compress(app_iter, encoding, state["streamed"])
+
+    def deferred(self, app_iter, encoding, state):
+        iterator = iter(app_iter)
+        first = next(iterator, None)
+        chunks = itertools.chain([] if first is None else [first], iterator)
+        if not state["compress"]:
+            try:
+                yield from chunks
+            finally:
+                if hasattr(app_iter, "close"):
+                    app_iter.close()
+            return
+
+        yield from self.compress(
+            ClosingIterator(chunks, getattr(app_iter, "close", None)),
+            encoding,
+            state["streamed"],
+        )
+
+    def negotiate(self, accept_encoding):
+        if not accept_encoding:
+            return None
+        return parse_accept_header(accept_encoding).best_match(self.encodings)
+
+    def should_compress(self, status, headers):
+        status_code = int(status.split(" ", 1)[0])
+        if status_code < 200 or status_code in (204, 304):
+            return False
+
+        values = {key.lower(): value for key, value in headers}
+        if "content-encoding" in values:
+            return False
+        if "no-transform" in values.get("cache-control", ""):
+            return False
+
+        content_type = values.get("content-type", "").lower()
+        if not content_type or content_type.startswith(SKIP_CONTENT_TYPES):
+            return False
+
+        content_length = values.get("content-length")
+        if content_length is not None and int(content_length) < self.min_size:
+            return False
+
+        return True
+
+    def vary(self, existing):
+        if not existing:
+            return "Accept-Encoding"
+        if "accept-encoding" in existing.lower():
+            return existing
+        return f"{existing}, Accept-Encoding"
+
+    def compress(self, app_iter, encoding, streamed):
+        compress, flush, finish = self.compressor(encoding)
+        try:
+            for chunk in app_iter:
+                data = compress(chunk)
+                if streamed:
+                    # push the bytes out so clients see progress on long streams
+                    data += flush()
+                if data:
+                    yield data
+            data = finish()
+            if data:
+                yield data
+        finally:
+            if hasattr(app_iter, "close"):
+                app_iter.close()
+
+    def compressor(self, encoding):
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            return compressor.process, compressor.flush, compressor.finish
+
+        # wbits 31 writes the gzip header and trailer
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return (
+            compressor.compress,
+            lambda: compressor.flush(zlib.Z_SYNC_FLUSH),
+            compressor.flush,
+        )
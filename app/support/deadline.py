@@ -0,0 +1,129 @@
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http import HTTPStatus
+
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.support.responses import envelope_response
+
+SELECT = re.compile(r"^\s*SELECT\s", re.IGNORECASE)
+
+# monotonic time the current request has to be answered by
+_deadline = ContextVar("request_deadline", default=None)
+_hooks_installed = False
+
+
+class DeadlineExceeded(Exception):
+    """The request ran past its deadline, its remaining work is cancelled."""
+
+
+def deadline(seconds):
+    """Per route default deadline in seconds, overriding REQUEST_DEADLINE."""
+
+    def decorator(view_func):
+        view_func.deadline_seconds = seconds
+        return view_func
+
+    return decorator
+
+
+def init_deadlines(app):
+    app.before_request(start_deadline)
+    app.after_request(expire_failed_response)
+    app.teardown_request(clear_deadline)
+    app.register_error_handler(DeadlineExceeded, lambda e: timeout_response())
+    install_hooks()
+
+
+def install_hooks():
+    global _hooks_installed
+    if not _hooks_installed:
+        event.listen(
+            Engine, "before_cursor_execute", apply_statement_timeout, retval=True
+        )
+        _hooks_installed = True
+
+
+def start_deadline():
+    view = current_app.view_functions.get(request.endpoint)
+    seconds = getattr(view, "deadline_seconds", None)
+    if seconds is None:
+        seconds = current_app.config["REQUEST_DEADLINE"]
+
+    # clients may only shorten the deadline of a route
+    header = request.headers.get(current_app.config["REQUEST_DEADLINE_HEADER"])
+    if header:
+        try:
+            seconds = min(seconds, float(header)) if seconds else float(header)
+        except ValueError:
+            pass
+
+    if seconds and seconds > 0:
+        _deadline.set(time.monotonic() + seconds)
+
+
+def clear_deadline(error=None):
+    _deadline.set(None)
+
+
+def expire_failed_response(response):
+    # controllers turn most exceptions into error envelopes, report the
+    # failures caused by the deadline as what they are
+    if response.status_code >= 400 and expired():
+        return current_app.make_response(timeout_response())
+    return response
+
+
+def timeout_response():
+    return envelope_response(
+        HTTPStatus.GATEWAY_TIMEOUT, "failed", "Request deadline exceeded"
+    )
+
+
+def current():
+    return _deadline.get()
+
+
+def remaining():
+    """Seconds left until the deadline, None without one."""
+    value = _deadline.get()
+    return None if value is None else value - time.monotonic()
+
+
+def expired():
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check(operation="request"):
+    if expired():
+        raise DeadlineExceeded(f"deadline exceeded before {operation}")
+
+
+@contextmanager
+def scoped(value):
+    """Run under the deadline `value` (from `current()`), e.g. in pool threads."""
+    token = _deadline.set(value)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def apply_statement_timeout(conn, cursor, statement, parameters, context, executemany):
+    left = remaining()
+    if left is None:
+        return statement, parameters
+    if left <= 0:
+        raise DeadlineExceeded("deadline exceeded before the query")
+
+    # MySQL aborts SELECTs running past the hint, other statements are bounded
+    # by the server lock wait timeout
+    if conn.dialect.name == "mysql" and SELECT.match(statement):
+        hint = f"/*+ MAX_EXECUTION_TIME({max(int(left * 1000), 1)}) */"
+        statement = SELECT.sub(f"SELECT {hint} ", statement, count=1)
+    return statement, parameters
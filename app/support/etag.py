@@ -0,0 +1,37 @@
+import hashlib
+
+from flask import current_app, request
+
+
+def user_etag(user):
+    # the serialized fields include the role name, which changes with the role
+    return compute_etag("user", user.version, *user.serialize.values())
+
+
+def collection_etag(name, state, *params):
+    # `state` aggregates the rows so that it changes on every insert, update
+    # and delete, e.g. their count, max id and sum of versions
+    return compute_etag(name, *state, *params)
+
+
+def compute_etag(*parts):
+    fingerprint = ":".join(
+        part.isoformat() if hasattr(part, "isoformat") else str(part) for part in parts
+    )
+    return hashlib.blake2b(fingerprint.encode(), digest_size=12).hexdigest()
+
+
+def is_not_modified(etag):
+    return request.if_none_match.contains_weak(etag)
+
+
+def not_modified_response(etag):
+    response = current_app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    return response
+
+
+def with_etag(result, etag):
+    response, status = result
+    response.set_etag(etag, weak=True)
+    return response, status
@@ -0,0 +1,117 @@
+import logging
+import math
+from http import HTTPStatus
+
+from flask import Response, stream_with_context
+
+from app.models.file import File
+from app.support.circuit_breaker import CircuitOpenError
+from app.support.responses import json_response
+from app.support.s3 import S3_BUCKET, S3_ERRORS, S3_Client
+from app.support.stored_encoding import gunzip_chunks
+from app.support.zip_stream import zip_stream
+from config import Config
+
+
+class FilesBundler(object):
+    """Streams files of the user as one ZIP archive, built while it is sent."""
+
+    def __init__(self, request, current_user):
+        self.request = request
+        self.current_user = current_user
+        self.file_type = request.args.get("file_type", "user_file")
+        self.names = self.get_names()
+        self.s3_client = None
+
+    def perform(self):
+        if len(self.names) == 0:
+            return json_response(
+                HTTPStatus.UNPROCESSABLE_ENTITY,
+                "failed",
+                "Please select files to download",
+            )
+        if len(self.names) > Config.BUNDLE_MAX_FILES:
+            return json_response(
+                HTTPStatus.UNPROCESSABLE_ENTITY,
+                "failed",
+                f"Please select at most {Config.BUNDLE_MAX_FILES} files",
+            )
+
+        # the recorded uploads of the user hold the keys, other users' files
+        # are missing as far as this user is concerned
+        files = self.find_files()
+        missing = [name for name in self.names if name not in files]
+        if missing:
+            return json_response(
+                HTTPStatus.NOT_FOUND,
+                "failed",
+                "Some files were not found",
+                missing_files=missing,
+            )
+        files = [files[name] for name in self.names]
+
+        # open the first object before the first byte is sent, errors can
+        # not be reported once the archive is streaming
+        self.s3_client = S3_Client()
+        try:
+            first = self.get_object(files[0])
+        except CircuitOpenError as e:
+            response, status = json_response(
+                HTTPStatus.SERVICE_UNAVAILABLE, "failed", "File storage unavailable"
+            )
+            response.headers["Retry-After"] = str(math.ceil(e.retry_after))
+            return response, status
+        except S3_ERRORS as e:
+            logging.error(e)
+            return json_response(
+                HTTPStatus.BAD_GATEWAY, "failed", "File storage unavailable"
+            )
+
+        logging.info(f"bundling {len(files)} files for {self.current_user['name']}")
+        archive = zip_stream(self.entries(files, first), Config.BUNDLE_COMPRESS_LEVEL)
+        return Response(
+            stream_with_context(archive),
+            mimetype="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="files.zip"'},
+        )
+
+    def get_names(self):
+        # ?names=a.txt,b.txt and repeated ?names= are both accepted
+        names = []
+        for value in self.request.args.getlist("names"):
+            for name in value.split(","):
+                name = name.strip()
+                if name and name not in names:
+                    names.append(name)
+        return names
+
+    def find_files(self):
+        files = File.query.filter(
+            File.user_id == self.current_user["id"],
+            File.file_type == self.file_type,
+            File.name.in_(self.names),
+        )
+        return {file.name: file for file in files}
+
+    def get_object(self, file):
+        return self.s3_client.call(
+            "get",
+            lambda: self.s3_client.s3_client.get_object(Bucket=S3_BUCKET, Key=file.key),
+        )
+
+    def entries(self, files, first):
+        for index, file in enumerate(files):
+            try:
+                response = first if index == 0 else self.get_object(file)
+            except S3_ERRORS as e:
+                # the archive is already partly sent, abort the transfer
+                raise IOError(f"could not read {file.key} from S3: {e}")
+            body = response["Body"]
+            chunks = body.iter_chunks(Config.BUNDLE_CHUNK_SIZE)
+            if file.content_encoding == "gzip":
+                # stored compressed, the archive holds the original bytes
+                chunks = gunzip_chunks(chunks, Config.BUNDLE_CHUNK_SIZE)
+            try:
+                yield file.name, file.size, chunks
+            finally:
+                body.close()
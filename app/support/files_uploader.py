@@ -1,22 +1,44 @@
+import hashlib
 import logging
+import math
+import os
 import time
 from http import HTTPStatus
 from multiprocessing.pool import ThreadPool
 
-from flask import jsonify, make_response
 from werkzeug.datastructures import MultiDict
 
-from app.support.s3_helper import put_object_to_s3
+from app.factory import db
+from app.models.file import File
+from app.support import deadline
+from app.support.metrics import UPLOAD_QUOTA_DECISIONS
+from app.support.multipart_stream import stream_parts
+from app.support.responses import json_response
+from app.support.s3 import S3_ERRORS, breakers
+from app.support.s3_helper import (
+    delete_object_from_s3,
+    put_object_to_s3,
+    stream_object_to_s3,
+)
+from app.support.upload_quota import QuotaExceeded, upload_quota
 from app.validators.api.schema_validator import SchemaValidator
+from config import Config
 
 
 class FilesUploader(object):
-
-    @classmethod
-    def perform(self, request, current_user):
+    def __init__(self, request, current_user):
+        # one uploader per request, requests are served by concurrent threads
+        self.request = request
         self.current_user = current_user
         self.file_hash = {}
         self.file_count = 0
+        self.failed_files = []
+        self.uploaded_files = []
+
+    def perform(self):
+        request, current_user = self.request, self.current_user
+        if self.can_stream(request):
+            return self.perform_streaming()
 
         self.file_hash, file_list = self.get_filelist(request)
 
@@ -25,48 +47,247 @@ class FilesUploader(object):
             post_data=self.file_hash
         ).validate_upload_schema()
         if len(schema_errors) > 0:
-            responseObject = {"status": "failed", "message": ", ".join(schema_errors)}
-            return (
-                make_response(jsonify(responseObject)),
-                HTTPStatus.UNPROCESSABLE_ENTITY,
+            return json_response(
+                HTTPStatus.UNPROCESSABLE_ENTITY, "failed", ", ".join(schema_errors)
+            )
+
+        # the spooled sizes are known, nothing is uploaded over quota
+        try:
+            upload_quota.check(
+                current_user["id"],
+                sum(self.file_size(file) for file in file_list),
+                len(file_list),
             )
+        except QuotaExceeded as e:
+            UPLOAD_QUOTA_DECISIONS.labels(result="rejected").inc()
+            return upload_quota.exceeded_response(e)
 
         start_time = time.time()
         logging.info("uploading files ")
 
-        pool = ThreadPool(processes=len(file_list) * 2)
-        pool.map(self.upload, file_list)
+        # pool threads do not inherit the request deadline
+        request_deadline = deadline.current()
+
+        def upload(file):
+            with deadline.scoped(request_deadline):
+                self.upload(file)
+
+        with ThreadPool(processes=len(file_list) * 2) as pool:
+            pool.map(upload, file_list)
 
         end_time = time.time()
         logging.info(
             f"Time taken for uploading files by {current_user['name']} is: {(end_time - start_time)} s"
         )
 
-        responseObject = {
-            "status": "success",
-            "message": f"{self.file_count} file{'s'[:self.file_count ^ 1]} uploaded successfully",
-            "file_names": self.file_hash,
-        }
+        upload_quota.add(
+            current_user["id"],
+            sum(file.size for file in self.uploaded_files),
+            len(self.uploaded_files),
+        )
+        return self.finish()
 
-        return make_response(jsonify(responseObject)), HTTPStatus.CREATED
+    def can_stream(self, request):
+        # the body can only be streamed while werkzeug has not parsed it into
+        # request.files yet
+        return (
+            Config.UPLOAD_STREAMING
+            and request.mimetype == "multipart/form-data"
+            and "files" not in request.__dict__
+        )
 
-    @classmethod
-    def upload(self, file):
-        response = put_object_to_s3(
-            "user_file", file.filename, file, self.current_user["name"]
+    def perform_streaming(self):
+        """
+        Pipe every file part of the body to S3 as it arrives, instead of
+        spooling the whole request to temporary files first. Parts arrive
+        one after the other, so they are uploaded sequentially.
+        """
+        request, current_user = self.request, self.current_user
+        start_time = time.time()
+        names, renamed, invalid = {}, [], False
+
+        try:
+            for part in stream_parts(request):
+                if part.filename is None:
+                    continue
+                seen = any(part.filename in value for value in names.values())
+                names.setdefault(part.name, []).append(part.filename)
+                # an empty name fails the schema validation below, the parts
+                # after it are only read to report every field
+                invalid = invalid or not part.filename
+                # duplicate names are uploaded once
+                if not invalid and not seen:
+                    renamed += self.upload_part(part)
+        except ValueError as e:
+            return json_response(HTTPStatus.BAD_REQUEST, "failed", str(e))
+        except QuotaExceeded as e:
+            # the files completed before the quota ran out are kept
+            self.save_records()
+            UPLOAD_QUOTA_DECISIONS.labels(result="cut_off").inc()
+            return upload_quota.exceeded_response(e)
+
+        logging.info(
+            f"Time taken for streaming files by {current_user['name']} is: {(time.time() - start_time)} s"
         )
-        if response is not None:
-            self.file_count += 1
+
+        self.file_hash = self.convert_files_hash(names)
+        for old_name, new_name in renamed:
+            self.replace_file_name(old_name, new_name)
+
+        schema_errors = SchemaValidator(
+            post_data=self.file_hash
+        ).validate_upload_schema()
+        if len(schema_errors) > 0:
+            self.discard_uploads()
+            return json_response(
+                HTTPStatus.UNPROCESSABLE_ENTITY, "failed", ", ".join(schema_errors)
+            )
+
+        return self.finish()
+
+    def finish(self):
+        self.save_records()
+
+        if self.failed_files:
+            return self.failure_response()
+
+        return json_response(
+            HTTPStatus.CREATED,
+            "success",
+            f"{self.file_count} file{'s'[:self.file_count ^ 1]} uploaded successfully",
+            file_names=self.file_hash,
+        )
+
+    def upload(self, file):
+        size = self.file_size(file)
+        digest = self.file_digest(file)
+        try:
+            response = put_object_to_s3(
+                "user_file", file.filename, file, self.current_user["name"]
+            )
+        except S3_ERRORS as e:
+            logging.error(f"could not upload {file.filename}: {e}")
+            response = None
+        if self.record_upload(file.filename, response, size, file.mimetype, digest):
             self.replace_file_name(file.filename, response["filename"])
 
-    @classmethod
+    def upload_part(self, part):
+        try:
+            response = stream_object_to_s3(
+                "user_file",
+                part.filename,
+                upload_quota.meter(self.current_user["id"], part.chunks()),
+                self.current_user["name"],
+                part.content_type,
+            )
+        except S3_ERRORS as e:
+            logging.error(f"could not upload {part.filename}: {e}")
+            response = None
+        if self.record_upload(
+            part.filename,
+            response,
+            part.size,
+            part.content_type,
+            part.sha256.hexdigest(),
+        ):
+            return [(part.filename, response["filename"])]
+        return []
+
+    def record_upload(self, original_name, response, size, content_type, digest):
+        if response is None:
+            self.failed_files.append(original_name)
+            return False
+
+        self.file_count += 1
+        self.uploaded_files.append(
+            File(
+                key=response.get("key"),
+                name=response["filename"],
+                original_name=original_name,
+                file_type="user_file",
+                size=size,
+                content_type=content_type or None,
+                content_encoding=response.get("content_encoding"),
+                stored_size=response.get("stored_size", size),
+                digest=digest,
+                user_id=self.current_user["id"],
+            )
+        )
+        return True
+
+    def file_size(self, file):
+        # multipart parts rarely carry a Content-Length, measure the spooled
+        # stream instead
+        stream = file.stream
+        position = stream.tell()
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell() - position
+        stream.seek(position)
+        return size
+
+    def file_digest(self, file):
+        # the S3 ETag is no content hash for multipart or compressed objects
+        stream = file.stream
+        position = stream.tell()
+        sha256 = hashlib.sha256()
+        for chunk in iter(lambda: stream.read(Config.UPLOAD_READ_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+        stream.seek(position)
+        return sha256.hexdigest()
+
+    def save_records(self):
+        # rows are added from the request thread, sessions are not thread safe
+        if not self.uploaded_files:
+            return
+        try:
+            db.session.add_all(self.uploaded_files)
+            db.session.commit()
+        except Exception as e:
+            # the files are on S3 already, failing the upload would orphan them
+            db.session.rollback()
+            logging.error(f"could not record uploaded files: {e}")
+
+    def discard_uploads(self):
+        """Delete the files stored before the request was rejected."""
+        for file in self.uploaded_files:
+            try:
+                delete_object_from_s3(file.key)
+            except Exception as e:
+                logging.error(f"could not delete the rejected upload {file.key}: {e}")
+        # the metered bytes of the rejected files do not count against the quota
+        upload_quota.add(
+            self.current_user["id"],
+            -sum(file.size for file in self.uploaded_files),
+            -len(self.uploaded_files),
+        )
+        self.uploaded_files = []
+
+    def failure_response(self):
+        failed_count = len(self.failed_files)
+        response, status = json_response(
+            HTTPStatus.BAD_GATEWAY,
+            "failed",
+            f"{failed_count} file{'s'[:failed_count ^ 1]} could not be uploaded",
+            file_names=self.file_hash,
+            failed_files=self.failed_files,
+        )
+        # while S3 is unavailable tell clients when it is worth trying again
+        retry_after = breakers["put"].retry_after()
+        if retry_after:
+            response.headers["Retry-After"] = str(math.ceil(retry_after))
+        return response, status
+
     def get_filelist(self, request):
         files_hash = MultiDict(request.files).to_dict(flat=False)
         unique_file_list = self.get_unique_files(files_hash)
-        nested_files_hash = self.convert_files_hash(files_hash)
+        nested_files_hash = self.convert_files_hash(
+            {
+                key: [file.filename for file in value]
+                for key, value in files_hash.items()
+            }
+        )
         return nested_files_hash, unique_file_list
 
-    @classmethod
     def get_unique_files(self, files_hash):
         unique_files = []
         for key, value in files_hash.items():
@@ -78,7 +299,6 @@ class FilesUploader(object):
                 ]
         return unique_files
 
-    @classmethod
     def convert_files_hash(self, files_hash):
         nested_files_hash = {}
         for key, value in files_hash.items():
@@ -87,14 +307,11 @@ class FilesUploader(object):
                 nested_subkey = nested_subkey[:-1]  # remove closing bracket
                 if nested_key not in nested_files_hash:
                     nested_files_hash[nested_key] = {}
-                nested_files_hash[nested_key][nested_subkey] = [
-                    file.filename for file in value
-                ]
+                nested_files_hash[nested_key][nested_subkey] = list(value)
             else:
-                nested_files_hash[key] = [file.filename for file in value]
+                nested_files_hash[key] = list(value)
         return nested_files_hash
 
-    @classmethod
     def replace_file_name(self, old_file_name, new_file_name):
         for key, value in self.file_hash.items():
             if isinstance(value, list):
@@ -0,0 +1,196 @@
+import json
+import logging
+import os
+import random
+import threading
+import uuid
+
+import redis
+from flask import has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.support.redis_client import get_redis
+
+CHANNEL = "invalidation"
+MAX_BACKOFF = 30
+
+
+class InvalidationBus(object):
+    """
+    Keeps in-process caches coherent across gunicorn workers, celery
+    workers and pods.
+
+    Committed changes to the tracked tables are published over redis
+    pub/sub as `{"o": origin, "m": {table: [ids]}}`. Every process runs a
+    listener thread evicting the affected entries from its registered
+    caches. Caches are flushed entirely whenever messages may have been
+    missed (listener reconnects) or cannot be understood.
+
+    Shared caches, which are invalidated once for all processes, subscribe
+    with `on_commit` and are only notified in the committing process.
+    """
+
+    def __init__(self, tables=("users", "roles", "features", "feature_roles")):
+        self.tables = set(tables)
+        self.origin = None
+        self.connected = False
+        self._registry = {}
+        self._commit_callbacks = []
+        self._pid = None
+        self._thread = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._hooks_installed = False
+
+    def init_app(self, app):
+        self.install_hooks()
+        if app.config.get("INVALIDATION_BUS_ENABLED") and app.config.get("REDIS_URL"):
+            url = app.config["REDIS_URL"]
+            # gunicorn/celery fork after create_app, start in the serving process
+            app.before_request(lambda: self.ensure_listener(url))
+
+    def register(self, tables, cache, flush=False):
+        """Evict primary keys of `tables` from `cache`, or clear it if `flush`."""
+        if isinstance(tables, str):
+            tables = [tables]
+        for table in tables:
+            self._registry.setdefault(table, []).append((cache, flush))
+
+    def on_commit(self, tables, callback):
+        """Call `callback(changes)` after commits changing any of `tables`."""
+        if isinstance(tables, str):
+            tables = [tables]
+        self._commit_callbacks.append((set(tables), callback))
+
+    def install_hooks(self):
+        if self._hooks_installed:
+            return
+        event.listen(Session, "after_flush", self.collect)
+        event.listen(Session, "after_commit", self.after_commit)
+        event.listen(Session, "after_soft_rollback", self.after_rollback)
+        self._hooks_installed = True
+
+    def collect(self, session, flush_context):
+        changes = session.info.setdefault("invalidations", {})
+        for instance in (*session.new, *session.dirty, *session.deleted):
+            table = getattr(instance, "__tablename__", None)
+            if table in self.tables:
+                changes.setdefault(table, set()).add(instance.id)
+
+    def after_commit(self, session):
+        changes = session.info.pop("invalidations", None)
+        if changes:
+            changes = {table: sorted(ids) for table, ids in changes.items()}
+            self.publish(changes)
+            self.notify(changes)
+
+    def after_rollback(self, session, previous_transaction):
+        session.info.pop("invalidations", None)
+
+    def publish(self, changes):
+        # this process does not wait for its own message
+        self.apply(changes)
+
+        client = get_redis() if has_app_context() else None
+        if client is None:
+            return
+        message = json.dumps({"o": self.origin_id(), "m": changes})
+        try:
+            client.publish(CHANNEL, message)
+        except Exception as e:
+            logging.error(f"invalidation publish failed: {e}")
+
+    def notify(self, changes):
+        for tables, callback in self._commit_callbacks:
+            if tables.intersection(changes):
+                try:
+                    callback(changes)
+                except Exception as e:
+                    # the commit is done, a failing cache must not undo it
+                    logging.error(f"commit callback failed: {e}")
+
+    def apply(self, changes):
+        for table, ids in changes.items():
+            for cache, flush in self._registry.get(table, []):
+                if flush or ids is None:
+                    cache.clear()
+                else:
+                    cache.evict(ids)
+
+    def flush_all(self):
+        for registrations in self._registry.values():
+            for cache, _ in registrations:
+                cache.clear()
+
+    def handle(self, data):
+        try:
+            message = json.loads(data)
+            if message["o"] == self.origin_id():
+                return
+            self.apply(message["m"])
+        except Exception as e:
+            logging.error(f"invalid invalidation message, flushing caches: {e}")
+            self.flush_all()
+
+    def origin_id(self):
+        # forked workers must not share the origin of their parent
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self.origin = f"{self._pid}-{uuid.uuid4().hex}"
+        return self.origin
+
+    def ensure_listener(self, url, client_factory=None):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            factory = client_factory or (lambda: redis.Redis.from_url(url))
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self.listen, args=(factory,), name="invalidation", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def listen(self, client_factory):
+        backoff = 0.5
+        subscribed_before = False
+        while not self._stopped.is_set():
+            pubsub = None
+            try:
+                pubsub = client_factory().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                self.connected = True
+                if subscribed_before:
+                    # messages published while we were away are lost
+                    self.flush_all()
+                subscribed_before = True
+                backoff = 0.5
+
+                while not self._stopped.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None and message["type"] == "message":
+                        self.handle(message["data"])
+            except Exception as e:
+                self.connected = False
+                logging.error(f"invalidation listener disconnected: {e}")
+                self.flush_all()
+                self._stopped.wait(backoff + random.uniform(0, backoff))
+                backoff = min(backoff * 2, MAX_BACKOFF)
+            finally:
+                self.connected = False
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+
+invalidation_bus = InvalidationBus()
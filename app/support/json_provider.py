@@ -0,0 +1,84 @@
+import datetime
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+    if orjson is not None
+    else 0
+)
+
+
+def _default(obj):
+    # keep datetimes identical to orjson output when falling back to stdlib json
+    if isinstance(obj, datetime.datetime):
+        if obj.tzinfo is None:
+            obj = obj.replace(tzinfo=datetime.timezone.utc)
+        return obj.isoformat().replace("+00:00", "Z")
+    if isinstance(obj, datetime.date):
+        return obj.isoformat()
+    return DefaultJSONProvider.default(obj)
+
+
+def dumps_bytes(obj):
+    """Serialize `obj` to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+    return json.dumps(
+        obj, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+def loads_bytes(data):
+    """Deserialize UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+
+    Datetimes are encoded natively as RFC 3339 strings, naive values are
+    treated as UTC (the models store `datetime.utcnow`). Falls back to the
+    stdlib encoder when orjson is not installed or when json.dumps specific
+    keyword arguments are passed.
+    """
+
+    default = staticmethod(_default)
+    ensure_ascii = False
+    sort_keys = False
+    compact = True
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        options = self._options()
+        if self.compact is False or (self.compact is None and self._app.debug):
+            options |= orjson.OPT_INDENT_2
+        body = orjson.dumps(obj, default=_default, option=options)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+    def _options(self):
+        if self.sort_keys:
+            return ORJSON_OPTIONS | orjson.OPT_SORT_KEYS
+        return ORJSON_OPTIONS
@@ -0,0 +1,63 @@
+import datetime
+import hashlib
+import os
+
+from config import Config
+
+FLAT = "flat"
+HASHED = "hashed"
+HASHED_DATE = "hashed_date"
+LAYOUTS = (HASHED_DATE, HASHED, FLAT)
+
+
+def build_key(folder, file_name, layout=None):
+    """
+    S3 key of `file_name` under `folder` in the given (or configured) layout.
+
+    flat:        folder/name_user_1700000000.ext
+    hashed:      folder/3f2a/name_user_1700000000.ext
+    hashed_date: folder/3f2a/2023/11/14/name_user_1700000000.ext
+
+    S3 partitions request rates by key prefix, the hash spreads bulk uploads
+    over 16^n prefixes instead of one. Everything is derived from the file
+    name, so the key can be rebuilt from the name clients know.
+    """
+    layout = layout or Config.AWS_S3_KEY_LAYOUT
+    if layout == FLAT:
+        return f"{folder}/{file_name}"
+
+    prefix = f"{folder}/{name_hash(file_name)}"
+    upload_date = date_of(file_name) if layout == HASHED_DATE else None
+    if upload_date is not None:
+        prefix = f"{prefix}/{upload_date:%Y/%m/%d}"
+    return f"{prefix}/{file_name}"
+
+
+def candidate_keys(folder, file_name):
+    """Keys `file_name` may be stored at, the configured layout first."""
+    layouts = [Config.AWS_S3_KEY_LAYOUT] + [
+        layout for layout in LAYOUTS if layout != Config.AWS_S3_KEY_LAYOUT
+    ]
+    keys = []
+    for layout in layouts:
+        key = build_key(folder, file_name, layout)
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+
+def name_hash(file_name):
+    digest = hashlib.md5(file_name.encode("utf-8"), usedforsecurity=False)
+    return digest.hexdigest()[: Config.AWS_S3_KEY_PREFIX_LENGTH]
+
+
+def date_of(file_name):
+    # unique file names end with the upload timestamp, see get_unique_file_name
+    stem = os.path.splitext(file_name)[0]
+    timestamp = stem.rsplit("_", 1)[-1]
+    if not timestamp.isdigit():
+        return None
+    try:
+        return datetime.datetime.fromtimestamp(int(timestamp), datetime.timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        return None
@@ -0,0 +1,252 @@
+import math
+import re
+import threading
+import time
+
+from app.support.json_provider import dumps_bytes
+from app.support.metrics import CONCURRENCY_LIMIT, IN_FLIGHT_REQUESTS, SHED_REQUESTS
+
+BUSY_BODY = dumps_bytes(
+    {"status": "failed", "message": "Server is busy. Please try again later."}
+)
+
+
+class RouteClass(object):
+    """
+    Requests matching `methods` and the path `pattern`.
+
+    `share` is the part of the process wide limit the class may use, lower
+    priority classes are shed first once the process is saturated. Classes
+    without a share are never limited.
+
+    The latency of `client_paced` classes includes reading the request body
+    and grows with its size, it only adapts their own limit.
+    """
+
+    __slots__ = ("name", "methods", "pattern", "share", "client_paced")
+
+    def __init__(self, name, pattern, methods=None, share=1.0, client_paced=False):
+        self.name = name
+        self.methods = frozenset(methods) if methods else None
+        self.pattern = re.compile(pattern)
+        self.share = share
+        self.client_paced = client_paced
+
+    def matches(self, method, path):
+        if self.methods is not None and method not in self.methods:
+            return False
+        return self.pattern.match(path) is not None
+
+
+# first match wins
+ROUTE_CLASSES = [
+    RouteClass(
+        "exempt", r"^/(healthcheck|metrics|api/admin|api/docs|static)", share=None
+    ),
+    RouteClass(
+        "upload",
+        r"^/api/files/upload-files",
+        methods=["POST"],
+        share=0.5,
+        client_paced=True,
+    ),
+    RouteClass("read", r"^/api/", methods=["GET", "HEAD"], share=1.0),
+    RouteClass("write", r"^/api/", share=0.8),
+    RouteClass("other", r"", share=0.8),
+]
+
+
+class AdaptiveLimit(object):
+    """
+    Concurrency limit adjusted with AIMD from observed latencies.
+
+    The no-load latency is tracked as the minimum of each window of
+    samples. A sample slower than `tolerance` times that baseline (and
+    slower than `min_latency`, below which latency is noise) shrinks the
+    limit by `backoff`, at most once per baseline latency. Fast samples
+    grow it by 1/limit while at least half of it is in use, so the limit
+    only grows when it is what holds requests back.
+
+    Limits shared by requests of different costs are given the baseline of
+    each sample's own kind on release instead of tracking one themselves.
+    """
+
+    def __init__(
+        self,
+        initial=32,
+        min_limit=2,
+        max_limit=256,
+        tolerance=2.0,
+        min_latency=0.05,
+        backoff=0.9,
+        window=100,
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.min_latency = min_latency
+        self.backoff = backoff
+        self.window = window
+        self.in_flight = 0
+        self.baseline = None
+        self._window_min = math.inf
+        self._samples = 0
+        self._decreased_at = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, share=1.0):
+        with self._lock:
+            if self.in_flight >= max(self.limit * share, 1):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency=None, now=None, baseline=None):
+        with self._lock:
+            self.in_flight -= 1
+            if latency is not None:
+                now = time.monotonic() if now is None else now
+                self.update(latency, now, baseline)
+
+    def update(self, latency, now, baseline=None):
+        if baseline is None:
+            self.track_baseline(latency)
+            baseline = self.baseline
+        if latency > max(baseline * self.tolerance, self.min_latency):
+            if now - self._decreased_at >= baseline:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._decreased_at = now
+        elif self.in_flight + 1 >= self.limit / 2:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def track_baseline(self, latency):
+        self._window_min = min(self._window_min, latency)
+        self._samples += 1
+        if self.baseline is None or self._window_min < self.baseline:
+            self.baseline = self._window_min
+        if self._samples >= self.window:
+            # let the baseline follow the service when it gets slower for good
+            self.baseline = 0.9 * self.baseline + 0.1 * self._window_min
+            self._window_min = math.inf
+            self._samples = 0
+
+
+class ReleasingIterator(object):
+    """
+    Response body calling `release` once it is exhausted or closed,
+    whichever comes first.
+    """
+
+    def __init__(self, app_iter, release):
+        self._app_iter = app_iter
+        self._iterator = iter(app_iter)
+        self._release = release
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            self._release()
+            raise
+
+    def close(self):
+        try:
+            if hasattr(self._app_iter, "close"):
+                self._app_iter.close()
+        finally:
+            self._release()
+
+
+class LoadSheddingMiddleware(object):
+    """
+    WSGI middleware failing fast with 503 once a route class or the whole
+    process runs at its adaptive concurrency limit, instead of queueing
+    requests in the worker until clients time out.
+
+    Every route class has its own limit, and all classes share a process
+    wide limit of which low priority classes (uploads) may only use a part,
+    so under overload they are shed before cheap reads are. The process wide
+    limit judges every sample against the baseline of its class, a slow
+    class running at its usual latency does not shrink it.
+    """
+
+    def __init__(self, wsgi_app, route_classes=None, **limit_options):
+        self.wsgi_app = wsgi_app
+        self.route_classes = route_classes or ROUTE_CLASSES
+        self.total = AdaptiveLimit(**limit_options)
+        self.limits = {
+            route_class.name: AdaptiveLimit(**limit_options)
+            for route_class in self.route_classes
+            if route_class.share is not None
+        }
+
+    def __call__(self, environ, start_response):
+        route_class = self.classify(environ)
+        if route_class is None or route_class.share is None:
+            return self.wsgi_app(environ, start_response)
+
+        limit = self.limits[route_class.name]
+        if not limit.acquire():
+            return self.shed(route_class, start_response)
+        if not self.total.acquire(route_class.share):
+            limit.release()
+            return self.shed(route_class, start_response)
+
+        started = time.monotonic()
+        state = {"latency": None, "released": False}
+
+        def timed_start_response(status, headers, exc_info=None):
+            # time to first byte, streaming to slow clients is not load
+            if not status.startswith("5"):
+                state["latency"] = time.monotonic() - started
+            return start_response(status, headers, exc_info)
+
+        def release():
+            if state["released"]:
+                return
+            state["released"] = True
+            self.release(route_class, limit, state["latency"])
+
+        IN_FLIGHT_REQUESTS.labels(route_class=route_class.name).inc()
+        try:
+            app_iter = self.wsgi_app(environ, timed_start_response)
+        except Exception:
+            release()
+            raise
+        return ReleasingIterator(app_iter, release)
+
+    def release(self, route_class, limit, latency):
+        limit.release(latency)
+        if route_class.client_paced:
+            latency = None
+        self.total.release(latency, baseline=limit.baseline)
+        self.observe(route_class.name, limit)
+
+    def classify(self, environ):
+        method = environ.get("REQUEST_METHOD", "GET")
+        path = environ.get("PATH_INFO", "")
+        for route_class in self.route_classes:
+            if route_class.matches(method, path):
+                return route_class
+        return None
+
+    def observe(self, name, limit):
+        IN_FLIGHT_REQUESTS.labels(route_class=name).dec()
+        CONCURRENCY_LIMIT.labels(route_class=name).set(limit.limit)
+        CONCURRENCY_LIMIT.labels(route_class="total").set(self.total.limit)
+
+    def shed(self, route_class, start_response):
+        SHED_REQUESTS.labels(route_class=route_class.name).inc()
+        start_response(
+            "503 SERVICE UNAVAILABLE",
+            [
+                ("Content-Type", "application/json"),
+                ("Content-Length", str(len(BUSY_BODY))),
+                ("Retry-After", "1"),
+            ],
+        )
+        return [BUSY_BODY]
@@ -0,0 +1,57 @@
+import threading
+
+from cachetools import TTLCache
+
+_MISSING = object()
+
+
+class LocalCache(object):
+    """
+    Thread safe in-process TTL cache.
+
+    Entries are evicted by the invalidation bus when the underlying rows
+    change, the TTL only bounds staleness while the bus is disconnected.
+    """
+
+    def __init__(self, name, maxsize=1024, ttl=60):
+        self.name = name
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._cache.get(key, default)
+
+    def set(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+
+    def get_or_load(self, key, loader):
+        with self._lock:
+            value = self._cache.get(key, _MISSING)
+            generation = self._generation
+        if value is not _MISSING:
+            return value
+
+        value = loader()
+        with self._lock:
+            # skip values loaded before an eviction landed, they may be stale
+            if generation == self._generation:
+                self._cache[key] = value
+        return value
+
+    def evict(self, keys):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._cache.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._cache)
@@ -1,12 +1,69 @@
+import logging
+import smtplib
+
 from flask_mail import Message
+from jinja2 import Template
 
 from app.factory import mail
 
+# compiled once per process instead of per message
+WELCOME_BODY = Template("Hi {{ name }},\n\nWelcome to our application!")
+
+# the server or the network dropped the connection, the message may be resent
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
 
 class Mailer:
+    @staticmethod
+    def welcome_message(user):
+        return Message(
+            "Welcome!",
+            recipients=[user.email],
+            body=WELCOME_BODY.render(name=user.name),
+        )
+
     @staticmethod
     def send_welcome_email(user):
-        msg = Message("Welcome!", recipients=[user.email])
-        msg.body = f"Hi {user.name},\n\nWelcome to our application!"
-        mail.send(msg)
+        mail.send(Mailer.welcome_message(user))
         print(f"Sent welcome email to {user.email}")
+
+    @staticmethod
+    def send_welcome_emails(users):
+        """
+        Send the welcome email to every user over one SMTP connection.
+
+        A dropped or failed connection is reopened and the message resent
+        once, other errors only fail their own message. Returns the ids sent
+        and the failures as {"id", "error"} dicts.
+        """
+        sent, failed = [], []
+        index, reconnecting = 0, False
+        while index < len(users):
+            try:
+                with mail.connect() as connection:
+                    while index < len(users):
+                        user = users[index]
+                        try:
+                            connection.send(Mailer.welcome_message(user))
+                        except CONNECTION_ERRORS:
+                            raise
+                        except Exception as e:
+                            logging.error(f"welcome email to {user.email} failed: {e}")
+                            failed.append({"id": user.id, "error": format(e)})
+                        else:
+                            sent.append(user.id)
+                        index += 1
+                        reconnecting = False
+            except Exception as e:
+                # the message errors are handled above, this is the connection
+                if reconnecting:
+                    # reconnecting failed too, the server is gone for now
+                    logging.error(f"mail server unavailable: {e}")
+                    failed.extend(
+                        {"id": u.id, "error": format(e)} for u in users[index:]
+                    )
+                    break
+                logging.warning(f"mail connection lost, reconnecting: {e}")
+                reconnecting = True
+        logging.info(f"sent {len(sent)} welcome emails, {len(failed)} failed")
+        return {"sent": sent, "failed": failed}
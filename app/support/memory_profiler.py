@@ -0,0 +1,156 @@
+import logging
+import os
+import threading
+import tracemalloc
+
+# root of the application package, allocations are grouped by modules under it
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+DEFAULT_FRAMES = 25
+DEFAULT_LIMIT = 10
+# tracemalloc keeps at most this many frames per traceback
+MAX_FRAMES = 65535
+ACTIONS = ("start", "stop", "snapshot", "reset", "report")
+
+
+class MemoryProfiler(object):
+    """
+    Runtime switchable tracemalloc wrapper.
+
+    Allocations are attributed to the innermost frame that lives under
+    `root`, so memory allocated by pandas/boto on behalf of `app/` code is
+    reported against the `app` module that triggered it.
+    """
+
+    def __init__(self, root=APP_ROOT):
+        self.root = root
+        self.package = os.path.basename(root)
+        self._baseline = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=DEFAULT_FRAMES):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+                logging.info(f"tracemalloc started with {frames} frames")
+            return self.status()
+
+    def stop(self):
+        with self._lock:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+                logging.info("tracemalloc stopped")
+            self._baseline = None
+            return self.status()
+
+    def snapshot(self):
+        # store a baseline, later reports are diffed against it
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise RuntimeError("tracemalloc is not running")
+            self._baseline = self._take_snapshot()
+            return self.status()
+
+    def reset(self):
+        with self._lock:
+            self._baseline = None
+            return self.status()
+
+    def report(self, limit=DEFAULT_LIMIT):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise RuntimeError("tracemalloc is not running")
+            current = self.group_by_module(self._take_snapshot())
+            baseline = (
+                self.group_by_module(self._baseline)
+                if self._baseline is not None
+                else None
+            )
+
+        modules = []
+        for module, (size, count) in current.items():
+            entry = {"module": module, "size": size, "count": count}
+            if baseline is not None:
+                base_size, base_count = baseline.get(module, (0, 0))
+                entry["size_diff"] = size - base_size
+                entry["count_diff"] = count - base_count
+            modules.append(entry)
+
+        sort_key = "size_diff" if baseline is not None else "size"
+        modules.sort(key=lambda entry: abs(entry[sort_key]), reverse=True)
+
+        report = self.status()
+        report["modules"] = modules[:limit]
+        return report
+
+    def status(self):
+        status = {
+            "tracing": tracemalloc.is_tracing(),
+            "frames": tracemalloc.get_traceback_limit(),
+            "baseline": self._baseline is not None,
+            "rss": current_rss(),
+        }
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            status["traced_current"] = current
+            status["traced_peak"] = peak
+        return status
+
+    def group_by_module(self, snapshot):
+        grouped = {}
+        for trace in snapshot.traces:
+            module = self.module_for(trace.traceback)
+            if module is None:
+                continue
+            size, count = grouped.get(module, (0, 0))
+            grouped[module] = (size + trace.size, count + 1)
+        return grouped
+
+    def module_for(self, traceback):
+        # frames are ordered from the oldest to the most recent call
+        for frame in reversed(traceback):
+            if frame.filename.startswith(self.root + os.sep):
+                relative = os.path.relpath(frame.filename, self.root)
+                module = os.path.splitext(relative)[0].replace(os.sep, ".")
+                if module == "__init__":
+                    return self.package
+                if module.endswith(".__init__"):
+                    module = module[: -len(".__init__")]
+                return f"{self.package}.{module}"
+        return None
+
+    def dispatch(self, action, limit=DEFAULT_LIMIT, frames=DEFAULT_FRAMES):
+        # shared entry point for the admin endpoint and the celery control command
+        if action == "start":
+            return self.start(frames)
+        if action == "stop":
+            return self.stop()
+        if action == "snapshot":
+            return self.snapshot()
+        if action == "reset":
+            return self.reset()
+        if action == "report":
+            return self.report(limit)
+        raise ValueError(f"unknown memory profiler action '{action}'")
+
+    def _take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(True, f"{self.root}{os.sep}*", all_frames=True)]
+        )
+
+
+def current_rss(pid="self"):
+    # resident set size of a process in bytes, None where /proc is missing
+    try:
+        with open(f"/proc/{pid}/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+memory_profiler = MemoryProfiler()
@@ -0,0 +1,111 @@
+import os
+
+from prometheus_client import CONTENT_TYPE_LATEST
+from prometheus_client import REGISTRY as registry
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    generate_latest,
+    multiprocess,
+)
+
+# response cache
+CACHE_REQUESTS = Counter(
+    "response_cache_requests_total",
+    "Response cache lookups by resource and result (hit, miss, error)",
+    ["resource", "result"],
+)
+CACHE_HIT_RATIO = Gauge(
+    "response_cache_hit_ratio",
+    "Share of response cache lookups served from redis in this process",
+    ["resource"],
+    multiprocess_mode="liveall",
+)
+
+# rate limiting
+RATE_LIMIT_DECISIONS = Counter(
+    "rate_limit_decisions_total",
+    "Rate limiter decisions by route and result (allowed, limited, fallback)",
+    ["route", "result"],
+)
+
+# load shedding
+SHED_REQUESTS = Counter(
+    "load_shed_requests_total",
+    "Requests rejected with 503 by the load shedding middleware",
+    ["route_class"],
+)
+CONCURRENCY_LIMIT = Gauge(
+    "load_shedding_concurrency_limit",
+    "Adaptive concurrency limit of this process by route class",
+    ["route_class"],
+    multiprocess_mode="liveall",
+)
+IN_FLIGHT_REQUESTS = Gauge(
+    "load_shedding_in_flight_requests",
+    "Requests in flight by route class",
+    ["route_class"],
+    multiprocess_mode="livesum",
+)
+UPLOAD_QUOTA_DECISIONS = Counter(
+    "upload_quota_decisions_total",
+    "Uploads rejected or cut off by the per user quota",
+    ["result"],
+)
+
+# task outbox
+OUTBOX_MESSAGES = Counter(
+    "outbox_messages_total",
+    "Outbox messages published to the broker or failing to",
+    ["result"],
+)
+
+# outbound calls
+CIRCUIT_STATE = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state (0 closed, 1 half open, 2 open)",
+    ["circuit"],
+    multiprocess_mode="liveall",
+)
+RETRIES = Counter(
+    "outbound_retries_total",
+    "Retried outbound calls by operation",
+    ["operation"],
+)
+
+
+# celery worker pools, served by the worker on WORKER_METRICS_PORT
+WORKER_POOL_PROCESSES = Gauge(
+    "worker_pool_processes",
+    "Processes in the celery worker pool",
+)
+WORKER_SCALING_DECISIONS = Counter(
+    "worker_scaling_decisions_total",
+    "Worker pool resizes, and growth held back by the memory limit",
+    ["decision"],
+)
+WORKER_QUEUE_DEPTH = Gauge(
+    "worker_queue_depth",
+    "Messages waiting in the broker queues consumed by the worker",
+    ["queue"],
+)
+WORKER_TASK_WAIT = Gauge(
+    "worker_task_wait_seconds",
+    "Longest time a received task has waited for a pool process",
+)
+WORKER_PROCESS_RSS = Gauge(
+    "worker_process_rss_bytes",
+    "Largest resident set size of the pool processes",
+)
+
+
+def metrics_view():
+    # gunicorn runs several workers, aggregate them when multiprocess mode is on
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        collector = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collector)
+        data = generate_latest(collector)
+    else:
+        data = generate_latest(registry)
+    return data, 200, {"Content-Type": CONTENT_TYPE_LATEST}
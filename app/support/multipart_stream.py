@@ -0,0 +1,89 @@
+import hashlib
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.sansio.multipart import (
+    Data,
+    Epilogue,
+    Field,
+    File,
+    MultipartDecoder,
+    NeedData,
+)
+
+from config import Config
+
+
+class Part(object):
+    """
+    One part of a multipart body, its content is only available through
+    `chunks()` while the part is the current one.
+    """
+
+    def __init__(self, event, events):
+        self.name = event.name
+        self.filename = event.filename if isinstance(event, File) else None
+        self.headers = event.headers
+        self.content_type = event.headers.get("Content-Type")
+        self.size = 0
+        # of the original bytes, whatever the part is stored as
+        self.sha256 = hashlib.sha256()
+        self._events = events
+        self._done = False
+
+    def chunks(self):
+        while not self._done:
+            event = next(self._events)
+            if not isinstance(event, Data):
+                raise ValueError("Malformed multipart body")
+            self._done = not event.more_data
+            if event.data:
+                self.size += len(event.data)
+                self.sha256.update(event.data)
+                yield event.data
+
+    def drain(self):
+        for _ in self.chunks():
+            pass
+
+
+def stream_parts(request, chunk_size=None):
+    """
+    Parse the multipart body of `request` incrementally from its stream.
+
+    Yields a Part per field or file, the body is read as the parts are
+    consumed, so each one can be forwarded while the rest is still arriving.
+    Unconsumed parts are skipped. The request form must not be accessed,
+    it would read the whole body first.
+    """
+    boundary = request.mimetype_params.get("boundary")
+    if not boundary:
+        raise ValueError("Missing multipart boundary")
+    max_length = request.max_content_length
+    if max_length is not None and (request.content_length or 0) > max_length:
+        raise RequestEntityTooLarge()
+
+    events = read_events(
+        request.stream,
+        boundary.encode("latin-1"),
+        chunk_size or Config.UPLOAD_READ_CHUNK_SIZE,
+    )
+    for event in events:
+        if isinstance(event, (Field, File)):
+            part = Part(event, events)
+            yield part
+            part.drain()
+
+
+def read_events(stream, boundary, chunk_size):
+    decoder = MultipartDecoder(boundary)
+    while True:
+        data = stream.read(chunk_size)
+        decoder.receive_data(data or None)
+        event = decoder.next_event()
+        while not isinstance(event, NeedData):
+            if isinstance(event, Epilogue):
+                return
+            yield event
+            event = decoder.next_event()
+        if not data:
+            raise ValueError("Unexpected end of the multipart body")
@@ -0,0 +1,96 @@
+import logging
+import uuid
+from datetime import datetime, timedelta
+
+from app import celery
+from app.factory import db
+from app.models.outbox_message import OutboxMessage
+from app.support.metrics import OUTBOX_MESSAGES
+
+
+class Outbox(object):
+    """
+    Transactional outbox for celery tasks. `enqueue` writes the task in the
+    session of the change it follows, so both commit or roll back together
+    and requests never wait on the broker. `relay` publishes the pending
+    rows in batches over one pooled producer.
+
+    Delivery is at least once: a relay failing between publishing and
+    committing publishes the batch again with the same task ids.
+    """
+
+    def enqueue(self, task, *args, **kwargs):
+        """Add `task` to the current session, returns its task id."""
+        message = OutboxMessage(
+            task_id=str(uuid.uuid4()),
+            task_name=task.name,
+            args=list(args),
+            kwargs=kwargs,
+        )
+        db.session.add(message)
+        return message.task_id
+
+    def relay(self, batch_size):
+        """Publish the pending messages, returns how many were published."""
+        published = 0
+        while True:
+            sent, complete = self.relay_batch(batch_size)
+            published += sent
+            if not complete or sent < batch_size:
+                return published
+
+    def relay_batch(self, batch_size):
+        """Publish one batch, returns the count sent and whether all of it was."""
+        # concurrent relays skip the rows locked by each other (MySQL 8)
+        messages = (
+            OutboxMessage.query.filter(OutboxMessage.published_at.is_(None))
+            .order_by(OutboxMessage.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not messages:
+            db.session.commit()
+            return 0, True
+
+        sent = 0
+        try:
+            with celery.producer_or_acquire() as producer:
+                for message in messages:
+                    self.publish(message, producer)
+                    sent += 1
+        except Exception as e:
+            # the broker is unavailable, the rest waits for the next run
+            logging.error(f"outbox relay failed: {e}")
+            if sent < len(messages):
+                failed = messages[sent]
+                failed.attempts += 1
+                failed.last_error = format(e)
+            OUTBOX_MESSAGES.labels(result="failed").inc()
+        finally:
+            db.session.commit()
+        OUTBOX_MESSAGES.labels(result="published").inc(sent)
+        return sent, sent == len(messages)
+
+    def publish(self, message, producer):
+        celery.send_task(
+            message.task_name,
+            args=message.args,
+            kwargs=message.kwargs,
+            task_id=message.task_id,
+            producer=producer,
+            retry=False,
+        )
+        message.published_at = datetime.utcnow()
+
+    def purge(self, retention):
+        """Delete the messages published more than `retention` seconds ago."""
+        cutoff = datetime.utcnow() - timedelta(seconds=retention)
+        deleted = OutboxMessage.query.filter(
+            OutboxMessage.published_at < cutoff
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+
+outbox = Outbox()
@@ -0,0 +1,51 @@
+import base64
+import binascii
+import datetime
+
+from sqlalchemy import and_, or_
+
+from app.support.json_provider import dumps_bytes, loads_bytes
+
+
+def encode_cursor(created_at, id):
+    """Opaque cursor pointing right after the row (created_at, id)."""
+    value = dumps_bytes([created_at.isoformat(), id])
+    return base64.urlsafe_b64encode(value).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(created_at, id) of a cursor, raises ValueError for malformed ones."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = loads_bytes(base64.urlsafe_b64decode(padded))
+        return datetime.datetime.fromisoformat(created_at), int(id)
+    # JSON decode errors are ValueErrors, with or without orjson
+    except (binascii.Error, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def keyset_page(query, model, cursor, page_size):
+    """
+    Page of `query` newest first, continuing after `cursor`.
+
+    Seeking past the last seen (created_at, id) keeps every page an index
+    range scan, where OFFSET reads and discards all the rows before it.
+    Returns the rows and the cursor of the next page, None on the last one.
+    """
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        query = query.filter(
+            or_(
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < id),
+            )
+        )
+    rows = (
+        query.order_by(model.created_at.desc(), model.id.desc())
+        .limit(page_size + 1)
+        .all()
+    )
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
@@ -0,0 +1,89 @@
+from flask import current_app
+from sqlalchemy import event, inspect
+
+from app import Config
+from app.models.feature import Feature
+from app.models.feature_role import FeatureRole
+from app.models.role import Role
+from app.support.invalidation import invalidation_bus
+from app.support.local_cache import LocalCache
+
+# role name -> current permissions version, cleared when roles or grants change
+role_versions = LocalCache("role_versions", maxsize=256, ttl=Config.LOCAL_CACHE_TTL)
+invalidation_bus.register(["roles", "feature_roles"], role_versions, True)
+
+
+def stateless_auth_enabled():
+    return bool(current_app.config.get("JWT_STATELESS_AUTH"))
+
+
+def build_permission_claims(role):
+    features = (
+        Feature.query.join(FeatureRole)
+        .filter(FeatureRole.role_id == role.id)
+        .order_by(Feature.name)
+        .all()
+    )
+    return {
+        "features": [feature.name for feature in features],
+        "permVer": role.permissions_version,
+    }
+
+
+def authorize_from_claims(payload, allowed_feature):
+    """
+    Authorize a request from the permission claims embedded in its token.
+
+    Returns None when the token carries no claims or its permissions
+    version is outdated, the caller then falls back to the database.
+    Otherwise returns the principal and whether the feature is granted.
+    """
+    if "features" not in payload or "permVer" not in payload:
+        return None
+
+    version = current_permissions_version(payload["userRole"])
+    if version is None or payload["permVer"] != version:
+        return None
+
+    current_user = {
+        "id": payload["userId"],
+        "name": payload["userName"],
+        "email": payload["userEmail"],
+        "role": payload["userRole"],
+    }
+    return current_user, allowed_feature in payload["features"]
+
+
+def current_permissions_version(role_name):
+    return role_versions.get_or_load(role_name, lambda: find_role_version(role_name))
+
+
+def find_role_version(role_name):
+    role = Role.query.filter_by(name=role_name).first()
+    return role.permissions_version if role is not None else None
+
+
+def revoke_role_claims(role):
+    # outdates every token issued for the role once the session commits
+    role.permissions_version = Role.permissions_version + 1
+
+
+def bump_permissions_version(connection, role_id):
+    roles = Role.__table__
+    connection.execute(
+        roles.update()
+        .where(roles.c.id == role_id)
+        .values(permissions_version=roles.c.permissions_version + 1)
+    )
+
+
+# granting or removing a feature outdates the claims of the role, the bump
+# runs in the same transaction as the grant itself
+@event.listens_for(FeatureRole, "after_insert")
+@event.listens_for(FeatureRole, "after_update")
+@event.listens_for(FeatureRole, "after_delete")
+def feature_roles_changed(mapper, connection, target):
+    # a grant moved to another role outdates both roles
+    previous = inspect(target).attrs.role_id.history.deleted or []
+    for role_id in {target.role_id, *previous} - {None}:
+        bump_permissions_version(connection, role_id)
@@ -0,0 +1,230 @@
+import logging
+import math
+import threading
+import time
+from functools import wraps
+from http import HTTPStatus
+
+from cachetools import TTLCache
+from flask import current_app, request
+
+from app.support.metrics import RATE_LIMIT_DECISIONS
+from app.support.redis_client import get_redis
+from app.support.responses import envelope_response
+
+# token buckets stored as hashes {tokens, ts}, refilled on every call; a
+# token is only taken when every bucket has one, so requests denied by one
+# limit leave the others untouched
+# KEYS: the buckets, ARGV: now, cost, then rate and capacity of every bucket
+# returns {allowed, fewest tokens left, milliseconds until all buckets allow}
+BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+
+local tokens = {}
+local allowed = 1
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i + 1])
+    local capacity = tonumber(ARGV[2 * i + 2])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local left = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens[i] = math.min(capacity, left + math.max(0, now - ts) * rate / 1000)
+    if tokens[i] < cost then
+        allowed = 0
+    end
+end
+
+local fewest = nil
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i + 1])
+    local capacity = tonumber(ARGV[2 * i + 2])
+    if allowed == 1 then
+        tokens[i] = tokens[i] - cost
+    elseif tokens[i] < cost then
+        wait = math.max(wait, math.ceil((cost - tokens[i]) / rate * 1000))
+    end
+    redis.call('HSET', key, 'tokens', tostring(tokens[i]), 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000))
+    if fewest == nil or tokens[i] < fewest then
+        fewest = tokens[i]
+    end
+end
+return {allowed, math.floor(fewest), wait}
+"""
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class Limit(object):
+    """A `count/period` rule, e.g. `10/minute`, as a token bucket."""
+
+    __slots__ = ("count", "period", "rate", "capacity", "text")
+
+    def __init__(self, text):
+        count, period = text.strip().split("/")
+        self.text = text.strip()
+        self.count = int(count)
+        self.period = PERIODS[period.strip().rstrip("s")]
+        self.rate = self.count / self.period
+        self.capacity = self.count
+
+    @classmethod
+    def parse(cls, limits):
+        return [cls(text) for text in limits.split(";") if text.strip()]
+
+
+class LocalBuckets(object):
+    """
+    In-process token buckets used while redis is unreachable.
+
+    Every worker only gets its share of the limit, so the cluster wide
+    rate stays roughly the configured one.
+    """
+
+    def __init__(self, maxsize=10000):
+        self._buckets = TTLCache(maxsize=maxsize, ttl=86400)
+        self._lock = threading.Lock()
+
+    def take(self, keys, limits, share, now):
+        """
+        Take a token from every bucket when all of them have one, returns
+        (allowed, seconds to wait).
+        """
+        with self._lock:
+            buckets = []
+            for key, limit in zip(keys, limits):
+                rate = limit.rate * share
+                capacity = max(limit.capacity * share, 1)
+                tokens, ts = self._buckets.get(key, (capacity, now))
+                tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+                buckets.append((key, tokens, rate))
+            allowed = all(tokens >= 1 for _, tokens, _ in buckets)
+            wait = 0
+            for key, tokens, rate in buckets:
+                if allowed:
+                    tokens -= 1
+                elif tokens < 1:
+                    wait = max(wait, math.ceil((1 - tokens) / rate))
+                self._buckets[key] = (tokens, now)
+        return allowed, wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class RateLimiter(object):
+    """
+    Token bucket rate limiting keyed by client ip, user or route.
+
+    All limits of a route are checked in one round trip by an atomic lua
+    script, which only takes tokens when every limit allows the request.
+    When redis fails or is slower than its socket timeout the limiter
+    switches to local buckets for RATE_LIMIT_FALLBACK_SECONDS instead of
+    paying the timeout on every request.
+    """
+
+    def __init__(self, prefix="ratelimit"):
+        self.prefix = prefix
+        self.local = LocalBuckets()
+        self._scripts = {}
+        self._redis_down_until = 0.0
+
+    def limit(self, limits, key="ip"):
+        """
+        Limit the decorated view to `limits` (`"10/minute;100/hour"`) per
+        `key`: "ip", "user", "route" or a function returning the key.
+
+        With key="user" it goes below `api_token_required`, the limit then
+        applies to the authenticated user passed to the view.
+        """
+        rules = Limit.parse(limits)
+
+        def decorator(view_func):
+            scope = view_func.__name__
+
+            @wraps(view_func)
+            def decorated(*args, **kwargs):
+                if not current_app.config.get("RATE_LIMIT_ENABLED"):
+                    return view_func(*args, **kwargs)
+
+                identity = self.identity(key, args)
+                allowed, wait = self.hit(scope, identity, rules)
+                if not allowed:
+                    RATE_LIMIT_DECISIONS.labels(route=scope, result="limited").inc()
+                    return self.limited_response(wait)
+
+                RATE_LIMIT_DECISIONS.labels(route=scope, result="allowed").inc()
+                return view_func(*args, **kwargs)
+
+            return decorated
+
+        return decorator
+
+    def identity(self, key, args):
+        if callable(key):
+            return str(key())
+        if key == "user":
+            current_user = args[0] if args else None
+            if isinstance(current_user, dict) and current_user.get("id") is not None:
+                return f"user:{current_user['id']}"
+        if key == "route":
+            return "route"
+        # behind a proxy the WSGI server is expected to set REMOTE_ADDR
+        return f"ip:{request.remote_addr}"
+
+    def hit(self, scope, identity, rules):
+        """Take a token from every bucket, returns (allowed, seconds to wait)."""
+        keys = [f"{self.prefix}:{scope}:{identity}:{rule.text}" for rule in rules]
+        now = time.time()
+
+        result = None
+        client = self.client(now)
+        if client is not None:
+            result = self.hit_redis(client, keys, rules, now)
+        if result is None:
+            share = 1 / max(current_app.config["RATE_LIMIT_FALLBACK_WORKERS"], 1)
+            result = self.local.take(keys, rules, share, now)
+        return result
+
+    def hit_redis(self, client, keys, rules, now):
+        args = [int(now * 1000), 1]
+        for rule in rules:
+            args += [rule.rate, rule.capacity]
+        try:
+            allowed, _, wait = self.script(client)(keys=keys, args=args)
+            return bool(allowed), math.ceil(wait / 1000)
+        except Exception as e:
+            logging.error(f"rate limiter falling back to local buckets: {e}")
+            self._redis_down_until = (
+                now + current_app.config["RATE_LIMIT_FALLBACK_SECONDS"]
+            )
+            RATE_LIMIT_DECISIONS.labels(route="*", result="fallback").inc()
+            return None
+
+    def client(self, now):
+        if now < self._redis_down_until:
+            return None
+        return get_redis()
+
+    def script(self, client):
+        script = self._scripts.get(id(client))
+        if script is None:
+            script = client.register_script(BUCKET_SCRIPT)
+            self._scripts[id(client)] = script
+        return script
+
+    def limited_response(self, wait):
+        response, status = envelope_response(
+            HTTPStatus.TOO_MANY_REQUESTS,
+            "failed",
+            "Too many requests. Please try again later.",
+        )
+        response.headers["Retry-After"] = str(max(int(wait), 1))
+        return response, status
+
+
+rate_limiter = RateLimiter()
+rate_limit = rate_limiter.limit
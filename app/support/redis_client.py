@@ -0,0 +1,31 @@
+import threading
+
+import redis
+from flask import current_app
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_redis(url=None):
+    """
+    Shared redis client for `url` (defaults to REDIS_URL), None when redis
+    is not configured. Clients are thread safe and pool their connections,
+    so one instance per url is kept for the whole process.
+    """
+    if url is None:
+        url = current_app.config.get("REDIS_URL")
+    if not url:
+        return None
+
+    client = _clients.get(url)
+    if client is None:
+        with _lock:
+            client = _clients.get(url)
+            if client is None:
+                timeout = current_app.config.get("REDIS_SOCKET_TIMEOUT")
+                client = redis.Redis.from_url(
+                    url, socket_timeout=timeout, socket_connect_timeout=timeout
+                )
+                _clients[url] = client
+    return client
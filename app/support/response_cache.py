@@ -0,0 +1,206 @@
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from functools import wraps
+
+from flask import current_app, has_app_context, request
+from werkzeug.http import unquote_etag
+
+from app.support.etag import is_not_modified, not_modified_response
+from app.support.invalidation import invalidation_bus
+from app.support.metrics import CACHE_HIT_RATIO, CACHE_REQUESTS
+from app.support.redis_client import get_redis
+
+# returns the resource version and the entry stored under it in one round trip
+FETCH_SCRIPT = """
+local version = redis.call('GET', KEYS[1]) or '0'
+return {version, redis.call('GET', ARGV[1] .. ':v' .. version .. ':' .. ARGV[2])}
+"""
+
+# only the lock owner may release it
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+LOCK_POLL_INTERVAL = 0.02
+
+
+class ResponseCache(object):
+    """
+    Redis read-through cache for GET responses.
+
+    Entries are keyed by resource, resource version and request parameters.
+    Writers bump the version so every entry of the resource becomes
+    unreachable at once and simply expires, nothing is scanned or deleted.
+    On a miss a short lived lock makes a single caller rebuild the entry
+    while concurrent callers wait for it instead of hitting the database.
+    """
+
+    def __init__(self, prefix="cache"):
+        self.prefix = prefix
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self._scripts = {}
+
+    def cached(self, resource):
+        def decorator(view_func):
+            @wraps(view_func)
+            def decorated(*args, **kwargs):
+                return self.fetch(resource, kwargs, lambda: view_func(*args, **kwargs))
+
+            return decorated
+
+        return decorator
+
+    def fetch(self, resource, params, loader):
+        client = self.client()
+        if client is None:
+            return loader()
+
+        digest = self.digest(params)
+        try:
+            version, entry = self.script(client, FETCH_SCRIPT)(
+                keys=[self.version_key(resource)],
+                args=[f"{self.prefix}:{resource}", digest],
+            )
+        except Exception as e:
+            logging.error(f"response cache lookup failed: {e}")
+            self.record(resource, "error")
+            return loader()
+
+        if entry is not None:
+            self.record(resource, "hit")
+            return self.from_entry(entry)
+
+        self.record(resource, "miss")
+        key = self.entry_key(resource, int(version), digest)
+        return self.rebuild(client, key, loader)
+
+    def rebuild(self, client, key, loader):
+        token = uuid.uuid4().hex
+        lock_key = f"{key}:lock"
+        lock_timeout = current_app.config["CACHE_LOCK_TIMEOUT"]
+        try:
+            locked = client.set(lock_key, token, nx=True, px=int(lock_timeout * 1000))
+        except Exception as e:
+            logging.error(f"response cache lock failed: {e}")
+            return loader()
+
+        if not locked:
+            # someone else is rebuilding, wait for their entry
+            entry = self.wait_for(client, key)
+            return self.from_entry(entry) if entry is not None else loader()
+
+        try:
+            result = loader()
+            response = current_app.make_response(result)
+            if 200 <= response.status_code < 300 and response.headers.get("ETag"):
+                client.set(
+                    key,
+                    self.to_entry(response),
+                    ex=current_app.config["CACHE_TTL"],
+                )
+            return response
+        finally:
+            try:
+                self.script(client, RELEASE_SCRIPT)(keys=[lock_key], args=[token])
+            except Exception as e:
+                logging.error(f"response cache unlock failed: {e}")
+
+    def wait_for(self, client, key):
+        deadline = time.monotonic() + current_app.config["CACHE_LOCK_WAIT"]
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            try:
+                entry = client.get(key)
+            except Exception:
+                return None
+            if entry is not None:
+                return entry
+        return None
+
+    def bump(self, resource):
+        client = self.client()
+        if client is None:
+            return None
+        try:
+            return client.incr(self.version_key(resource))
+        except Exception as e:
+            logging.error(f"response cache version bump failed: {e}")
+            return None
+
+    def client(self):
+        if not has_app_context() or not current_app.config.get("CACHE_ENABLED"):
+            return None
+        return get_redis()
+
+    def script(self, client, source):
+        script = self._scripts.get((id(client), source))
+        if script is None:
+            script = client.register_script(source)
+            self._scripts[(id(client), source)] = script
+        return script
+
+    def record(self, resource, result):
+        CACHE_REQUESTS.labels(resource=resource, result=result).inc()
+        with self._stats_lock:
+            hits, total = self._stats.get(resource, (0, 0))
+            hits += result == "hit"
+            total += 1
+            self._stats[resource] = (hits, total)
+        CACHE_HIT_RATIO.labels(resource=resource).set(hits / total)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                resource: {"hits": hits, "lookups": total, "hit_ratio": hits / total}
+                for resource, (hits, total) in self._stats.items()
+            }
+
+    def version_key(self, resource):
+        return f"{self.prefix}:{resource}:version"
+
+    def entry_key(self, resource, version, digest):
+        return f"{self.prefix}:{resource}:v{version}:{digest}"
+
+    def digest(self, params):
+        # view arguments plus the query string, order independent
+        parts = sorted((str(k), str(v)) for k, v in params.items())
+        parts += sorted(request.args.items(multi=True))
+        return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+    def to_entry(self, response):
+        return b"\n".join(
+            [
+                str(response.status_code).encode(),
+                response.headers["ETag"].encode(),
+                response.mimetype.encode(),
+                response.get_data(),
+            ]
+        )
+
+    def from_entry(self, entry):
+        status, etag_header, mimetype, body = entry.split(b"\n", 3)
+        etag, _ = unquote_etag(etag_header.decode())
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+
+        response = current_app.response_class(
+            body, status=int(status), mimetype=mimetype.decode()
+        )
+        response.headers["ETag"] = etag_header.decode()
+        return response
+
+
+response_cache = ResponseCache()
+
+# every committed user or role write outdates the cached user pages, which
+# show the role names
+invalidation_bus.on_commit(
+    ["users", "roles"], lambda changes: response_cache.bump("users")
+)
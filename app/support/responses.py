@@ -0,0 +1,30 @@
+from functools import lru_cache
+
+from flask import current_app, jsonify, make_response
+
+from app.support.json_provider import dumps_bytes
+
+
+def json_response(http_status, status, message=None, **fields):
+    """Build the `{"status": ..., "message": ...}` envelope with extra fields."""
+    responseObject = {"status": status}
+    if message is not None:
+        responseObject["message"] = message
+    responseObject.update(fields)
+    return make_response(jsonify(responseObject)), http_status
+
+
+def envelope_response(http_status, status, message):
+    """
+    Same envelope as `json_response` for constant messages, the body is
+    serialized once and reused for every later response.
+    """
+    response = current_app.response_class(
+        _envelope_body(status, message), mimetype="application/json"
+    )
+    return response, http_status
+
+
+@lru_cache(maxsize=256)
+def _envelope_body(status, message):
+    return dumps_bytes({"status": status, "message": message})
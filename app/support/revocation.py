@@ -0,0 +1,269 @@
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from hashlib import blake2b
+
+from flask import current_app
+
+from app.factory import db
+from app.models.revoked_token import RevokedToken
+from app.support.redis_client import get_redis
+
+KEY = "revoked:tokens"
+# longest lifetime of a token issued by encode_jwt_token
+MAX_TOKEN_AGE = 30 * 24 * 3600
+# incremental loads overlap to tolerate clock skew between writers
+OVERLAP = 5
+BATCH_SIZE = 10000
+
+
+class BloomFilter(object):
+    """
+    Fixed size Bloom filter over strings.
+
+    Sized for `capacity` items at `error_rate` false positives, positions
+    are derived from one blake2b digest by double hashing.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(int(capacity), 1)
+        self.size = max(
+            int(-self.capacity * math.log(error_rate) / math.log(2) ** 2), 8
+        )
+        self.hashes = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, item):
+        bits = self._bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        bits = self._bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def _positions(self, item):
+        digest = blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        for i in range(self.hashes):
+            yield (first + i * step) % size
+
+
+class RevocationList(object):
+    """
+    Revoked token ids, stored in the database and mirrored in a redis
+    sorted set scored by revocation time.
+
+    Every worker keeps a Bloom filter of the revoked ids so the check for
+    a token that was not revoked, nearly every request, never leaves the
+    process. Filter hits are confirmed against redis (the database without
+    redis) to rule out false positives. New revocations are loaded every
+    REVOCATION_REFRESH_INTERVAL seconds and the filter is rebuilt in a
+    background thread every REVOCATION_REBUILD_INTERVAL seconds, dropping
+    tokens that expired in the meantime.
+    """
+
+    def __init__(self):
+        self._filter = None
+        self._loaded_until = 0.0
+        self._refreshed_at = 0.0
+        self._rebuilt_at = 0.0
+        self._pid = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def is_revoked(self, jti):
+        if not jti or not current_app.config.get("REVOCATION_ENABLED"):
+            return False
+        bloom = self.current_filter()
+        if bloom is not None and jti not in bloom:
+            return False
+        return self.confirm(jti)
+
+    def revoke(self, jti, expires_at, user_id=None):
+        db.session.add(RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at))
+        try:
+            db.session.flush()
+            client = get_redis()
+            if client is not None:
+                client.zadd(KEY, {jti: time.time()})
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        # this worker does not wait for its next refresh
+        if self._filter is not None:
+            self._filter.add(jti)
+
+    def current_filter(self):
+        if self._pid is not None and self._pid != os.getpid():
+            # forked workers build their own filter
+            self._pid = None
+            self._filter = None
+            self._rebuilt_at = 0.0
+            self._thread = None
+
+        now = time.time()
+        if now - self._rebuilt_at > current_app.config["REVOCATION_REBUILD_INTERVAL"]:
+            self.rebuild_async()
+        elif (
+            now - self._refreshed_at > current_app.config["REVOCATION_REFRESH_INTERVAL"]
+        ):
+            self.refresh()
+        return self._filter
+
+    def confirm(self, jti):
+        client = get_redis()
+        if client is not None:
+            try:
+                return client.zscore(KEY, jti) is not None
+            except Exception as e:
+                logging.error(f"revocation lookup failed, using the database: {e}")
+        return db.session.query(RevokedToken.query.filter_by(jti=jti).exists()).scalar()
+
+    def refresh(self):
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            started = time.time()
+            self._refreshed_at = started
+            bloom = self._filter
+            if bloom is None:
+                return
+            for jti in self.load(self._loaded_until - OVERLAP):
+                bloom.add(jti)
+            self._loaded_until = started
+            if bloom.count > bloom.capacity:
+                # over capacity the error rate climbs, size a new filter
+                self._rebuilt_at = 0.0
+        except Exception as e:
+            logging.error(f"revocation refresh failed: {e}")
+        finally:
+            self._lock.release()
+
+    def rebuild_async(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._rebuilt_at = time.time()
+        self._pid = os.getpid()
+        app = current_app._get_current_object()
+        self._thread = threading.Thread(
+            target=self._rebuild_in, args=(app,), name="revocation", daemon=True
+        )
+        self._thread.start()
+
+    def _rebuild_in(self, app):
+        with app.app_context():
+            try:
+                self.rebuild()
+            except Exception as e:
+                logging.error(f"revocation rebuild failed: {e}")
+                # retry after the refresh interval rather than the rebuild one
+                self._rebuilt_at = (
+                    time.time()
+                    - app.config["REVOCATION_REBUILD_INTERVAL"]
+                    + app.config["REVOCATION_REFRESH_INTERVAL"]
+                )
+            finally:
+                db.session.remove()
+
+    def rebuild(self):
+        started = time.time()
+        self.prune(started)
+        self.reseed()
+
+        bloom = BloomFilter(
+            max(current_app.config["REVOCATION_BLOOM_CAPACITY"], 2 * self.count()),
+            current_app.config["REVOCATION_BLOOM_ERROR_RATE"],
+        )
+        for jti in self.load(None):
+            bloom.add(jti)
+
+        with self._lock:
+            self._pid = os.getpid()
+            self._filter = bloom
+            self._loaded_until = started
+            self._refreshed_at = started
+            self._rebuilt_at = started
+        return bloom
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def reset(self):
+        self.wait(5)
+        with self._lock:
+            self._filter = None
+            self._thread = None
+            self._pid = None
+            self._loaded_until = 0.0
+            self._refreshed_at = 0.0
+            self._rebuilt_at = 0.0
+
+    def load(self, since):
+        """Yield ids revoked after `since` (a timestamp), or all when None."""
+        client = get_redis()
+        if client is not None:
+            if since is None:
+                members = client.zscan_iter(KEY, count=BATCH_SIZE)
+            else:
+                members = client.zrangebyscore(KEY, since, "+inf", withscores=True)
+            for member, _ in members:
+                yield member.decode() if isinstance(member, bytes) else member
+            return
+
+        query = db.session.query(RevokedToken.jti)
+        if since is None:
+            query = query.filter(RevokedToken.expires_at > datetime.utcnow())
+        else:
+            # range scan on created_at, expired ids are harmless in the filter
+            query = query.filter(
+                RevokedToken.created_at >= datetime.utcfromtimestamp(max(since, 0))
+            )
+        for (jti,) in query.yield_per(BATCH_SIZE):
+            yield jti
+
+    def count(self):
+        client = get_redis()
+        if client is not None:
+            return client.zcard(KEY)
+        return RevokedToken.query.count()
+
+    def reseed(self):
+        # redis lost its copy (flushed, failed over), restore it from the database
+        client = get_redis()
+        if client is None or client.zcard(KEY):
+            return
+        query = db.session.query(RevokedToken.jti, RevokedToken.created_at).filter(
+            RevokedToken.expires_at > datetime.utcnow()
+        )
+        pipe = client.pipeline(transaction=False)
+        for index, (jti, created_at) in enumerate(query.yield_per(BATCH_SIZE), 1):
+            pipe.zadd(KEY, {jti: (created_at - datetime(1970, 1, 1)).total_seconds()})
+            if index % BATCH_SIZE == 0:
+                pipe.execute()
+        pipe.execute()
+
+    def prune(self, now):
+        RevokedToken.query.filter(
+            RevokedToken.expires_at <= datetime.utcfromtimestamp(now)
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        client = get_redis()
+        if client is not None:
+            client.zremrangebyscore(KEY, "-inf", now - MAX_TOKEN_AGE)
+
+
+revocation_list = RevocationList()
@@ -1,13 +1,75 @@
 import logging
 
 import boto3
+from boto3.exceptions import S3UploadFailedError
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import (
+    BotoCoreError,
+    ClientError,
+    ConnectionClosedError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+    ReadTimeoutError,
+)
 
+from app.support import deadline
+from app.support.circuit_breaker import CircuitBreaker, CircuitOpenError, retry
 from config import Config
 
 AWS_ACCESS_KEY = Config.AWS_ACCESS_KEY
 AWS_SECRET_ACCESS_KEY = Config.AWS_SECRET_ACCESS_KEY
 S3_BUCKET = Config.AWS_S3_BUCKET
 
+THROTTLING_CODES = {
+    "SlowDown",
+    "ServiceUnavailable",
+    "Throttling",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+    "TooManyRequests",
+    "503",
+}
+NETWORK_ERRORS = (
+    ConnectionClosedError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+    ReadTimeoutError,
+)
+
+
+def is_throttled(error):
+    if not isinstance(error, ClientError):
+        return False
+    code = error.response.get("Error", {}).get("Code")
+    status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return code in THROTTLING_CODES or status == 503
+
+
+def is_outage(error):
+    """Errors telling S3 is degraded, as opposed to e.g. a missing key."""
+    if isinstance(error, NETWORK_ERRORS) or is_throttled(error):
+        return True
+    if isinstance(error, ClientError):
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        return status is not None and status >= 500
+    # the transfer manager wraps the failed part uploads
+    return isinstance(error, S3UploadFailedError)
+
+
+S3_ERRORS = (BotoCoreError, ClientError, S3UploadFailedError, CircuitOpenError)
+
+
+# one breaker per operation type, shared by all clients of the process
+breakers = {
+    operation: CircuitBreaker(
+        f"s3.{operation}",
+        failure_threshold=Config.AWS_S3_BREAKER_FAILURES,
+        recovery_timeout=Config.AWS_S3_BREAKER_RECOVERY,
+        is_failure=is_outage,
+    )
+    for operation in ("upload", "get", "put", "head")
+}
+
 
 class S3_Client(object):
     def __init__(self):
@@ -17,47 +79,181 @@ class S3_Client(object):
             aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
         )
 
+        self.connect(client_config())
+
+    def connect(self, config):
+        self.timeouts = (config.connect_timeout, config.read_timeout)
+
         # creating S3 client from the session
-        self.s3_client = self.session.client("s3")
+        self.s3_client = self.session.client("s3", config=config)
 
         # creating S3 resource from the session
-        self.s3_resource = self.session.resource("s3")
+        self.s3_resource = self.session.resource("s3", config=config)
 
-    def upload_file(self, filepath, filename, file_to_upload):
-        try:
-            # uploading file to S3 bucket
-            self.s3_resource.Bucket(S3_BUCKET).upload_file(file_to_upload, filepath)
-        except Exception as e:
-            logging.error(e)
-            return None
+    def apply_deadline(self):
+        # botocore fixes the timeouts when the client is built, later calls
+        # of the request get a client built with the time left
+        if deadline.remaining() is None:
+            return
+        config = client_config()
+        if (config.connect_timeout, config.read_timeout) != self.timeouts:
+            self.connect(config)
 
-        return {"filename": filename}
+    def call(self, operation, fn, retryable=True):
+        """Run `fn` through the operation's breaker, retrying throttled calls."""
+        self.apply_deadline()
+        return breakers[operation].call(
+            retry,
+            fn,
+            is_throttled,
+            attempts=Config.AWS_S3_RETRY_ATTEMPTS if retryable else 1,
+            base_delay=Config.AWS_S3_RETRY_BASE_DELAY,
+            max_delay=Config.AWS_S3_RETRY_MAX_DELAY,
+            name=f"s3.{operation}",
+        )
 
-    def get_object(self, filepath):
-        try:
-            # getting file object from s3 bucket
-            response = self.s3_client.get_object(Bucket=S3_BUCKET, Key=filepath)
-            self.s3_client.head_object(Bucket=S3_BUCKET, Key=filepath)
-        except Exception as e:
-            logging.error(e)
-            return None
+    def upload_file(self, filepath, filename, file_to_upload):
+        """Upload the file at `file_to_upload`, S3 failures are raised."""
+        self.call(
+            "upload",
+            lambda: self.s3_resource.Bucket(S3_BUCKET).upload_file(
+                file_to_upload, filepath
+            ),
+        )
+        return {"filename": filename, "key": filepath}
 
-        return response
+    def get_object(self, filepath):
+        """GetObject response of `filepath`, S3 failures are raised."""
+        return self.call(
+            "get",
+            lambda: self.s3_client.get_object(Bucket=S3_BUCKET, Key=filepath),
+        )
 
     def put_object(self, filepath, filename, file_obj):
-        try:
-            response = self.s3_client.put_object(
+        """Upload `file_obj` with one PutObject, S3 failures are raised."""
+        # retries resend the body, which needs a stream we can rewind
+        seekable = hasattr(file_obj, "seekable") and file_obj.seekable()
+        position = file_obj.tell() if seekable else None
+
+        def put():
+            if position is not None:
+                file_obj.seek(position)
+            return self.s3_client.put_object(
                 Bucket=S3_BUCKET, Key=filepath, Body=file_obj
             )
-        except Exception as e:
-            logging.error(e)
-            return None
+
+        response = self.call("put", put, retryable=seekable)
+        return {
+            "status": response["ResponseMetadata"]["HTTPStatusCode"],
+            "filename": filename,
+            "key": filepath,
+            "etag": response.get("ETag", "").strip('"') or None,
+        }
+
+    def stream_upload(
+        self,
+        filepath,
+        filename,
+        chunks,
+        content_type=None,
+        content_encoding=None,
+        metadata=None,
+    ):
+        """
+        Upload an iterable of byte chunks of unknown total size.
+
+        At most one part is buffered: bodies smaller than a part go out with
+        a single PutObject, larger ones as a multipart upload whose parts are
+        sent while the rest of the body is still being received. S3 failures
+        are raised once the unfinished upload is aborted.
+        """
+        extra = object_args(content_type, content_encoding, metadata)
+        upload = {"UploadId": None, "Parts": []}
+        buffer, buffered, stored = [], 0, 0
+        try:
+            for chunk in chunks:
+                buffer.append(chunk)
+                buffered += len(chunk)
+                stored += len(chunk)
+                if buffered >= Config.AWS_S3_MULTIPART_PART_SIZE:
+                    self.send_part(filepath, upload, b"".join(buffer), extra)
+                    buffer, buffered = [], 0
+
+            if upload["UploadId"] is None:
+                body = b"".join(buffer)
+                response = self.call(
+                    "put",
+                    lambda: self.s3_client.put_object(
+                        Bucket=S3_BUCKET, Key=filepath, Body=body, **extra
+                    ),
+                )
+            else:
+                if buffer:
+                    self.send_part(filepath, upload, b"".join(buffer), extra)
+                response = self.call(
+                    "put",
+                    lambda: self.s3_client.complete_multipart_upload(
+                        Bucket=S3_BUCKET,
+                        Key=filepath,
+                        UploadId=upload["UploadId"],
+                        MultipartUpload={"Parts": upload["Parts"]},
+                    ),
+                )
+        except BaseException:
+            self.abort_upload(filepath, upload["UploadId"])
+            raise
 
         return {
             "status": response["ResponseMetadata"]["HTTPStatusCode"],
             "filename": filename,
+            "key": filepath,
+            "etag": response.get("ETag", "").strip('"') or None,
+            "stored_size": stored,
+            "content_encoding": content_encoding,
         }
 
+    def send_part(self, filepath, upload, body, extra):
+        deadline.check("the S3 upload")
+        if upload["UploadId"] is None:
+            created = self.call(
+                "put",
+                lambda: self.s3_client.create_multipart_upload(
+                    Bucket=S3_BUCKET, Key=filepath, **extra
+                ),
+            )
+            upload["UploadId"] = created["UploadId"]
+
+        number = len(upload["Parts"]) + 1
+        response = self.call(
+            "put",
+            lambda: self.s3_client.upload_part(
+                Bucket=S3_BUCKET,
+                Key=filepath,
+                UploadId=upload["UploadId"],
+                PartNumber=number,
+                Body=body,
+            ),
+        )
+        upload["Parts"].append({"ETag": response["ETag"], "PartNumber": number})
+
+    def abort_upload(self, filepath, upload_id):
+        # parts of unfinished uploads are billed until aborted
+        if upload_id is None:
+            return
+        try:
+            self.s3_client.abort_multipart_upload(
+                Bucket=S3_BUCKET, Key=filepath, UploadId=upload_id
+            )
+        except Exception as e:
+            logging.error(f"could not abort the upload of {filepath}: {e}")
+
+    def delete_object(self, filepath):
+        """Delete the object at `filepath`, S3 failures are raised."""
+        self.call(
+            "put",
+            lambda: self.s3_client.delete_object(Bucket=S3_BUCKET, Key=filepath),
+        )
+
     def generate_presigned_url(self, filepath, expiration=3600):
         try:
             response = self.s3_client.generate_presigned_url(
@@ -75,11 +271,49 @@ class S3_Client(object):
 
         return response
 
-    def file_not_found(self, filepath):
+    def exists(self, filepath):
+        """Whether the key exists, S3 failures other than a 404 are raised."""
         try:
-            self.s3_client.head_object(Bucket=S3_BUCKET, Key=filepath)
-        except Exception as e:
-            logging.error(e)
-            return True
+            self.call(
+                "head",
+                lambda: self.s3_client.head_object(Bucket=S3_BUCKET, Key=filepath),
+            )
+        except ClientError as e:
+            if e.response.get("ResponseMetadata", {}).get("HTTPStatusCode") == 404:
+                return False
+            raise
+        return True
 
-        return False
+    def file_not_found(self, filepath):
+        """Whether S3 answers 404 for the key, other failures are raised."""
+        return not self.exists(filepath)
+
+
+def object_args(content_type=None, content_encoding=None, metadata=None):
+    args = {}
+    if content_type:
+        args["ContentType"] = content_type
+    if content_encoding:
+        args["ContentEncoding"] = content_encoding
+    if metadata:
+        args["Metadata"] = metadata
+    return args
+
+
+def client_config():
+    connect_timeout = Config.AWS_S3_CONNECT_TIMEOUT
+    read_timeout = Config.AWS_S3_READ_TIMEOUT
+
+    left = deadline.remaining()
+    if left is not None:
+        deadline.check("the S3 call")
+        connect_timeout = min(connect_timeout, left)
+        read_timeout = min(read_timeout, left)
+
+    # S3_Client.call retries throttled calls itself, with jitter and within
+    # the deadline, botocore retrying as well would multiply the attempts
+    return BotoConfig(
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        retries={"total_max_attempts": 1},
+    )
@@ -1,39 +1,104 @@
 # Changed Filename to s3_helper.py
+import logging
+
 from app.support.file_utils import get_unique_file_name
+from app.support.key_layout import build_key, candidate_keys
+from app.support.local_cache import LocalCache
 from app.support.s3 import S3_Client
+from app.support.stored_encoding import gzip_chunks, is_compressible
 from config import Config
 
+# keys found for (folder, file name), objects never move once uploaded
+resolved_keys = LocalCache("s3_keys", maxsize=10000, ttl=3600)
+
 
 def upload_file_to_s3(file_type, file_name, file_to_upload, user_name):
     s3_folder = get_s3_folder(file_type)
     filename = get_unique_file_name(file_name, user_name)
-    filepath = f"{s3_folder}/{filename}"
+    filepath = build_key(s3_folder, filename)
     return S3_Client().upload_file(filepath, filename, file_to_upload)
 
 
 def get_object_from_s3(file_type, file_name):
-    s3_folder = get_s3_folder(file_type)
-    filepath = f"{s3_folder}/{file_name}"
-    return S3_Client().get_object(filepath)
+    s3_client = S3_Client()
+    filepath = resolve_key(s3_client, get_s3_folder(file_type), file_name)
+    return s3_client.get_object(filepath)
 
 
 def put_object_to_s3(file_type, file_name, file_obj, user_name):
     s3_folder = get_s3_folder(file_type)
     filename = get_unique_file_name(file_name, user_name)
-    filepath = f"{s3_folder}/{filename}"
+    filepath = build_key(s3_folder, filename)
     return S3_Client().put_object(filepath, filename, file_obj)
 
 
-def generate_presigned_s3_url(file_type, file_name):
+def stream_object_to_s3(file_type, file_name, chunks, user_name, content_type=None):
     s3_folder = get_s3_folder(file_type)
-    filepath = f"{s3_folder}/{file_name}"
-    return S3_Client().generate_presigned_url(filepath)
+    filename = get_unique_file_name(file_name, user_name)
+    filepath = build_key(s3_folder, filename)
+
+    # text is gzipped while it streams through, S3 serves it back with
+    # Content-Encoding: gzip so HTTP clients get the original bytes
+    content_encoding, metadata = None, None
+    if Config.UPLOAD_COMPRESSION and is_compressible(content_type):
+        chunks = gzip_chunks(chunks, Config.UPLOAD_COMPRESSION_LEVEL)
+        content_encoding = "gzip"
+        metadata = {
+            "compression": "gzip",
+            "compression-level": str(Config.UPLOAD_COMPRESSION_LEVEL),
+        }
+
+    return S3_Client().stream_upload(
+        filepath, filename, chunks, content_type, content_encoding, metadata
+    )
+
+
+def delete_object_from_s3(filepath):
+    return S3_Client().delete_object(filepath)
+
+
+def generate_presigned_s3_url(file_type, file_name):
+    s3_client = S3_Client()
+    filepath = resolve_key(s3_client, get_s3_folder(file_type), file_name)
+    return s3_client.generate_presigned_url(filepath)
 
 
 def file_not_found_on_s3(file_type, file_name):
-    s3_folder = get_s3_folder(file_type)
-    filepath = f"{s3_folder}/{file_name}"
-    return S3_Client().file_not_found(filepath)
+    s3_client = S3_Client()
+    filepath = resolve_key(s3_client, get_s3_folder(file_type), file_name)
+    return s3_client.file_not_found(filepath)
+
+
+def resolve_key(s3_client, s3_folder, file_name):
+    """
+    Key `file_name` is stored at, whichever layout it was uploaded with.
+    Falls back to the configured layout when no candidate exists.
+    """
+    if not s3_folder or not file_name:
+        return f"{s3_folder}/{file_name}"
+    try:
+        filepath = find_key(s3_client, s3_folder, file_name)
+    except Exception as e:
+        logging.warning(f"could not resolve the key of {file_name}: {e}")
+        filepath = None
+    return filepath or build_key(s3_folder, file_name)
+
+
+def find_key(s3_client, s3_folder, file_name):
+    """
+    Key of the stored `file_name` in any layout, None when it is missing.
+    S3 failures are raised.
+    """
+    cache_key = (s3_folder, file_name)
+    filepath = resolved_keys.get(cache_key)
+    if filepath is not None:
+        return filepath
+
+    for candidate in candidate_keys(s3_folder, file_name):
+        if s3_client.exists(candidate):
+            resolved_keys.set(cache_key, candidate)
+            return candidate
+    return None
 
 
 def get_s3_folder(file_type):
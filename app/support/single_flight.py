@@ -0,0 +1,71 @@
+import logging
+import threading
+import time
+
+
+class _Call(object):
+    __slots__ = ("done", "result", "error", "started")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.started = time.monotonic()
+
+
+class SingleFlight(object):
+    """
+    Coalesces concurrent calls for the same key within a process.
+
+    The first caller for a key runs the function, callers arriving while it
+    is in flight wait for it and get the same result (or exception).
+    Results are shared between threads and must be treated as read only.
+
+    A waiter gives up after `timeout` seconds and runs the function itself,
+    and a flight older than its timeout is no longer joined, so one stuck
+    query never blocks the callers behind it for longer than the timeout.
+    """
+
+    def __init__(self, timeout=5.0):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and time.monotonic() - call.started > timeout:
+                call = None
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if leader:
+            return self._run(key, call, fn)
+
+        if not call.done.wait(timeout):
+            logging.warning(f"single flight for {key} timed out after {timeout}s")
+            return fn()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def _run(self, key, call, fn):
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
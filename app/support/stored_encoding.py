@@ -0,0 +1,54 @@
+import zlib
+
+# text formats worth compressing at rest, everything else (images, archives,
+# office documents which are zip files already) is stored as uploaded
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/xml",
+    "application/javascript",
+    "application/x-yaml",
+    "application/yaml",
+    "application/sql",
+    "application/x-sql",
+    "image/svg+xml",
+)
+# gzip container for zlib
+GZIP_WBITS = 31
+
+
+def is_compressible(content_type):
+    if not content_type:
+        return False
+    content_type = content_type.split(";", 1)[0].strip().lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.endswith(
+        ("+json", "+xml")
+    )
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip a stream of chunks on the fly, in a single pass."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def gunzip_chunks(chunks, max_size=64 * 1024):
+    """
+    Decompress a gzipped stream of chunks, no output chunk exceeds
+    `max_size` however well the data compressed.
+    """
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    for chunk in chunks:
+        while chunk:
+            data = decompressor.decompress(chunk, max_size)
+            chunk = decompressor.unconsumed_tail
+            if data:
+                yield data
+    data = decompressor.flush()
+    if data:
+        yield data
@@ -0,0 +1,163 @@
+import logging
+import math
+import time
+from functools import wraps
+from http import HTTPStatus
+
+from flask import current_app, request
+
+from app.support.metrics import UPLOAD_QUOTA_DECISIONS
+from app.support.redis_client import get_redis
+from app.support.responses import json_response
+
+
+class QuotaExceeded(Exception):
+    """The upload would take the user over their quota."""
+
+    def __init__(self, retry_after):
+        super().__init__("Upload quota exceeded")
+        self.retry_after = retry_after
+
+
+class UploadQuota(object):
+    """
+    Bytes and files uploaded per user in fixed windows of
+    UPLOAD_QUOTA_WINDOW seconds, kept in a redis hash per user and window.
+
+    Requests declaring more bytes than the user has left are rejected before
+    their body is read. Streamed uploads are metered while they arrive, with
+    one pipelined HINCRBY round trip per UPLOAD_QUOTA_FLUSH_BYTES, and are
+    cut off once the quota is used up. The beat task `reconcile` resets the
+    counters of the current window to what the files table records.
+
+    Without redis, or while it fails, uploads are not limited.
+    """
+
+    def __init__(self, prefix="quota"):
+        self.prefix = prefix
+
+    def enforce(self, view_func):
+        """Reject uploads over quota early, goes below `api_token_required`."""
+
+        @wraps(view_func)
+        def decorated(current_user, *args, **kwargs):
+            declared = request.content_length or 0
+            try:
+                self.check(current_user["id"], declared)
+            except QuotaExceeded as e:
+                UPLOAD_QUOTA_DECISIONS.labels(result="rejected").inc()
+                return self.exceeded_response(e)
+            return view_func(current_user, *args, **kwargs)
+
+        return decorated
+
+    def check(self, user_id, size, files=1):
+        """Raise QuotaExceeded when `size` bytes and `files` more go over quota."""
+        client = self.client()
+        if client is None:
+            return
+        try:
+            used_bytes, used_files = client.hmget(self.key(user_id), "bytes", "files")
+        except Exception as e:
+            logging.error(f"upload quota unavailable: {e}")
+            return
+        self.verify(int(used_bytes or 0) + size, int(used_files or 0) + files)
+
+    def add(self, user_id, size, files=0):
+        """Count `size` bytes and `files` files, returns the new totals."""
+        client = self.client()
+        if client is None or (size == 0 and files == 0):
+            return None
+        key = self.key(user_id)
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.hincrby(key, "bytes", size)
+            pipe.hincrby(key, "files", files)
+            pipe.expire(key, self.window() * 2)
+            used_bytes, used_files, _ = pipe.execute()
+        except Exception as e:
+            logging.error(f"upload quota unavailable: {e}")
+            return None
+        return used_bytes, used_files
+
+    def meter(self, user_id, chunks):
+        """
+        Count the chunks of one file while they stream through, raising
+        QuotaExceeded mid-stream once the quota is used up.
+        """
+        flush_bytes = current_app.config["UPLOAD_QUOTA_FLUSH_BYTES"]
+        pending, files = 0, 1
+        for chunk in chunks:
+            pending += len(chunk)
+            if pending >= flush_bytes:
+                self.flush(user_id, pending, files)
+                pending, files = 0, 0
+            yield chunk
+        self.flush(user_id, pending, files)
+
+    def flush(self, user_id, size, files):
+        used = self.add(user_id, size, files)
+        if used is not None:
+            self.verify(*used)
+
+    def verify(self, used_bytes, used_files):
+        max_bytes = current_app.config["UPLOAD_QUOTA_BYTES"]
+        max_files = current_app.config["UPLOAD_QUOTA_FILES"]
+        if (max_bytes and used_bytes > max_bytes) or (
+            max_files and used_files > max_files
+        ):
+            raise QuotaExceeded(self.window_end() - time.time())
+
+    def reconcile(self, usage, now=None):
+        """
+        Overwrite the counters of the current window with `usage`,
+        {user_id: (bytes, files)} computed from the upload records.
+        """
+        client = self.client()
+        if client is None:
+            return 0
+        now = time.time() if now is None else now
+        window_start = self.window_start(now)
+        keys = {self.key(user_id, now): value for user_id, value in usage.items()}
+
+        pipe = client.pipeline(transaction=False)
+        # users without recorded uploads left counters of failed ones behind
+        for key in client.scan_iter(match=f"{self.prefix}:{window_start}:*"):
+            key = key.decode() if isinstance(key, bytes) else key
+            if key not in keys:
+                pipe.delete(key)
+        for key, (size, files) in keys.items():
+            pipe.hset(key, mapping={"bytes": int(size), "files": int(files)})
+            pipe.expire(key, self.window() * 2)
+        pipe.execute()
+        return len(keys)
+
+    def client(self):
+        if not current_app.config.get("UPLOAD_QUOTA_ENABLED"):
+            return None
+        return get_redis()
+
+    def key(self, user_id, now=None):
+        return f"{self.prefix}:{self.window_start(now)}:{user_id}"
+
+    def window(self):
+        return current_app.config["UPLOAD_QUOTA_WINDOW"]
+
+    def window_start(self, now=None):
+        now = time.time() if now is None else now
+        return int(now // self.window() * self.window())
+
+    def window_end(self):
+        return self.window_start() + self.window()
+
+    def exceeded_response(self, error):
+        response, status = json_response(
+            HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+            "failed",
+            "Upload quota exceeded, please try again later",
+        )
+        response.headers["Retry-After"] = str(max(math.ceil(error.retry_after), 1))
+        return response, status
+
+
+upload_quota = UploadQuota()
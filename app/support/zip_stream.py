@@ -0,0 +1,46 @@
+import zipfile
+
+
+class ZipSink(object):
+    """
+    Write only file object collecting what zipfile writes, so the archive
+    can be handed out chunk by chunk. zipfile detects it cannot seek and
+    writes sizes and CRCs in data descriptors after every entry instead.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+def zip_stream(entries, compress_level=1):
+    """
+    Generate a ZIP archive of `entries`, (name, size, chunks) tuples, while
+    reading them. Memory stays bounded by the size of the chunks however
+    large the archive gets. The size decides whether an entry needs ZIP64,
+    entries of unknown size always get it.
+    """
+    sink = ZipSink()
+    compression = zipfile.ZIP_DEFLATED if compress_level else zipfile.ZIP_STORED
+    with zipfile.ZipFile(
+        sink, "w", compression=compression, compresslevel=compress_level or None
+    ) as archive:
+        for name, size, chunks in entries:
+            # deflate may grow incompressible data a little
+            zip64 = size is None or size * 1.05 > zipfile.ZIP64_LIMIT
+            with archive.open(name, "w", force_zip64=zip64) as entry:
+                for chunk in chunks:
+                    entry.write(chunk)
+                    yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
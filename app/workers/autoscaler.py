@@ -0,0 +1,149 @@
+import logging
+from time import monotonic
+
+from celery.worker import state
+from celery.worker.autoscale import AUTOSCALE_KEEPALIVE, Autoscaler
+from prometheus_client import start_http_server
+
+from app.support.memory_profiler import current_rss
+from app.support.metrics import (
+    WORKER_POOL_PROCESSES,
+    WORKER_PROCESS_RSS,
+    WORKER_QUEUE_DEPTH,
+    WORKER_SCALING_DECISIONS,
+    WORKER_TASK_WAIT,
+)
+from config import Config
+
+
+# celery -A celery_worker.celery worker --autoscale=max,min, enabled by the
+# worker_autoscaler setting
+class QueueDepthAutoscaler(Autoscaler):
+    """
+    Sizes the pool by the tasks the worker holds plus the backlog of its
+    queues in the broker, and grows it by a process whenever a received task
+    waits longer than WORKER_AUTOSCALE_MAX_WAIT for one. Growth stops at the
+    number of processes of the current average RSS that fit in
+    WORKER_MEMORY_LIMIT. Shrinking keeps celery's keepalive delay.
+
+    Processes are recycled by celery itself, see worker_max_tasks_per_child
+    and worker_max_memory_per_child.
+    """
+
+    def __init__(
+        self,
+        pool,
+        max_concurrency,
+        min_concurrency=0,
+        worker=None,
+        keepalive=AUTOSCALE_KEEPALIVE,
+        mutex=None,
+    ):
+        super().__init__(
+            pool, max_concurrency, min_concurrency, worker, keepalive, mutex
+        )
+        self.depth_interval = Config.WORKER_AUTOSCALE_DEPTH_INTERVAL
+        self.max_wait = Config.WORKER_AUTOSCALE_MAX_WAIT
+        self.memory_limit = Config.WORKER_MEMORY_LIMIT
+        self.depth = 0
+        self._depth_checked = None
+        # request id: when the worker received it
+        self.received = {}
+        if Config.WORKER_METRICS_PORT:
+            start_http_server(Config.WORKER_METRICS_PORT)
+
+    def maybe_scale(self, req=None):
+        if req is not None:
+            self.received[req.id] = monotonic()
+        super().maybe_scale(req)
+        WORKER_POOL_PROCESSES.set(self.processes)
+
+    def _maybe_scale(self, req=None):
+        procs = self.processes
+        target = self.target(procs)
+        if target > procs:
+            self.scale_up(target - procs)
+            return True
+        if target < procs:
+            self.scale_down(procs - target)
+            return True
+
+    def target(self, procs):
+        """Processes the pool should have now."""
+        demand = self.qty + self.queue_depth()
+        if self.wait() > self.max_wait:
+            demand = max(demand, procs + 1)
+        demand = min(demand, self.max_concurrency)
+
+        fitting = self.fitting_processes()
+        if demand > procs and fitting < demand:
+            WORKER_SCALING_DECISIONS.labels(decision="memory_limited").inc()
+            demand = max(procs, fitting)
+        return max(demand, self.min_concurrency)
+
+    def queue_depth(self):
+        """Messages waiting in the consumed queues, refreshed every interval."""
+        now = monotonic()
+        if self._depth_checked and now - self._depth_checked < self.depth_interval:
+            return self.depth
+        self._depth_checked = now
+
+        app = self.worker.app
+        queues = app.amqp.queues.consume_from or app.amqp.queues
+        depth = 0
+        try:
+            with app.connection_for_read() as connection:
+                for name in queues:
+                    count = self.message_count(connection, name)
+                    WORKER_QUEUE_DEPTH.labels(queue=name).set(count)
+                    depth += count
+        except Exception as e:
+            # keep the last depth while the broker is unavailable
+            logging.warning(f"autoscaler cannot read queue depths: {e}")
+            return self.depth
+        self.depth = depth
+        return depth
+
+    def message_count(self, connection, name):
+        try:
+            channel = connection.default_channel
+            return channel.queue_declare(name, passive=True).message_count
+        except connection.channel_errors:
+            # not declared yet
+            return 0
+
+    def wait(self):
+        """Longest time a received task has been waiting for a process."""
+        reserved = {request.id for request in state.reserved_requests}
+        active = {request.id for request in state.active_requests}
+        self.received = {
+            id: received for id, received in self.received.items() if id in reserved
+        }
+        now = monotonic()
+        waits = [
+            now - received for id, received in self.received.items() if id not in active
+        ]
+        wait = max(waits, default=0.0)
+        WORKER_TASK_WAIT.set(wait)
+        return wait
+
+    def fitting_processes(self):
+        """Processes of the average size fitting in the memory limit."""
+        sizes = [
+            rss for rss in map(current_rss, self.pool.info.get("processes", [])) if rss
+        ]
+        if not sizes:
+            return self.max_concurrency
+        WORKER_PROCESS_RSS.set(max(sizes))
+        if not self.memory_limit:
+            return self.max_concurrency
+        available = self.memory_limit - (current_rss() or 0)
+        return max(int(available // (sum(sizes) / len(sizes))), 1)
+
+    def _grow(self, n):
+        WORKER_SCALING_DECISIONS.labels(decision="up").inc()
+        super()._grow(n)
+
+    def _shrink(self, n):
+        WORKER_SCALING_DECISIONS.labels(decision="down").inc()
+        super()._shrink(n)
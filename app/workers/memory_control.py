@@ -0,0 +1,18 @@
+from celery.worker.control import control_command
+
+from app.support.memory_profiler import DEFAULT_FRAMES, DEFAULT_LIMIT, memory_profiler
+
+
+# celery -A celery_worker.celery control memory_profile start
+# celery -A celery_worker.celery control memory_profile report 20
+# runs inside the worker consumer process, start the worker with `-P solo` or
+# `-P threads` to trace the memory used by the tasks themselves
+@control_command(
+    args=[("action", str), ("limit", int), ("frames", int)],
+    signature="[action [limit [frames]]]",
+)
+def memory_profile(state, action="report", limit=DEFAULT_LIMIT, frames=DEFAULT_FRAMES):
+    try:
+        return {"ok": memory_profiler.dispatch(action, limit=limit, frames=frames)}
+    except Exception as e:
+        return {"error": format(e)}
@@ -0,0 +1,12 @@
+from app import celery
+from app.support.outbox import outbox
+from config import Config
+
+
+# scheduled by celery beat every OUTBOX_RELAY_INTERVAL seconds
+@celery.task(acks_late=True)
+def relay_outbox():
+    """Publish the tasks written to the outbox and drop old published ones."""
+    published = outbox.relay(Config.OUTBOX_BATCH_SIZE)
+    outbox.purge(Config.OUTBOX_RETENTION)
+    return published
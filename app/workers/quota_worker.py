@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from sqlalchemy import func
+
+from app import celery
+from app.factory import db
+from app.models.file import File
+from app.support.upload_quota import upload_quota
+
+
+# scheduled by celery beat every UPLOAD_QUOTA_RECONCILE_INTERVAL seconds
+@celery.task(acks_late=True)
+def reconcile_upload_quotas():
+    """
+    Reset the upload quota counters of the current window to the files
+    recorded in it, forgiving aborted uploads and repairing lost increments.
+    """
+    window_start = datetime.utcfromtimestamp(upload_quota.window_start())
+    rows = (
+        db.session.query(File.user_id, func.sum(File.size), func.count(File.id))
+        .filter(File.created_at >= window_start)
+        .group_by(File.user_id)
+        .all()
+    )
+    return upload_quota.reconcile(
+        {user_id: (size or 0, count) for user_id, size, count in rows}
+    )
@@ -14,3 +14,13 @@ def user_email_worker(id):
         return False
 
     return True
+
+
+@celery.task(acks_late=True)
+def user_email_batch_worker(ids):
+    """Send the welcome email to many users over one SMTP connection."""
+    users = User.query.filter(User.id.in_(ids)).all()
+    result = Mailer.send_welcome_emails(users)
+    found = {user.id for user in users}
+    result["missing"] = [id for id in ids if id not in found]
+    return result
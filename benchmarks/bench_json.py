@@ -0,0 +1,95 @@
+"""
+Serialization benchmark for `getAllUsersAPI` pages.
+
+Compares the stdlib Flask JSON provider with the orjson backed provider on
+100 and 1000 user pages, from the `serialize` dicts to the response body.
+
+    python benchmarks/bench_json.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+for key, value in {
+    "SECRET_KEY": "bench-secret-key",
+    "DATABASE_URI": "sqlite:///:memory:",
+    "AWS_ACCESS_KEY": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+    "AWS_S3_BUCKET": "bench",
+    "AWS_S3_USER_FILE_FOLDER": "bench",
+    "CELERY_BROKER_URL": "memory://",
+    "CELERY_RESULT_BACKEND": "cache+memory://",
+    "SESSION_TIME": "3600",
+}.items():
+    os.environ.setdefault(key, value)
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from app.factory import create_app, db  # noqa: E402
+from app.models.role import Role  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.support.json_provider import OrjsonProvider  # noqa: E402
+
+PAGE_SIZES = [100, 1000]
+REPEAT = 5
+
+
+def build_page(page_size):
+    users = User.query.order_by(User.id.desc()).paginate(page=1, per_page=page_size)
+    return {
+        "status": "success",
+        "message": f"{len(users.items)} users fetched",
+        "users": [u.serialize for u in users.items],
+        "pagination": {
+            "total": users.total,
+            "page": 1,
+            "per_page": page_size,
+            "pages": users.pages,
+        },
+    }
+
+
+def run(provider, page, number):
+    timer = timeit.Timer(lambda: provider.response(page))
+    return min(timer.repeat(repeat=REPEAT, number=number)) / number
+
+
+def main():
+    app = create_app(
+        config_override={
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+            "SQLALCHEMY_ECHO": False,
+            "DEBUG": False,
+        }
+    )
+
+    with app.app_context():
+        db.create_all()
+        role = Role(name="manager")
+        db.session.add(role)
+        db.session.add_all(
+            User(name=f"user {i}", email=f"user{i}@bench.com", role=role)
+            for i in range(max(PAGE_SIZES))
+        )
+        db.session.commit()
+
+        stdlib = DefaultJSONProvider(app)
+        fast = OrjsonProvider(app)
+
+        print(f"{'page':>6} {'stdlib (ms)':>12} {'orjson (ms)':>12} {'speedup':>8}")
+        for page_size in PAGE_SIZES:
+            page = build_page(page_size)
+            number = max(1, 10000 // page_size)
+            stdlib_time = run(stdlib, page, number)
+            fast_time = run(fast, page, number)
+            print(
+                f"{page_size:>6} {stdlib_time * 1000:>12.3f} "
+                f"{fast_time * 1000:>12.3f} {stdlib_time / fast_time:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
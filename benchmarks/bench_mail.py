@@ -0,0 +1,76 @@
+"""
+Welcome email throughput against a local SMTP server (mailhog).
+
+Sends the welcome email to `count` users with one SMTP connection per
+message (`Mailer.send_welcome_email`) and with the batched sender sharing
+one connection (`Mailer.send_welcome_emails`).
+
+    docker compose up -d mailhog
+    MAIL_SERVER=localhost python benchmarks/bench_mail.py [count]
+"""
+
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+for key, value in {
+    "SECRET_KEY": "bench-secret-key",
+    "DATABASE_URI": "sqlite:///:memory:",
+    "AWS_ACCESS_KEY": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+    "AWS_S3_BUCKET": "bench",
+    "AWS_S3_USER_FILE_FOLDER": "bench",
+    "CELERY_BROKER_URL": "memory://",
+    "CELERY_RESULT_BACKEND": "cache+memory://",
+    "SESSION_TIME": "3600",
+    "MAIL_SERVER": "localhost",
+    "MAIL_DEFAULT_SENDER": "bench@bench.com",
+}.items():
+    os.environ.setdefault(key, value)
+
+from app.factory import create_app  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.support.mailer import Mailer  # noqa: E402
+
+COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+
+def main():
+    app = create_app(
+        config_override={
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+            "REDIS_URL": None,
+            "DEBUG": False,
+        }
+    )
+    users = [
+        User(id=i, name=f"bench {i}", email=f"bench{i}@bench.com") for i in range(COUNT)
+    ]
+
+    with app.app_context():
+        print(
+            f"{COUNT} messages to {app.config['MAIL_SERVER']}:{app.config['MAIL_PORT']}"
+        )
+
+        started = time.perf_counter()
+        with redirect_stdout(StringIO()):
+            for user in users:
+                Mailer.send_welcome_email(user)
+        single = time.perf_counter() - started
+
+        started = time.perf_counter()
+        result = Mailer.send_welcome_emails(users)
+        batched = time.perf_counter() - started
+        assert not result["failed"], result["failed"][:5]
+
+    print(f"{'':>12} {'seconds':>8} {'msg/s':>8}")
+    for name, elapsed in [("per message", single), ("batched", batched)]:
+        print(f"{name:>12} {elapsed:>8.2f} {COUNT / elapsed:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Auth decorator overhead of the token revocation check.
+
+Stores 1M revoked token ids, builds the per-worker Bloom filter from them
+and times the token check of `api_token_required` (`decode_jwt_token`) and
+the whole decorator on a token that was not revoked, with the revocation
+check disabled and enabled.
+
+    python benchmarks/bench_revocation.py [revoked]
+"""
+
+import os
+import sys
+import time
+import timeit
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+for key, value in {
+    "SECRET_KEY": "bench-secret-key",
+    "DATABASE_URI": "sqlite:///:memory:",
+    "AWS_ACCESS_KEY": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+    "AWS_S3_BUCKET": "bench",
+    "AWS_S3_USER_FILE_FOLDER": "bench",
+    "CELERY_BROKER_URL": "memory://",
+    "CELERY_RESULT_BACKEND": "cache+memory://",
+    "SESSION_TIME": "3600",
+}.items():
+    os.environ.setdefault(key, value)
+
+from app.factory import create_app, db  # noqa: E402
+from app.models.feature import Feature  # noqa: E402
+from app.models.feature_role import FeatureRole  # noqa: E402
+from app.models.revoked_token import RevokedToken  # noqa: E402
+from app.models.role import Role  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.support.auth_helper import (  # noqa: E402
+    api_token_required,
+    decode_jwt_token,
+    encode_jwt_token,
+)
+from app.support.revocation import revocation_list  # noqa: E402
+
+REVOKED = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+BATCH = 50_000
+NUMBER = 2000
+REPEAT = 5
+
+
+def seed_revocations(count):
+    expires_at = datetime.utcnow() + timedelta(days=30)
+    table = RevokedToken.__table__
+    for start in range(0, count, BATCH):
+        db.session.execute(
+            table.insert(),
+            [
+                {"jti": uuid.uuid4().hex, "expires_at": expires_at}
+                for _ in range(min(BATCH, count - start))
+            ],
+        )
+    db.session.commit()
+
+
+def run(app, call):
+    """Best per call time with the check disabled and enabled, interleaved."""
+    timings = {False: [], True: []}
+    for _ in range(REPEAT):
+        for enabled in timings:
+            app.config["REVOCATION_ENABLED"] = enabled
+            timings[enabled].append(timeit.timeit(call, number=NUMBER) / NUMBER)
+    return min(timings[False]), min(timings[True])
+
+
+def main():
+    app = create_app(
+        config_override={
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+            "SQLALCHEMY_ECHO": False,
+            "REDIS_URL": None,
+            "DEBUG": False,
+        }
+    )
+
+    with app.app_context():
+        db.create_all()
+        role = Role(name="admin")
+        feature = Feature(name="user_resource")
+        db.session.add_all([role, feature])
+        db.session.flush()
+        db.session.add(FeatureRole(role_id=role.id, feature_id=feature.id))
+        user = User(name="bench", email="bench@bench.com", role=role)
+        db.session.add(user)
+        db.session.commit()
+        token = encode_jwt_token(user)
+
+        started = time.perf_counter()
+        seed_revocations(REVOKED)
+        print(f"stored {REVOKED} revoked ids in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        bloom = revocation_list.rebuild()
+        print(
+            f"built filter in {time.perf_counter() - started:.1f}s: "
+            f"{bloom.size / 8 / 2**20:.1f} MiB, {bloom.hashes} hashes"
+        )
+
+        probes = [uuid.uuid4().hex for _ in range(100_000)]
+        positives = sum(probe in bloom for probe in probes)
+        print(f"false positive rate {positives / len(probes):.4%}")
+
+        view = api_token_required("user_resource")(lambda current_user: None)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        def request():
+            with app.test_request_context(headers=headers):
+                view()
+
+        request()  # warm the user and permission caches
+
+        print(f"{'':>10} {'disabled (us)':>14} {'enabled (us)':>13} {'overhead':>9}")
+        for name, call in [
+            ("token", lambda: decode_jwt_token(token)),
+            ("decorator", request),
+        ]:
+            disabled, enabled = run(app, call)
+            print(
+                f"{name:>10} {disabled * 1e6:>14.1f} {enabled * 1e6:>13.1f} "
+                f"{(enabled - disabled) * 1e6:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
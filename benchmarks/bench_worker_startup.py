@@ -0,0 +1,87 @@
+"""
+Cold start time of a celery worker process.
+
+Boots the worker app in fresh interpreters, once through the web factory
+(`create_app`, what celery_worker used before) and once through the worker
+factory (`create_worker_app`, what celery_worker uses now), and reports
+the wall time and the modules loaded. Interpreter startup is measured on
+its own and included in both.
+
+    python benchmarks/bench_worker_startup.py [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+ENV = {
+    "SECRET_KEY": "bench-secret-key",
+    "DATABASE_URI": "sqlite:///:memory:",
+    "AWS_ACCESS_KEY": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+    "AWS_S3_BUCKET": "bench",
+    "AWS_S3_USER_FILE_FOLDER": "bench",
+    "CELERY_BROKER_URL": "memory://",
+    "CELERY_RESULT_BACKEND": "cache+memory://",
+    "SESSION_TIME": "3600",
+}
+
+MODULES = "import sys; print(len(sys.modules))"
+PATHS = {
+    "interpreter": MODULES,
+    "create_app": f"""
+from app import celery
+from app.celery_utils import init_celery
+from app.factory import create_app
+from app.workers import memory_control, outbox_worker, quota_worker, user_worker
+init_celery(celery, create_app())
+{MODULES}
+""",
+    "worker app": f"""
+import celery_worker
+{MODULES}
+""",
+}
+
+
+def boot(code, env):
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return time.perf_counter() - started, int(output.split()[-1])
+
+
+def main():
+    env = dict(os.environ, **{k: os.environ.get(k, v) for k, v in ENV.items()})
+    # compile the bytecode once, the workers start from a built image
+    for code in PATHS.values():
+        boot(code, env)
+
+    timings = {name: [] for name in PATHS}
+    modules = {}
+    for _ in range(RUNS):
+        for name, code in PATHS.items():
+            elapsed, modules[name] = boot(code, env)
+            timings[name].append(elapsed)
+
+    print(f"{'':>12} {'median (ms)':>12} {'min (ms)':>9} {'modules':>8}")
+    for name, values in timings.items():
+        print(
+            f"{name:>12} {statistics.median(values) * 1e3:>12.0f} "
+            f"{min(values) * 1e3:>9.0f} {modules[name]:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,20 @@
 from app import celery
+from app.celery_queues import worker_settings
 from app.celery_utils import init_celery
-from app.factory import create_app
+from app.factory import create_worker_app
+from app.workers import (  # noqa: F401
+    memory_control,
+    outbox_worker,
+    quota_worker,
+    user_worker,
+)
+from config import Config
 
-app = create_app()
+app = create_worker_app()
 init_celery(celery, app)
+celery.conf.update(
+    worker_settings(Config.CELERY_WORKER_QUEUES.split(",")),
+    worker_autoscaler="app.workers.autoscaler:QueueDepthAutoscaler",
+    worker_max_tasks_per_child=Config.WORKER_MAX_TASKS_PER_CHILD,
+    worker_max_memory_per_child=Config.WORKER_MAX_MEMORY_PER_CHILD,
+)
@@ -36,10 +36,52 @@ class Config(object):
         os.environ.get("AWS_SECRET_ACCESS_KEY") or env_config["AWS_SECRET_ACCESS_KEY"]
     )
     AWS_S3_BUCKET = os.environ.get("AWS_S3_BUCKET") or env_config["AWS_S3_BUCKET"]
+    # botocore timeouts in seconds, shortened to the request deadline
+    AWS_S3_CONNECT_TIMEOUT = float(os.environ.get("AWS_S3_CONNECT_TIMEOUT", 5))
+    AWS_S3_READ_TIMEOUT = float(os.environ.get("AWS_S3_READ_TIMEOUT", 60))
+    # throttled calls are retried with jittered exponential backoff
+    AWS_S3_RETRY_ATTEMPTS = int(os.environ.get("AWS_S3_RETRY_ATTEMPTS", 3))
+    AWS_S3_RETRY_BASE_DELAY = float(os.environ.get("AWS_S3_RETRY_BASE_DELAY", 0.1))
+    AWS_S3_RETRY_MAX_DELAY = float(os.environ.get("AWS_S3_RETRY_MAX_DELAY", 2))
+    # consecutive failures opening the circuit of an operation, and seconds
+    # before it is probed again
+    AWS_S3_BREAKER_FAILURES = int(os.environ.get("AWS_S3_BREAKER_FAILURES", 5))
+    AWS_S3_BREAKER_RECOVERY = float(os.environ.get("AWS_S3_BREAKER_RECOVERY", 30))
     AWS_S3_USER_FILE_FOLDER = (
         os.environ.get("AWS_S3_USER_FILE_FOLDER")
         or env_config["AWS_S3_USER_FILE_FOLDER"]
     )
+    # uploads are piped from the request body to S3 in parts of this size
+    # (S3 needs at least 5 MiB), without spooling them to disk first
+    UPLOAD_STREAMING = os.environ.get("UPLOAD_STREAMING", "true").lower() in (
+        "true",
+        "1",
+        "t",
+    )
+    AWS_S3_MULTIPART_PART_SIZE = int(
+        os.environ.get("AWS_S3_MULTIPART_PART_SIZE", 8 * 1024 * 1024)
+    )
+    UPLOAD_READ_CHUNK_SIZE = int(os.environ.get("UPLOAD_READ_CHUNK_SIZE", 64 * 1024))
+    # streamed text uploads are stored gzipped
+    UPLOAD_COMPRESSION = os.environ.get("UPLOAD_COMPRESSION", "true").lower() in (
+        "true",
+        "1",
+        "t",
+    )
+    UPLOAD_COMPRESSION_LEVEL = int(os.environ.get("UPLOAD_COMPRESSION_LEVEL", 6))
+    # S3 key layout of new uploads: flat, hashed or hashed_date, lookups
+    # resolve files stored in any of them
+    AWS_S3_KEY_LAYOUT = os.environ.get("AWS_S3_KEY_LAYOUT", "hashed")
+    AWS_S3_KEY_PREFIX_LENGTH = int(os.environ.get("AWS_S3_KEY_PREFIX_LENGTH", 4))
+    # GET /api/files page sizes
+    FILES_PAGE_SIZE = int(os.environ.get("FILES_PAGE_SIZE", 20))
+    FILES_MAX_PAGE_SIZE = int(os.environ.get("FILES_MAX_PAGE_SIZE", 100))
+    # GET /api/files/bundle: files per archive, S3 read size and deflate
+    # level (0 stores the files as they are)
+    BUNDLE_MAX_FILES = int(os.environ.get("BUNDLE_MAX_FILES", 100))
+    BUNDLE_CHUNK_SIZE = int(os.environ.get("BUNDLE_CHUNK_SIZE", 64 * 1024))
+    BUNDLE_COMPRESS_LEVEL = int(os.environ.get("BUNDLE_COMPRESS_LEVEL", 1))
+    BUNDLE_DEADLINE = float(os.environ.get("BUNDLE_DEADLINE", 600))
     CELERY_BROKER_URL = (
         os.environ.get("CELERY_BROKER_URL") or env_config["CELERY_BROKER_URL"]
     )
@@ -47,7 +89,33 @@ class Config(object):
         os.environ.get("CELERY_RESULT_BACKEND") or env_config["CELERY_RESULT_BACKEND"]
     )
     SESSION_TIME = os.environ.get("SESSION_TIME") or env_config["SESSION_TIME"]
+    # web sessions and their tokens are re-issued once less than this many
+    # seconds remain, half the session time by default
+    SESSION_REFRESH_THRESHOLD = int(
+        os.environ.get("SESSION_REFRESH_THRESHOLD") or int(SESSION_TIME) // 2
+    )
     task_acks_late = True
+    # queues consumed by a worker started from celery_worker, comma separated,
+    # their concurrency and prefetch come from app/celery_queues.py; compose
+    # runs a worker per queue
+    CELERY_WORKER_QUEUES = os.environ.get("CELERY_WORKER_QUEUES", "default")
+    # pools started with --autoscale=max,min size themselves on the backlog
+    # of their queues, checked every DEPTH_INTERVAL seconds, and grow when a
+    # received task waits more than MAX_WAIT seconds for a process, as long
+    # as the processes fit in WORKER_MEMORY_LIMIT bytes (0 disables the cap)
+    WORKER_AUTOSCALE_DEPTH_INTERVAL = float(
+        os.environ.get("WORKER_AUTOSCALE_DEPTH_INTERVAL", 5)
+    )
+    WORKER_AUTOSCALE_MAX_WAIT = float(os.environ.get("WORKER_AUTOSCALE_MAX_WAIT", 2))
+    WORKER_MEMORY_LIMIT = int(os.environ.get("WORKER_MEMORY_LIMIT", 2400 * 1024**2))
+    # processes are replaced after this many tasks, or after a task leaves
+    # them over this many KiB of RSS
+    WORKER_MAX_TASKS_PER_CHILD = int(os.environ.get("WORKER_MAX_TASKS_PER_CHILD", 1000))
+    WORKER_MAX_MEMORY_PER_CHILD = int(
+        os.environ.get("WORKER_MAX_MEMORY_PER_CHILD", 512 * 1024)
+    )
+    # port serving the worker metrics (0 disables)
+    WORKER_METRICS_PORT = int(os.environ.get("WORKER_METRICS_PORT", 0))
 
     # Flask-Mail configuration
     MAIL_SERVER = os.environ.get("MAIL_SERVER", "mailhog")
@@ -56,3 +124,140 @@ class Config(object):
     MAIL_USERNAME = os.environ.get("MAIL_USERNAME")
     MAIL_PASSWORD = os.environ.get("MAIL_PASSWORD")
     MAIL_DEFAULT_SENDER = os.environ.get("MAIL_DEFAULT_SENDER")
+
+    # Response compression (gzip level 1-9, brotli quality 0-11)
+    COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "true").lower() in (
+        "true",
+        "1",
+        "t",
+    )
+    COMPRESSION_LEVEL = int(os.environ.get("COMPRESSION_LEVEL", 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", 4))
+    COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 500))
+
+    # Redis for shared state (caches, counters), defaults to the celery
+    # result backend when that one is a redis instance
+    REDIS_URL = (
+        os.environ.get("REDIS_URL")
+        or env_config.get("REDIS_URL")
+        or (
+            CELERY_RESULT_BACKEND if CELERY_RESULT_BACKEND.startswith("redis") else None
+        )
+    )
+    REDIS_SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT", 0.25))
+
+    # Read-through response cache
+    CACHE_ENABLED = os.environ.get("CACHE_ENABLED", "true").lower() in (
+        "true",
+        "1",
+        "t",
+    )
+    CACHE_TTL = int(os.environ.get("CACHE_TTL", 300))
+    CACHE_LOCK_TIMEOUT = float(os.environ.get("CACHE_LOCK_TIMEOUT", 5))
+    CACHE_LOCK_WAIT = float(os.environ.get("CACHE_LOCK_WAIT", 1))
+
+    # In-process caches kept coherent over redis pub/sub
+    INVALIDATION_BUS_ENABLED = os.environ.get(
+        "INVALIDATION_BUS_ENABLED", "true"
+    ).lower() in ("true", "1", "t")
+    LOCAL_CACHE_TTL = int(os.environ.get("LOCAL_CACHE_TTL", 60))
+
+    # Seconds a request waits on an identical in-flight lookup before running its own
+    SINGLE_FLIGHT_TIMEOUT = float(os.environ.get("SINGLE_FLIGHT_TIMEOUT", 5))
+
+    # Opt-in stateless authorization: tokens carry the role's features and
+    # permissions version and live for JWT_STATELESS_TTL minutes
+    JWT_STATELESS_AUTH = os.environ.get("JWT_STATELESS_AUTH", "false").lower() in (
+        "true",
+        "1",
+        "t",
+    )
+    JWT_STATELESS_TTL = int(os.environ.get("JWT_STATELESS_TTL", 15))
+
+    # Token revocation, checked against a per-worker Bloom filter that picks up
+    # new revocations every REFRESH_INTERVAL and is rebuilt every REBUILD_INTERVAL
+    REVOCATION_ENABLED = os.environ.get("REVOCATION_ENABLED", "true").lower() in (
+        "true",
+        "1",
+        "t",
+    )
+    REVOCATION_REFRESH_INTERVAL = float(
+        os.environ.get("REVOCATION_REFRESH_INTERVAL", 5)
+    )
+    REVOCATION_REBUILD_INTERVAL = float(
+        os.environ.get("REVOCATION_REBUILD_INTERVAL", 3600)
+    )
+    REVOCATION_BLOOM_CAPACITY = int(os.environ.get("REVOCATION_BLOOM_CAPACITY", 100000))
+    REVOCATION_BLOOM_ERROR_RATE = float(
+        os.environ.get("REVOCATION_BLOOM_ERROR_RATE", 0.001)
+    )
+
+    # Token bucket rate limits, "count/period" rules separated by ";"
+    RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() in (
+        "true",
+        "1",
+        "t",
+    )
+    RATE_LIMIT_TOKEN = os.environ.get("RATE_LIMIT_TOKEN", "10/minute;100/hour")
+    RATE_LIMIT_UPLOAD = os.environ.get("RATE_LIMIT_UPLOAD", "30/hour")
+    # while redis is failing each worker enforces its share of the limits locally
+    RATE_LIMIT_FALLBACK_SECONDS = float(
+        os.environ.get("RATE_LIMIT_FALLBACK_SECONDS", 5)
+    )
+    RATE_LIMIT_FALLBACK_WORKERS = int(
+        os.environ.get("RATE_LIMIT_FALLBACK_WORKERS")
+        or os.environ.get("WEB_CONCURRENCY", 1)
+    )
+
+    # Bytes and files each user may upload per window (0 disables a limit)
+    UPLOAD_QUOTA_ENABLED = os.environ.get("UPLOAD_QUOTA_ENABLED", "true").lower() in (
+        "true",
+        "1",
+        "t",
+    )
+    UPLOAD_QUOTA_WINDOW = int(os.environ.get("UPLOAD_QUOTA_WINDOW", 86400))
+    UPLOAD_QUOTA_BYTES = int(os.environ.get("UPLOAD_QUOTA_BYTES", 10 * 1024**3))
+    UPLOAD_QUOTA_FILES = int(os.environ.get("UPLOAD_QUOTA_FILES", 5000))
+    # streamed uploads update the counters every this many bytes
+    UPLOAD_QUOTA_FLUSH_BYTES = int(
+        os.environ.get("UPLOAD_QUOTA_FLUSH_BYTES", 8 * 1024 * 1024)
+    )
+    # seconds between the beat runs resetting the counters to the files table
+    UPLOAD_QUOTA_RECONCILE_INTERVAL = float(
+        os.environ.get("UPLOAD_QUOTA_RECONCILE_INTERVAL", 300)
+    )
+
+    # Tasks enqueued through the outbox table are published by a beat task
+    # every RELAY_INTERVAL seconds, BATCH_SIZE rows per transaction
+    OUTBOX_RELAY_INTERVAL = float(os.environ.get("OUTBOX_RELAY_INTERVAL", 1))
+    OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 100))
+    # published rows are deleted after this many seconds
+    OUTBOX_RETENTION = int(os.environ.get("OUTBOX_RETENTION", 86400))
+
+    # Adaptive concurrency limits per route class, requests over them get a 503
+    LOAD_SHEDDING_ENABLED = os.environ.get("LOAD_SHEDDING_ENABLED", "true").lower() in (
+        "true",
+        "1",
+        "t",
+    )
+    # requests a gunicorn worker serves at once, see compose/local/flask/start
+    WEB_THREADS = int(os.environ.get("WEB_THREADS", 4))
+    # more requests than threads never reach the app, a higher limit would
+    # not shed anything until it adapted down
+    LOAD_SHEDDING_INITIAL_LIMIT = int(
+        os.environ.get("LOAD_SHEDDING_INITIAL_LIMIT", WEB_THREADS)
+    )
+    LOAD_SHEDDING_MIN_LIMIT = int(os.environ.get("LOAD_SHEDDING_MIN_LIMIT", 2))
+    LOAD_SHEDDING_MAX_LIMIT = int(os.environ.get("LOAD_SHEDDING_MAX_LIMIT", 256))
+    # latency above TOLERANCE x the no-load latency (and above MIN_LATENCY
+    # seconds) shrinks the limits
+    LOAD_SHEDDING_TOLERANCE = float(os.environ.get("LOAD_SHEDDING_TOLERANCE", 2.0))
+    LOAD_SHEDDING_MIN_LATENCY = float(os.environ.get("LOAD_SHEDDING_MIN_LATENCY", 0.05))
+
+    # Seconds a request may take (0 disables), routes can set their own with
+    # @deadline and clients can shorten it with the header
+    REQUEST_DEADLINE = float(os.environ.get("REQUEST_DEADLINE", 30))
+    REQUEST_DEADLINE_HEADER = os.environ.get(
+        "REQUEST_DEADLINE_HEADER", "X-Request-Timeout"
+    )
+    UPLOAD_DEADLINE = float(os.environ.get("UPLOAD_DEADLINE", 600))
@@ -16,3 +16,8 @@ class FeatureRoleSeeder(Seeder):
         # Upload access
         user_admin = FeatureRole(feature=user_resource, role=admin)
         self.db.session.add(user_admin)
+
+        # Admin tooling access
+        admin_resource = Feature.query.filter_by(name="admin_resource").first()
+        admin_tools = FeatureRole(feature=admin_resource, role=admin)
+        self.db.session.add(admin_tools)
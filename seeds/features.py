@@ -11,3 +11,6 @@ class FeatureSeeder(Seeder):
     def run(self):
         user_resource = Feature(name="user_resource")
         self.db.session.add(user_resource)
+
+        admin_resource = Feature(name="admin_resource")
+        self.db.session.add(admin_resource)
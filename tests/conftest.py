@@ -45,6 +45,8 @@ def app():
             "SQLALCHEMY_TRACK_MODIFICATIONS": False,
             "CELERY_ALWAYS_EAGER": True,  # Run Celery tasks synchronously
             "CELERY_EAGER_PROPAGATES_EXCEPTIONS": True,
+            "REDIS_URL": None,  # Redis backed features use fakeredis in tests
+            "RATE_LIMIT_ENABLED": False,  # enabled by the rate limiter tests
         }
 
         # Create the app with test configuration override
@@ -62,9 +64,17 @@ def app():
             # Create test data
             _create_test_data()
 
+            # in-process caches outlive the app, start every test cold
+            from app.support.invalidation import invalidation_bus
+
+            invalidation_bus.flush_all()
+
             yield app
 
             # Clean up
+            from app.support.revocation import revocation_list
+
+            revocation_list.reset()
             db.session.remove()
             db.drop_all()
 
@@ -101,6 +111,15 @@ def auth_headers(client):
     return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
 
+@pytest.fixture
+def manager_headers(client):
+    """Get authentication headers for a user without admin access."""
+    response = client.post("/api/token", json={"email": "test@test.com"})
+    token = response.get_json()["token"]
+
+    return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+
+
 @pytest.fixture
 def sample_user_data():
     """Sample user data for testing."""
@@ -135,9 +154,11 @@ def _create_test_data():
         # Create features
         user_feature = Feature(name="user_resource")
         file_feature = Feature(name="file_resource")
+        admin_feature = Feature(name="admin_resource")
 
         db.session.add(user_feature)
         db.session.add(file_feature)
+        db.session.add(admin_feature)
         db.session.commit()
 
         # Create feature-role associations
@@ -147,9 +168,13 @@ def _create_test_data():
         admin_file_access = FeatureRole(
             feature_id=file_feature.id, role_id=admin_role.id
         )
+        admin_tools_access = FeatureRole(
+            feature_id=admin_feature.id, role_id=admin_role.id
+        )
 
         db.session.add(admin_user_access)
         db.session.add(admin_file_access)
+        db.session.add(admin_tools_access)
         db.session.commit()
 
         # Create test users
@@ -0,0 +1,130 @@
+from http import HTTPStatus
+
+import pytest
+
+from app.support.file_utils import get_unique_file_name
+from app.support.memory_profiler import memory_profiler
+
+
+@pytest.fixture
+def profiler():
+    """Make sure tracemalloc never leaks into other tests."""
+    memory_profiler.stop()
+    yield memory_profiler
+    memory_profiler.stop()
+
+
+@pytest.mark.unit
+class TestMemoryProfiler:
+    """Test cases for the tracemalloc based memory profiler."""
+
+    def test_report_requires_tracing(self, profiler):
+        """Test that reports are refused while tracemalloc is off."""
+        with pytest.raises(RuntimeError):
+            profiler.report()
+
+    def test_report_groups_by_app_module(self, profiler):
+        """Test allocations are attributed to modules under app/."""
+        profiler.start()
+        names = [get_unique_file_name(f"file{i}.csv", "Admin") for i in range(2000)]
+
+        report = profiler.report(limit=50)
+        modules = [entry["module"] for entry in report["modules"]]
+
+        assert report["tracing"] is True
+        assert "app.support.file_utils" in modules
+        assert all(module.startswith("app") for module in modules)
+        assert len(names) == 2000
+
+    def test_report_diffs_against_baseline(self, profiler):
+        """Test reports include diffs once a baseline snapshot exists."""
+        profiler.start()
+        profiler.snapshot()
+        names = [get_unique_file_name(f"file{i}.csv", "Admin") for i in range(2000)]
+
+        report = profiler.report(limit=50)
+        file_utils = next(
+            entry
+            for entry in report["modules"]
+            if entry["module"] == "app.support.file_utils"
+        )
+
+        assert report["baseline"] is True
+        assert file_utils["size_diff"] > 0
+        assert file_utils["count_diff"] > 0
+        assert len(names) == 2000
+
+    def test_dispatch_unknown_action(self, profiler):
+        """Test dispatch rejects unknown actions."""
+        with pytest.raises(ValueError):
+            profiler.dispatch("explode")
+
+
+@pytest.mark.api
+@pytest.mark.auth
+class TestAdminController:
+    """Test cases for admin controller endpoints."""
+
+    def test_memory_status_when_stopped(self, client, auth_headers, profiler):
+        """Test the memory endpoint reports the profiler status."""
+        response = client.get("/api/admin/memory", headers=auth_headers)
+        data = response.get_json()
+
+        assert response.status_code == HTTPStatus.OK
+        assert data["status"] == "success"
+        assert data["memory"]["tracing"] is False
+
+    def test_memory_start_snapshot_report_stop(self, client, auth_headers, profiler):
+        """Test switching the profiler on and off at runtime."""
+        response = client.post("/api/admin/memory/start", headers=auth_headers)
+        assert response.status_code == HTTPStatus.OK
+        assert response.get_json()["memory"]["tracing"] is True
+
+        response = client.post("/api/admin/memory/snapshot", headers=auth_headers)
+        assert response.status_code == HTTPStatus.OK
+        assert response.get_json()["memory"]["baseline"] is True
+
+        response = client.get("/api/admin/memory?limit=5", headers=auth_headers)
+        data = response.get_json()
+        assert response.status_code == HTTPStatus.OK
+        assert isinstance(data["memory"]["modules"], list)
+        assert len(data["memory"]["modules"]) <= 5
+
+        response = client.post("/api/admin/memory/stop", headers=auth_headers)
+        assert response.status_code == HTTPStatus.OK
+        assert response.get_json()["memory"]["tracing"] is False
+
+    def test_memory_unknown_action(self, client, auth_headers, profiler):
+        """Test unknown profiler actions."""
+        response = client.post("/api/admin/memory/explode", headers=auth_headers)
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        assert response.get_json()["status"] == "failed"
+
+    @pytest.mark.parametrize(
+        "query", ["limit=ten", "frames=1.5", "limit=0", "frames=0", "frames=70000"]
+    )
+    def test_memory_invalid_arguments(self, client, auth_headers, profiler, query):
+        """Test malformed or out of range numbers are bad requests."""
+        response = client.post(f"/api/admin/memory/start?{query}", headers=auth_headers)
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.get_json()["status"] == "failed"
+        assert profiler.is_tracing is False
+
+    @pytest.mark.parametrize("limit", ["0", "-1", "ten"])
+    def test_memory_report_invalid_limit(self, client, auth_headers, profiler, limit):
+        """Test reports refuse limits that are not positive numbers."""
+        profiler.start()
+
+        response = client.get(f"/api/admin/memory?limit={limit}", headers=auth_headers)
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.get_json()["status"] == "failed"
+
+    def test_memory_requires_admin_feature(self, client, manager_headers, profiler):
+        """Test users without admin_resource access are rejected."""
+        response = client.post("/api/admin/memory/start", headers=manager_headers)
+
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+        assert memory_profiler.is_tracing is False
@@ -0,0 +1,240 @@
+import time
+from unittest.mock import Mock, patch
+
+import jwt
+import pytest
+
+from app.models.feature import Feature
+from app.models.feature_role import FeatureRole
+from app.models.role import Role
+
+
+@pytest.fixture
+def stateless(app):
+    """Enable stateless authorization for the test."""
+    app.config["JWT_STATELESS_AUTH"] = True
+    yield app
+    app.config["JWT_STATELESS_AUTH"] = False
+
+
+def issue_token(client, email="admin@test.com"):
+    response = client.post("/api/token", json={"email": email})
+    return response.get_json()["token"]
+
+
+@pytest.mark.auth
+class TestStatelessAuthorization:
+    """Test cases for authorization from permission claims."""
+
+    def test_token_carries_permission_claims(self, client, stateless):
+        """Test stateless tokens embed features, version and a short expiry."""
+        token = issue_token(client)
+        payload = jwt.decode(token, options={"verify_signature": False})
+
+        assert payload["features"] == [
+            "admin_resource",
+            "file_resource",
+            "user_resource",
+        ]
+        assert (
+            payload["permVer"]
+            == Role.query.filter_by(name="admin").first().permissions_version
+        )
+        assert payload["exp"] - payload["iat"] == 15 * 60
+
+    def test_default_tokens_have_no_claims(self, client):
+        """Test tokens stay unchanged while the mode is off."""
+        payload = jwt.decode(issue_token(client), options={"verify_signature": False})
+
+        assert "features" not in payload
+        assert payload["exp"] - payload["iat"] == 30 * 24 * 3600
+
+    def test_authorizes_without_user_lookup(self, client, stateless):
+        """Test a current token is authorized from its claims alone."""
+        token = issue_token(client)
+
+        with (
+            patch(
+                "app.support.auth_helper.find_user_info",
+                side_effect=AssertionError("database lookup"),
+            ),
+            patch(
+                "app.support.auth_helper.find_user_permission",
+                side_effect=AssertionError("database lookup"),
+            ),
+        ):
+            response = client.get(
+                "/api/admin/cache", headers={"Authorization": f"Bearer {token}"}
+            )
+
+        assert response.status_code == 200
+
+    def test_missing_feature_is_denied(self, client, stateless):
+        """Test features absent from the claims are denied."""
+        token = issue_token(client, "test@test.com")
+
+        response = client.get(
+            "/api/admin/cache", headers={"Authorization": f"Bearer {token}"}
+        )
+
+        assert response.status_code == 401
+        assert "sufficient permission" in response.get_json()["message"]
+
+    def test_removed_grant_outdates_claims(self, client, stateless):
+        """Test revoking a feature bumps the version and falls back to the database."""
+        from app.factory import db
+
+        token = issue_token(client)
+        admin = Role.query.filter_by(name="admin").first()
+        version = admin.permissions_version
+        feature = Feature.query.filter_by(name="admin_resource").first()
+        db.session.delete(
+            FeatureRole.query.filter_by(role=admin, feature=feature).first()
+        )
+        db.session.commit()
+        db.session.refresh(admin)
+
+        assert admin.permissions_version == version + 1
+        response = client.get(
+            "/api/admin/cache", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 401
+
+    def test_version_bump_falls_back_to_database(self, client, stateless):
+        """Test a revoked role is looked up in the database again."""
+        from app.factory import db
+        from app.support.auth_helper import find_user_info
+        from app.support.permission_claims import revoke_role_claims
+
+        token = issue_token(client)
+        revoke_role_claims(Role.query.filter_by(name="admin").first())
+        db.session.commit()
+
+        with patch(
+            "app.support.auth_helper.find_user_info", side_effect=find_user_info
+        ) as lookup:
+            response = client.get(
+                "/api/admin/cache", headers={"Authorization": f"Bearer {token}"}
+            )
+
+        assert response.status_code == 200
+        assert lookup.called
+
+
+@pytest.fixture
+def web_client(app, client):
+    """Client with a web route protected by web_token_required."""
+    from app.support.auth_helper import web_token_required
+
+    app.add_url_rule(
+        "/web/profile",
+        "web_profile",
+        web_token_required("user_resource")(lambda current_user: current_user["email"]),
+    )
+    return client
+
+
+def open_session(client, expire_in):
+    token = issue_token(client)
+    with client.session_transaction() as session:
+        session["token"] = token
+        session["expire_at"] = int(time.time()) + expire_in
+    return token
+
+
+@pytest.mark.auth
+class TestWebTokenRequired:
+    """Test cases for sliding web sessions."""
+
+    def test_token_from_request_opens_session(self, web_client):
+        """Test a token passed in the url is stored in the session."""
+        token = issue_token(web_client)
+
+        response = web_client.get(f"/web/profile?token={token}")
+
+        assert response.data == b"admin@test.com"
+        with web_client.session_transaction() as session:
+            assert session["token"] == token
+            assert session["expire_at"] > time.time()
+
+    def test_fresh_session_is_not_rewritten(self, web_client):
+        """Test requests well within the session lifetime leave the cookie alone."""
+        open_session(web_client, 3600)
+
+        with patch("app.support.auth_helper.encode_jwt_token") as encode:
+            response = web_client.get("/web/profile")
+
+        assert response.data == b"admin@test.com"
+        assert "Set-Cookie" not in response.headers
+        encode.assert_not_called()
+
+    def test_session_near_expiry_slides(self, web_client):
+        """Test a session about to run out is extended without a new token."""
+        token = open_session(web_client, 60)
+
+        with patch("app.support.auth_helper.encode_jwt_token") as encode:
+            response = web_client.get("/web/profile")
+
+        assert "Set-Cookie" in response.headers
+        encode.assert_not_called()
+        with web_client.session_transaction() as session:
+            assert session["token"] == token
+            assert session["expire_at"] > time.time() + 3000
+
+    def test_token_near_expiry_is_reissued(self, web_client):
+        """Test a token about to expire is replaced."""
+        token = open_session(web_client, 31 * 24 * 3600)
+        # a minute before the 30 day token runs out
+        later = time.time() + 30 * 24 * 3600 - 60
+
+        with patch("app.support.auth_helper.time", Mock(time=lambda: later)):
+            web_client.get("/web/profile")
+
+        with web_client.session_transaction() as session:
+            assert session["token"] != token
+
+    def test_fresh_stateless_token_is_kept(self, web_client, stateless):
+        """Test short lived tokens are not reissued on every request."""
+        token = open_session(web_client, 3600)
+
+        with patch("app.support.auth_helper.encode_jwt_token") as encode:
+            response = web_client.get("/web/profile")
+
+        assert response.data == b"admin@test.com"
+        assert "Set-Cookie" not in response.headers
+        encode.assert_not_called()
+        with web_client.session_transaction() as session:
+            assert session["token"] == token
+
+    def test_stateless_token_reissued_in_second_half(self, web_client, stateless):
+        """Test short lived tokens are replaced once half their life is gone."""
+        token = open_session(web_client, 3600)
+        lifetime = web_client.application.config["JWT_STATELESS_TTL"] * 60
+        # the session cookie is signed with the real clock
+        later = time.time() + lifetime // 2 + 1
+
+        with patch("app.support.auth_helper.time", Mock(time=lambda: later)):
+            web_client.get("/web/profile")
+
+        with web_client.session_transaction() as session:
+            assert session["token"] != token
+
+    def test_expired_session_skips_lookups(self, web_client):
+        """Test an expired session is rejected before any database work."""
+        open_session(web_client, -1)
+
+        with (
+            patch(
+                "app.support.auth_helper.find_user_info",
+                side_effect=AssertionError("database lookup"),
+            ),
+            patch(
+                "app.support.auth_helper.render_template", return_value="login"
+            ) as render,
+        ):
+            response = web_client.get("/web/profile")
+
+        assert response.data == b"login"
+        assert "Session timeout" in render.call_args.kwargs["message"]
+        with web_client.session_transaction() as session:
+            assert "token" not in session
@@ -0,0 +1,199 @@
+import os
+import subprocess
+import sys
+from time import monotonic
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from celery import Celery
+from celery.utils.imports import symbol_by_name
+from prometheus_client import REGISTRY
+
+from app.celery_queues import QUEUES, configure_queues
+from app.workers.autoscaler import QueueDepthAutoscaler
+from app.workers.user_worker import user_email_worker
+from config import Config
+
+MiB = 1024**2
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakePool(object):
+    """Pool resized by the autoscaler, its processes are never started."""
+
+    def __init__(self, processes):
+        self.num_processes = processes
+
+    def grow(self, n):
+        self.num_processes += n
+
+    def shrink(self, n):
+        self.num_processes -= n
+
+    def maintain_pool(self):
+        pass
+
+    @property
+    def info(self):
+        return {"processes": list(range(1000, 1000 + self.num_processes))}
+
+
+class FakeRequest(object):
+    def __init__(self, id):
+        self.id = id
+
+
+def purge(app):
+    with app.connection_for_write() as connection:
+        for name in QUEUES:
+            try:
+                connection.default_channel.queue_purge(name)
+            except connection.channel_errors:
+                pass
+
+
+def decisions(decision):
+    value = REGISTRY.get_sample_value(
+        "worker_scaling_decisions_total", {"decision": decision}
+    )
+    return value or 0
+
+
+@pytest.fixture
+def broker():
+    """Celery app on the in-memory broker, whatever broker is configured."""
+    # the environment takes precedence over the configured broker and backend
+    with patch.dict(
+        os.environ,
+        {"CELERY_BROKER_URL": "memory://", "CELERY_RESULT_BACKEND": "cache+memory://"},
+    ):
+        app = Celery("test", broker="memory://", backend="cache+memory://")
+        configure_queues(app, app.conf.broker_url)
+        purge(app)
+        yield app
+        purge(app)
+
+
+@pytest.fixture
+def scaler(broker):
+    """Autoscaler of 1 to 4 processes reading the in-memory broker."""
+    pool = FakePool(1)
+    worker = SimpleNamespace(app=broker)
+    with (
+        patch.object(Config, "WORKER_MEMORY_LIMIT", 0),
+        patch("app.workers.autoscaler.state.reserved_requests", set()),
+        patch("app.workers.autoscaler.state.active_requests", set()),
+    ):
+        yield QueueDepthAutoscaler(pool, 4, 1, worker=worker, keepalive=30)
+
+
+def publish(app, count):
+    for i in range(count):
+        app.send_task(user_email_worker.name, args=[i])
+
+
+@pytest.mark.unit
+class TestQueueDepthAutoscaler:
+    """Test cases for sizing the worker pool on queue depth and memory."""
+
+    def test_grows_with_backlog(self, scaler):
+        """Test the pool grows to the messages waiting in the broker."""
+        publish(scaler.worker.app, 2)
+        before = decisions("up")
+
+        scaler.maybe_scale()
+
+        assert scaler.processes == 2
+        assert scaler.depth == 2
+        assert decisions("up") == before + 1
+        assert REGISTRY.get_sample_value("worker_pool_processes") == 2
+        assert REGISTRY.get_sample_value("worker_queue_depth", {"queue": "mail"}) == 2
+
+    def test_capped_at_max(self, scaler):
+        """Test the pool never grows over the autoscale maximum."""
+        publish(scaler.worker.app, 10)
+
+        scaler.maybe_scale()
+
+        assert scaler.processes == 4
+
+    def test_grows_when_tasks_wait(self, scaler):
+        """Test a task waiting too long for a process adds one."""
+        request = FakeRequest("late")
+        scaler.maybe_scale(request)
+        scaler.received["late"] = monotonic() - Config.WORKER_AUTOSCALE_MAX_WAIT - 1
+
+        with patch("app.workers.autoscaler.state.reserved_requests", {request}):
+            scaler.maybe_scale()
+
+        assert scaler.processes == 2
+
+    def test_memory_limit(self, scaler):
+        """Test growth stops at the processes fitting in the memory limit."""
+        publish(scaler.worker.app, 4)
+        scaler.memory_limit = 1000 * MiB
+        before = decisions("memory_limited")
+
+        with patch("app.workers.autoscaler.current_rss", return_value=300 * MiB):
+            scaler.maybe_scale()
+
+        # 700 MiB left next to the main process
+        assert scaler.processes == 2
+        assert decisions("memory_limited") == before + 1
+        assert REGISTRY.get_sample_value("worker_process_rss_bytes") == 300 * MiB
+
+    def test_shrinks_after_keepalive(self, scaler):
+        """Test idle processes are stopped once the keepalive passed."""
+        publish(scaler.worker.app, 3)
+        scaler.maybe_scale()
+        purge(scaler.worker.app)
+        scaler._depth_checked = None
+
+        scaler.maybe_scale()
+        assert scaler.processes == 3
+
+        scaler._last_scale_up -= 31
+        scaler._depth_checked = None
+        scaler.maybe_scale()
+        assert scaler.processes == 1
+
+    def test_depth_cached(self, scaler):
+        """Test the broker is asked for the depth once per interval."""
+        scaler.maybe_scale()
+        publish(scaler.worker.app, 3)
+
+        scaler.maybe_scale()
+
+        assert scaler.processes == 1
+
+    def test_broker_unavailable(self, scaler):
+        """Test the last depth is kept while the broker cannot be reached."""
+        scaler.depth = 2
+        with patch.object(
+            scaler.worker.app, "connection_for_read", side_effect=OSError("refused")
+        ):
+            scaler.maybe_scale()
+
+        assert scaler.processes == 2
+
+    def test_configured(self):
+        """Test workers pick the autoscaler and recycle their processes."""
+        code = (
+            "import celery_worker; conf = celery_worker.celery.conf; "
+            "print(conf.worker_autoscaler, conf.worker_max_tasks_per_child, "
+            "conf.worker_max_memory_per_child)"
+        )
+
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+
+        autoscaler, max_tasks, max_memory = output.split()
+        assert symbol_by_name(autoscaler) is QueueDepthAutoscaler
+        assert int(max_tasks) == Config.WORKER_MAX_TASKS_PER_CHILD
+        assert int(max_memory) == Config.WORKER_MAX_MEMORY_PER_CHILD
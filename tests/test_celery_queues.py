@@ -0,0 +1,111 @@
+import pytest
+from celery import Celery
+
+from app import celery
+from app.celery_queues import (
+    DEFAULT_QUEUE,
+    MAX_PRIORITY,
+    QUEUES,
+    ROUTES,
+    configure_queues,
+    worker_arguments,
+    worker_settings,
+)
+from app.workers.outbox_worker import relay_outbox
+from app.workers.quota_worker import reconcile_upload_quotas
+from app.workers.user_worker import user_email_batch_worker, user_email_worker
+
+
+def route(app, name):
+    return app.amqp.router.route({}, name)
+
+
+@pytest.fixture
+def memory_app():
+    """Celery app with the queue topology on a broker without priority steps."""
+    # CELERY_BROKER_URL takes precedence over the broker argument
+    app = Celery("test", broker="memory://")
+    configure_queues(app, "memory://")
+    return app
+
+
+@pytest.mark.unit
+class TestCeleryQueues:
+    """Test cases for the celery queue topology."""
+
+    def test_queues_declared(self):
+        """Test every queue is declared with priorities on its own exchange."""
+        queues = {queue.name: queue for queue in celery.conf.task_queues}
+
+        assert set(queues) == set(QUEUES)
+        for name, queue in queues.items():
+            assert queue.exchange.name == name
+            assert queue.routing_key == name
+            assert queue.max_priority == MAX_PRIORITY
+        assert celery.conf.task_default_queue == DEFAULT_QUEUE
+
+    @pytest.mark.parametrize(
+        "task, queue, priority",
+        [
+            (user_email_worker, "mail", 8),
+            (user_email_batch_worker, "mail", 3),
+            (relay_outbox, "maintenance", 9),
+            (reconcile_upload_quotas, "maintenance", 5),
+        ],
+    )
+    def test_task_routes(self, memory_app, task, queue, priority):
+        """Test tasks are routed to their queue with their priority."""
+        options = route(memory_app, task.name)
+
+        assert options["queue"].name == queue
+        assert options["priority"] == priority
+
+    def test_unrouted_and_pattern_routes(self):
+        """Test patterns match task names and other tasks go to the default."""
+        bulk = route(celery, "app.workers.spreadsheet_worker.export")
+
+        assert bulk["queue"].name == "bulk"
+        assert route(celery, "app.workers.other.task")["queue"].name == DEFAULT_QUEUE
+
+    def test_routes_target_declared_queues(self):
+        """Test no route names a queue that is not declared."""
+        assert {queue for queue, _ in ROUTES.values()} <= set(QUEUES)
+        assert all(0 <= priority <= MAX_PRIORITY for _, priority in ROUTES.values())
+
+    def test_redis_priorities_inverted(self):
+        """Test redis brokers get priority steps with the order reversed."""
+        app = Celery("test")
+        configure_queues(app, "redis://localhost:6379/0")
+
+        assert route(app, user_email_worker.name)["priority"] == MAX_PRIORITY - 8
+        options = app.conf.broker_transport_options
+        # queues are polled round robin, a busy queue never starves another
+        assert "queue_order_strategy" not in options
+        assert options["priority_steps"] == list(range(MAX_PRIORITY + 1))
+
+    def test_delivery_policies(self):
+        """Test tasks ack late and only idempotent ones redeliver on worker loss."""
+        assert user_email_worker.acks_late
+        assert not user_email_worker.reject_on_worker_lost
+        assert relay_outbox.acks_late
+        assert relay_outbox.reject_on_worker_lost
+
+    def test_worker_settings(self):
+        """Test workers take the concurrency and prefetch of their queues."""
+        assert worker_settings(["mail"]) == {
+            "worker_concurrency": QUEUES["mail"]["concurrency"],
+            "worker_prefetch_multiplier": QUEUES["mail"]["prefetch_multiplier"],
+        }
+        combined = worker_settings(["mail", "bulk"])
+        assert combined["worker_concurrency"] == (
+            QUEUES["mail"]["concurrency"] + QUEUES["bulk"]["concurrency"]
+        )
+        assert combined["worker_prefetch_multiplier"] == 1
+
+    def test_worker_arguments(self):
+        """Test a worker per queue is started with that queue's settings."""
+        assert worker_arguments(["mail"]) == [
+            f"--concurrency={QUEUES['mail']['concurrency']}",
+            f"--prefetch-multiplier={QUEUES['mail']['prefetch_multiplier']}",
+            f"--autoscale={QUEUES['mail']['concurrency']},1",
+        ]
@@ -0,0 +1,248 @@
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+from flask import request
+
+from app.support import circuit_breaker
+from app.support.circuit_breaker import CircuitBreaker, CircuitOpenError, retry
+from app.support.files_uploader import FilesUploader
+from app.support.s3 import S3_Client, breakers, is_outage, is_throttled
+from config import Config
+
+
+def client_error(code, status):
+    return ClientError(
+        {"Error": {"Code": code}, "ResponseMetadata": {"HTTPStatusCode": status}},
+        "PutObject",
+    )
+
+
+@pytest.fixture(autouse=True)
+def closed_breakers():
+    """Start and leave every S3 circuit closed."""
+    for breaker in breakers.values():
+        breaker.reset()
+    yield
+    for breaker in breakers.values():
+        breaker.reset()
+
+
+@pytest.fixture
+def no_sleep():
+    """Skip the backoff sleeps."""
+    with patch.object(circuit_breaker.time, "sleep") as sleep:
+        yield sleep
+
+
+@pytest.fixture
+def s3():
+    """S3 client with mocked botocore calls."""
+    client = S3_Client()
+    client.s3_client = MagicMock()
+    return client
+
+
+@pytest.mark.unit
+class TestCircuitBreaker:
+    """Test cases for the circuit breaker."""
+
+    def test_opens_after_failures(self):
+        """Test the circuit opens after consecutive failures and fails fast."""
+        breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=30)
+        failing = MagicMock(side_effect=ConnectionError("down"))
+
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                breaker.call(failing)
+        with pytest.raises(CircuitOpenError) as error:
+            breaker.call(failing)
+
+        assert failing.call_count == 2
+        assert 29 < error.value.retry_after <= 30
+        assert 29 < breaker.retry_after() <= 30
+
+    def test_success_resets_failures(self):
+        """Test only consecutive failures open the circuit."""
+        breaker = CircuitBreaker("test", failure_threshold=2)
+
+        with pytest.raises(ConnectionError):
+            breaker.call(MagicMock(side_effect=ConnectionError))
+        breaker.call(lambda: None)
+        with pytest.raises(ConnectionError):
+            breaker.call(MagicMock(side_effect=ConnectionError))
+
+        assert breaker.state == circuit_breaker.CLOSED
+
+    def test_half_open_probe_closes(self):
+        """Test a successful probe after the recovery timeout closes the circuit."""
+        breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0)
+        with pytest.raises(ConnectionError):
+            breaker.call(MagicMock(side_effect=ConnectionError))
+
+        assert breaker.call(lambda: "ok") == "ok"
+        assert breaker.state == circuit_breaker.CLOSED
+
+    def test_half_open_probe_reopens(self):
+        """Test a failed probe opens the circuit again."""
+        breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=0)
+        for _ in range(3):
+            with pytest.raises(ConnectionError):
+                breaker.call(MagicMock(side_effect=ConnectionError))
+
+        breaker.recovery_timeout = 30
+        breaker._opened_at = 0.0
+        with pytest.raises(ConnectionError):
+            breaker.call(MagicMock(side_effect=ConnectionError))
+
+        assert breaker.state == circuit_breaker.OPEN
+
+    def test_ignored_errors_do_not_count(self):
+        """Test errors rejected by is_failure leave the circuit closed."""
+        breaker = CircuitBreaker("test", failure_threshold=1, is_failure=is_outage)
+
+        with pytest.raises(ClientError):
+            breaker.call(MagicMock(side_effect=client_error("NoSuchKey", 404)))
+
+        assert breaker.state == circuit_breaker.CLOSED
+
+
+@pytest.mark.unit
+class TestRetry:
+    """Test cases for jittered retries."""
+
+    def test_retries_throttling(self, no_sleep):
+        """Test throttled calls are retried with delays under the backoff cap."""
+        fn = MagicMock(side_effect=[client_error("SlowDown", 503), "ok"])
+
+        assert retry(fn, is_throttled, attempts=3, base_delay=0.1) == "ok"
+        assert fn.call_count == 2
+        assert 0 <= no_sleep.call_args[0][0] <= 0.1
+
+    def test_gives_up_after_attempts(self, no_sleep):
+        """Test the last error is raised once the attempts are used up."""
+        fn = MagicMock(side_effect=client_error("SlowDown", 503))
+
+        with pytest.raises(ClientError):
+            retry(fn, is_throttled, attempts=3)
+
+        assert fn.call_count == 3
+
+    def test_other_errors_are_not_retried(self, no_sleep):
+        """Test errors that are not throttling fail immediately."""
+        fn = MagicMock(side_effect=client_error("AccessDenied", 403))
+
+        with pytest.raises(ClientError):
+            retry(fn, is_throttled, attempts=3)
+
+        assert fn.call_count == 1
+
+
+@pytest.mark.unit
+class TestS3Client:
+    """Test cases for the S3 client failure handling."""
+
+    def test_put_rewinds_body_on_retry(self, s3, no_sleep):
+        """Test a retried upload sends the whole body again."""
+        bodies = []
+
+        def put_object(Body, **kwargs):
+            bodies.append(Body.read())
+            if len(bodies) == 1:
+                raise client_error("SlowDown", 503)
+            return {"ResponseMetadata": {"HTTPStatusCode": 200}}
+
+        s3.s3_client.put_object.side_effect = put_object
+
+        response = s3.put_object("files/a.txt", "a.txt", BytesIO(b"content"))
+
+        assert response["status"] == 200
+        assert response["filename"] == "a.txt"
+        assert bodies == [b"content", b"content"]
+
+    def test_circuit_opens_on_outage(self, s3, no_sleep):
+        """Test S3 is not called anymore once its circuit is open."""
+        s3.s3_client.head_object.side_effect = EndpointConnectionError(
+            endpoint_url="https://s3"
+        )
+
+        for _ in range(breakers["head"].failure_threshold):
+            with pytest.raises(EndpointConnectionError):
+                s3.file_not_found("files/a.txt")
+        with pytest.raises(CircuitOpenError):
+            s3.file_not_found("files/a.txt")
+
+        assert s3.s3_client.head_object.call_count == breakers["head"].failure_threshold
+        assert breakers["head"].state == circuit_breaker.OPEN
+        assert breakers["get"].state == circuit_breaker.CLOSED
+
+    def test_only_404_is_not_found(self, s3):
+        """Test a missing key is told apart from a failing S3."""
+        s3.s3_client.head_object.side_effect = client_error("NoSuchKey", 404)
+        assert s3.file_not_found("files/a.txt") is True
+
+        s3.s3_client.head_object.side_effect = client_error("InternalError", 500)
+        with pytest.raises(ClientError):
+            s3.file_not_found("files/a.txt")
+
+    def test_get_object_is_one_call(self, s3):
+        """Test objects are read with a single GetObject."""
+        s3.s3_client.get_object.return_value = {"ContentLength": 1}
+
+        assert s3.get_object("files/a.txt") == {"ContentLength": 1}
+        s3.s3_client.head_object.assert_not_called()
+
+    def test_put_errors_are_raised(self, s3):
+        """Test failed uploads are raised to the caller."""
+        s3.s3_client.put_object.side_effect = client_error("AccessDenied", 403)
+
+        with pytest.raises(ClientError):
+            s3.put_object("files/a.txt", "a.txt", BytesIO(b"content"))
+
+
+@pytest.mark.unit
+class TestFilesUploaderFailures:
+    """Test cases for reporting failed uploads."""
+
+    def perform(self, app):
+        data = {
+            "docs": [(BytesIO(b"a"), "a.txt"), (BytesIO(b"b"), "b.txt")],
+        }
+        with (
+            app.test_request_context(
+                "/", method="POST", data=data, content_type="multipart/form-data"
+            ),
+            patch.object(Config, "UPLOAD_STREAMING", False),
+        ):
+            return FilesUploader(request, {"id": 1, "name": "admin"}).perform()
+
+    def test_failed_files_are_reported(self, app):
+        """Test uploads failing on S3 return 502 with the failed files."""
+
+        def put(file_type, file_name, file_obj, user_name):
+            if file_name == "b.txt":
+                raise client_error("InternalError", 500)
+            return {"filename": f"x_{file_name}", "key": f"d/x_{file_name}"}
+
+        with patch("app.support.files_uploader.put_object_to_s3", side_effect=put):
+            response, status = self.perform(app)
+
+        assert status == 502
+        assert response.get_json()["failed_files"] == ["b.txt"]
+        assert response.get_json()["file_names"] == {"docs": ["x_a.txt", "b.txt"]}
+        assert "Retry-After" not in response.headers
+
+    def test_open_circuit_sets_retry_after(self, app):
+        """Test clients are told when to retry while S3 is unavailable."""
+        breakers["put"].transition(circuit_breaker.OPEN)
+        breakers["put"]._opened_at = circuit_breaker.time.monotonic()
+
+        with patch(
+            "app.support.files_uploader.put_object_to_s3",
+            side_effect=CircuitOpenError("s3.put", 30),
+        ):
+            response, status = self.perform(app)
+
+        assert status == 502
+        assert int(response.headers["Retry-After"]) == 30
@@ -0,0 +1,118 @@
+import gzip
+import zlib
+from http import HTTPStatus
+
+import pytest
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
+from app.support.compression import CompressionMiddleware
+
+BODY = b'{"status": "success", "users": []}' * 100
+
+
+def make_client(response, **kwargs):
+    def wsgi_app(environ, start_response):
+        return response(environ, start_response)
+
+    return Client(CompressionMiddleware(wsgi_app, **kwargs))
+
+
+@pytest.mark.unit
+class TestCompressionMiddleware:
+    """Test cases for the response compression middleware."""
+
+    def test_gzip_large_body(self):
+        """Test bodies above the threshold are gzipped."""
+        client = make_client(Response(BODY, mimetype="application/json"))
+
+        response = client.get("/", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert "Content-Length" not in response.headers
+        assert gzip.decompress(response.get_data()) == BODY
+
+    def test_small_body_skipped(self):
+        """Test bodies below the threshold are sent uncompressed."""
+        client = make_client(Response(b"{}", mimetype="application/json"))
+
+        response = client.get("/", headers={"Accept-Encoding": "gzip"})
+
+        assert "Content-Encoding" not in response.headers
+        assert response.get_data() == b"{}"
+
+    def test_no_accept_encoding(self):
+        """Test clients that do not accept gzip get the raw body."""
+        client = make_client(Response(BODY, mimetype="application/json"))
+
+        response = client.get("/")
+
+        assert "Content-Encoding" not in response.headers
+        assert response.get_data() == BODY
+
+    def test_compressed_content_type_skipped(self):
+        """Test already compressed content types are left alone."""
+        client = make_client(Response(BODY, mimetype="application/zip"))
+
+        response = client.get("/", headers={"Accept-Encoding": "gzip"})
+
+        assert "Content-Encoding" not in response.headers
+        assert response.get_data() == BODY
+
+    def test_streamed_body_compressed_incrementally(self):
+        """Test streamed responses yield a compressed chunk per body chunk."""
+        chunks = [BODY[:1000], BODY[1000:2000], BODY[2000:]]
+        client = make_client(
+            Response(iter(chunks), mimetype="application/json", direct_passthrough=True)
+        )
+
+        response = client.get("/", headers={"Accept-Encoding": "gzip"}, buffered=False)
+        compressed = list(response.response)
+        response.close()
+
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert len(compressed) >= len(chunks)
+
+        decompressor = zlib.decompressobj(31)
+        # the first chunk is readable before the stream has finished
+        assert decompressor.decompress(compressed[0]) == chunks[0]
+        rest = b"".join(decompressor.decompress(c) for c in compressed[1:])
+        assert chunks[0] + rest == BODY
+
+    def test_compression_level(self):
+        """Test the configured level is used."""
+        fast = make_client(Response(BODY, mimetype="application/json"), level=1)
+        best = make_client(Response(BODY, mimetype="application/json"), level=9)
+        headers = {"Accept-Encoding": "gzip"}
+
+        fast_body = fast.get("/", headers=headers).get_data()
+        best_body = best.get("/", headers=headers).get_data()
+
+        assert gzip.decompress(fast_body) == gzip.decompress(best_body) == BODY
+        assert len(best_body) <= len(fast_body)
+
+    def test_brotli_preferred_when_available(self):
+        """Test brotli is negotiated when installed and accepted."""
+        brotli = pytest.importorskip("brotli")
+        client = make_client(Response(BODY, mimetype="application/json"))
+
+        response = client.get("/", headers={"Accept-Encoding": "gzip, br"})
+
+        assert response.headers["Content-Encoding"] == "br"
+        assert brotli.decompress(response.get_data()) == BODY
+
+    def test_registered_on_app(self, app, client, auth_headers):
+        """Test the middleware wraps the application from the config."""
+        headers = dict(auth_headers, **{"Accept-Encoding": "gzip"})
+
+        response = client.get("/api/users/1", headers=headers)
+
+        # wrapped by the load shedding middleware
+        compression = app.wsgi_app.wsgi_app
+        assert isinstance(compression, CompressionMiddleware)
+        assert compression.min_size == app.config["COMPRESSION_MIN_SIZE"]
+        assert response.status_code == HTTPStatus.OK
+        # single user payloads stay below the default threshold
+        assert "Content-Encoding" not in response.headers
+        assert response.get_json()["status"] == "success"
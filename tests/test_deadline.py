@@ -0,0 +1,156 @@
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.support import deadline
+from app.support.s3 import S3_Client
+
+
+@pytest.fixture
+def deadline_app(app):
+    """App with routes reporting and overrunning their deadline."""
+    from app.models.user import User
+
+    app.add_url_rule(
+        "/deadline/remaining",
+        "deadline_remaining",
+        lambda: {"remaining": deadline.remaining()},
+    )
+    app.add_url_rule(
+        "/deadline/route",
+        "deadline_route",
+        deadline.deadline(120)(lambda: {"remaining": deadline.remaining()}),
+    )
+
+    def slow_query():
+        time.sleep(0.05)
+        User.query.count()
+        return "done"
+
+    def swallowed():
+        time.sleep(0.05)
+        try:
+            User.query.count()
+        except Exception as e:
+            return {"status": "failed", "message": str(e)}, 400
+        return "done"
+
+    app.add_url_rule("/deadline/slow", "deadline_slow", slow_query)
+    app.add_url_rule("/deadline/swallowed", "deadline_swallowed", swallowed)
+    return app
+
+
+@pytest.mark.unit
+class TestDeadline:
+    """Test cases for request deadlines."""
+
+    def test_default_deadline(self, client, deadline_app):
+        """Test requests get the configured default deadline."""
+        remaining = client.get("/deadline/remaining").get_json()["remaining"]
+
+        assert 29 < remaining <= 30
+
+    def test_header_shortens_deadline(self, client, deadline_app):
+        """Test clients can shorten the deadline with the header."""
+        response = client.get(
+            "/deadline/remaining", headers={"X-Request-Timeout": "2.5"}
+        )
+
+        assert 2 < response.get_json()["remaining"] <= 2.5
+
+    def test_header_cannot_extend_deadline(self, client, deadline_app):
+        """Test the header never extends the route deadline."""
+        response = client.get(
+            "/deadline/remaining", headers={"X-Request-Timeout": "3600"}
+        )
+
+        assert response.get_json()["remaining"] <= 30
+
+    def test_route_deadline(self, client, deadline_app):
+        """Test routes can set their own deadline."""
+        remaining = client.get("/deadline/route").get_json()["remaining"]
+
+        assert 119 < remaining <= 120
+
+    def test_queries_after_deadline_are_cancelled(self, client, deadline_app):
+        """Test no query runs once the deadline passed."""
+        response = client.get("/deadline/slow", headers={"X-Request-Timeout": "0.01"})
+
+        assert response.status_code == 504
+        assert response.get_json() == {
+            "status": "failed",
+            "message": "Request deadline exceeded",
+        }
+
+    def test_swallowed_errors_become_timeouts(self, client, deadline_app):
+        """Test error responses caused by the deadline are reported as 504."""
+        response = client.get(
+            "/deadline/swallowed", headers={"X-Request-Timeout": "0.01"}
+        )
+
+        assert response.status_code == 504
+
+    def test_deadline_cleared_after_request(self, client, deadline_app):
+        """Test the deadline does not leak out of the request."""
+        client.get("/deadline/remaining")
+
+        assert deadline.remaining() is None
+
+    def test_mysql_select_hint(self):
+        """Test MySQL SELECTs get a max execution time hint."""
+        conn = MagicMock()
+        conn.dialect.name = "mysql"
+
+        with deadline.scoped(time.monotonic() + 2):
+            statement, _ = deadline.apply_statement_timeout(
+                conn, None, "SELECT * FROM users", {}, None, False
+            )
+            update, _ = deadline.apply_statement_timeout(
+                conn, None, "UPDATE users SET name = 'x'", {}, None, False
+            )
+
+        assert statement.startswith("SELECT /*+ MAX_EXECUTION_TIME(")
+        assert 1900 < int(statement.split("(")[1].split(")")[0]) <= 2000
+        assert update == "UPDATE users SET name = 'x'"
+
+    def test_s3_timeouts_follow_deadline(self):
+        """Test botocore timeouts are shortened to the remaining time."""
+        with deadline.scoped(time.monotonic() + 1.5):
+            config = S3_Client().s3_client.meta.config
+
+        assert config.read_timeout <= 1.5
+        assert config.connect_timeout <= 1.5
+        assert config.retries["total_max_attempts"] == 1
+
+    def test_s3_timeouts_follow_deadline_per_call(self):
+        """Test later calls of a client get the time left at the call."""
+        with deadline.scoped(time.monotonic() + 1.5):
+            client = S3_Client()
+        with deadline.scoped(time.monotonic() + 0.5):
+            config = client.call("get", lambda: client.s3_client.meta.config)
+
+        assert config.read_timeout <= 0.5
+        assert config.connect_timeout <= 0.5
+
+    def test_s3_client_kept_without_deadline(self):
+        """Test clients are only rebuilt while a deadline is active."""
+        client = S3_Client()
+        s3_client = client.s3_client
+
+        client.call("get", lambda: None)
+
+        assert client.s3_client is s3_client
+
+    def test_s3_timeouts_without_deadline(self):
+        """Test the configured timeouts apply outside requests."""
+        config = S3_Client().s3_client.meta.config
+
+        assert config.read_timeout == 60
+        assert config.connect_timeout == 5
+
+    def test_s3_call_after_deadline(self):
+        """Test no S3 call is started once the deadline passed."""
+        with deadline.scoped(time.monotonic() - 1):
+            with pytest.raises(deadline.DeadlineExceeded):
+                S3_Client()
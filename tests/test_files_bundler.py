@@ -0,0 +1,156 @@
+import zipfile
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+
+import pytest
+from botocore.response import StreamingBody
+
+from app.support.circuit_breaker import CircuitOpenError
+from app.support.zip_stream import zip_stream
+from config import Config
+
+FOLDER = Config.AWS_S3_USER_FILE_FOLDER
+STORED = {
+    f"{FOLDER}/a.txt": b"first file",
+    f"{FOLDER}/b.csv": b"id,name\n" * 5000,
+    f"{FOLDER}/c.txt": b"another user's file",
+}
+
+
+@pytest.fixture
+def stored_files(app):
+    """Files recorded for the admin user, and one of another user."""
+    from app.factory import db
+    from app.models.file import File
+    from app.models.user import User
+
+    admin = User.query.filter_by(email="admin@test.com").first()
+    other = User.query.filter_by(email="test@test.com").first()
+    for key, body in STORED.items():
+        db.session.add(
+            File(
+                key=key,
+                name=key.rsplit("/", 1)[1],
+                file_type="user_file",
+                size=len(body),
+                user_id=other.id if key.endswith("c.txt") else admin.id,
+            )
+        )
+    db.session.commit()
+
+
+@pytest.fixture
+def s3_client(stored_files):
+    """S3 client serving the stored files by key."""
+    client = MagicMock()
+    client.call.side_effect = lambda operation, fn: fn()
+
+    def get_object(Bucket, Key):
+        body = STORED[Key]
+        return {
+            "ContentLength": len(body),
+            "Body": StreamingBody(BytesIO(body), len(body)),
+        }
+
+    client.s3_client.get_object.side_effect = get_object
+    with patch("app.support.files_bundler.S3_Client", return_value=client):
+        yield client
+
+
+@pytest.mark.unit
+class TestZipStream:
+    """Test cases for generating ZIP archives on the fly."""
+
+    def test_archive_is_generated_lazily(self):
+        """Test entries are read one at a time while the archive is produced."""
+        opened = []
+
+        def entries():
+            for name in ("a.txt", "b.txt"):
+                opened.append(name)
+                yield name, 6, iter([b"abc", b"def"])
+
+        archive = zip_stream(entries())
+        first = next(archive)
+
+        assert opened == ["a.txt"]
+        data = first + b"".join(archive)
+        with zipfile.ZipFile(BytesIO(data)) as zf:
+            assert zf.namelist() == ["a.txt", "b.txt"]
+            assert zf.read("b.txt") == b"abcdef"
+            assert zf.testzip() is None
+
+    def test_stored_without_compression(self):
+        """Test level 0 stores the files as they are."""
+        data = b"".join(zip_stream([("a.txt", 3, [b"abc"])], compress_level=0))
+
+        with zipfile.ZipFile(BytesIO(data)) as zf:
+            assert zf.getinfo("a.txt").compress_type == zipfile.ZIP_STORED
+            assert zf.read("a.txt") == b"abc"
+
+
+@pytest.mark.api
+class TestFilesBundle:
+    """Test cases for the bundle download endpoint."""
+
+    def test_bundle(self, client, auth_headers, s3_client):
+        """Test the selected files are streamed as one ZIP archive."""
+        response = client.get(
+            "/api/files/bundle?names=a.txt,b.csv&names=a.txt", headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        assert response.mimetype == "application/zip"
+        assert "files.zip" in response.headers["Content-Disposition"]
+        assert response.is_streamed
+        with zipfile.ZipFile(BytesIO(response.data)) as zf:
+            assert zf.namelist() == ["a.txt", "b.csv"]
+            assert zf.read("b.csv") == STORED[f"{FOLDER}/b.csv"]
+
+    def test_missing_files(self, client, auth_headers, s3_client):
+        """Test nothing is streamed when a file does not exist."""
+        response = client.get(
+            "/api/files/bundle?names=a.txt,missing.txt", headers=auth_headers
+        )
+
+        assert response.status_code == 404
+        assert response.get_json()["missing_files"] == ["missing.txt"]
+        s3_client.s3_client.get_object.assert_not_called()
+
+    def test_files_of_other_users(self, client, auth_headers, s3_client):
+        """Test files recorded for another user are not bundled."""
+        response = client.get(
+            "/api/files/bundle?names=a.txt,c.txt", headers=auth_headers
+        )
+
+        assert response.status_code == 404
+        assert response.get_json()["missing_files"] == ["c.txt"]
+        s3_client.s3_client.get_object.assert_not_called()
+
+    def test_bodies_are_read_by_recorded_key(self, client, auth_headers, s3_client):
+        """Test each body is read with a single GET of its recorded key."""
+        response = client.get(
+            "/api/files/bundle?names=a.txt,b.csv", headers=auth_headers
+        )
+        response.data
+
+        assert [
+            c.kwargs["Key"] for c in s3_client.s3_client.get_object.call_args_list
+        ] == [f"{FOLDER}/a.txt", f"{FOLDER}/b.csv"]
+        s3_client.exists.assert_not_called()
+        s3_client.s3_client.head_object.assert_not_called()
+
+    def test_no_names(self, client, auth_headers, s3_client):
+        """Test a file selection is required."""
+        response = client.get("/api/files/bundle", headers=auth_headers)
+
+        assert response.status_code == 422
+
+    def test_storage_unavailable(self, client, auth_headers, s3_client):
+        """Test an open S3 circuit is reported before streaming starts."""
+        s3_client.call.side_effect = CircuitOpenError("s3.get", 12.5)
+
+        response = client.get("/api/files/bundle?names=a.txt", headers=auth_headers)
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "13"
@@ -1,3 +1,4 @@
+import hashlib
 from http import HTTPStatus
 from io import BytesIO
 from unittest.mock import MagicMock, patch
@@ -221,3 +222,106 @@ class TestFilesController:
             assert response.status_code == HTTPStatus.INTERNAL_SERVER_ERROR
             assert response.json["status"] == "failed"
             assert "Empty file not allowed" in response.json["message"]
+
+
+@pytest.fixture
+def stored_files(app):
+    """Files of the admin user spread over a few timestamps, and one of another user."""
+    from datetime import datetime, timedelta
+
+    from app.factory import db
+    from app.models.file import File
+    from app.models.user import User
+
+    admin = User.query.filter_by(email="admin@test.com").first()
+    other = User.query.filter_by(email="test@test.com").first()
+    start = datetime(2026, 1, 1)
+    for i in range(5):
+        db.session.add(
+            File(
+                key=f"test-folder/ab12/file{i}.txt",
+                name=f"file{i}.txt",
+                file_type="user_file",
+                size=i,
+                user_id=admin.id,
+                # two files share every timestamp, the id breaks the tie
+                created_at=start + timedelta(minutes=i // 2),
+            )
+        )
+    db.session.add(
+        File(
+            key="test-folder/cd34/other.txt",
+            name="other.txt",
+            file_type="user_file",
+            user_id=other.id,
+        )
+    )
+    db.session.commit()
+
+
+@pytest.mark.api
+class TestFilesListing:
+    """Test cases for listing uploaded files."""
+
+    def test_pages_through_own_files(self, client, auth_headers, stored_files):
+        """Test cursors walk all files of the user newest first, once each."""
+        names, cursor, pages = [], None, 0
+        while True:
+            url = "/api/files?pageSize=2" + (f"&cursor={cursor}" if cursor else "")
+            data = client.get(url, headers=auth_headers).get_json()
+            names += [f["name"] for f in data["files"]]
+            cursor = data["pagination"]["next_cursor"]
+            pages += 1
+            if cursor is None:
+                break
+
+        assert names == [f"file{i}.txt" for i in (4, 3, 2, 1, 0)]
+        assert pages == 3
+
+    def test_invalid_cursor(self, client, auth_headers, stored_files):
+        """Test malformed cursors are rejected."""
+        response = client.get("/api/files?cursor=not-a-cursor", headers=auth_headers)
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_page_size_is_capped(self, client, auth_headers, stored_files):
+        """Test clients cannot ask for more than the maximum page size."""
+        data = client.get("/api/files?pageSize=5000", headers=auth_headers).get_json()
+
+        assert data["pagination"]["per_page"] == 100
+        assert len(data["files"]) == 5
+
+    @pytest.mark.parametrize("streaming", [True, False])
+    def test_upload_records_files(self, app, client, auth_headers, streaming):
+        """Test uploaded files are recorded with their metadata."""
+        from app.models.file import File
+        from config import Config
+
+        stored = {
+            "filename": "doc_admin user_1.txt",
+            "key": "test-folder/ab12/doc_admin user_1.txt",
+            "etag": "5ee9aa1a0e2af2a6d3ac4d1ba7f1bc27-2",
+        }
+
+        def stream(file_type, file_name, chunks, user_name, content_type):
+            b"".join(chunks)
+            return stored
+
+        with (
+            patch.object(Config, "UPLOAD_STREAMING", streaming),
+            patch("app.support.files_uploader.put_object_to_s3", return_value=stored),
+            patch("app.support.files_uploader.stream_object_to_s3", side_effect=stream),
+        ):
+            response = client.post(
+                "/api/files/upload-files",
+                data={"docs": (BytesIO(b"content"), "doc.txt", "text/plain")},
+                headers={"Authorization": auth_headers["Authorization"]},
+                content_type="multipart/form-data",
+                buffered=True,
+            )
+
+        assert response.status_code == HTTPStatus.CREATED
+        stored = File.query.one()
+        assert stored.key == "test-folder/ab12/doc_admin user_1.txt"
+        assert (stored.size, stored.content_type) == (7, "text/plain")
+        assert stored.digest == hashlib.sha256(b"content").hexdigest()
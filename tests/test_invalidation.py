@@ -0,0 +1,209 @@
+import json
+import time
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+
+from app.support.invalidation import CHANNEL, InvalidationBus, invalidation_bus
+from app.support.local_cache import LocalCache
+
+
+def wait_until(condition, timeout=3):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class FakeSession(object):
+    def __init__(self, invalidations):
+        self.info = {"invalidations": invalidations}
+
+
+@pytest.fixture
+def bus():
+    """Standalone bus with one keyed and one flushed cache."""
+    bus = InvalidationBus()
+    users = LocalCache("users")
+    roles = LocalCache("roles")
+    bus.register("users", users)
+    bus.register(["roles", "feature_roles"], roles, flush=True)
+    yield bus, users, roles
+    bus.stop()
+
+
+@pytest.mark.unit
+class TestLocalCache:
+    """Test cases for the in-process TTL cache."""
+
+    def test_get_or_load(self):
+        """Test values are loaded once and then served from memory."""
+        cache = LocalCache("test")
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return "value"
+
+        assert cache.get_or_load("key", loader) == "value"
+        assert cache.get_or_load("key", loader) == "value"
+        assert len(calls) == 1
+
+    def test_values_loaded_during_eviction_are_not_stored(self):
+        """Test a load racing with an eviction does not resurrect stale data."""
+        cache = LocalCache("test")
+
+        def loader():
+            cache.evict(["key"])
+            return "stale"
+
+        assert cache.get_or_load("key", loader) == "stale"
+        assert cache.get("key") is None
+
+
+@pytest.mark.unit
+class TestInvalidationBus:
+    """Test cases for the redis pub/sub invalidation bus."""
+
+    def test_apply_evicts_keys_and_flushes(self, bus):
+        """Test keyed caches lose the ids, flushed caches lose everything."""
+        bus, users, roles = bus
+        users.set(1, "a")
+        users.set(2, "b")
+        roles.set("admin", True)
+
+        bus.apply({"users": [1], "roles": [7]})
+
+        assert users.get(1) is None
+        assert users.get(2) == "b"
+        assert len(roles) == 0
+
+    def test_handle_ignores_own_messages(self, bus):
+        """Test messages published by this process are not applied twice."""
+        bus, users, _ = bus
+        users.set(1, "a")
+
+        bus.handle(json.dumps({"o": bus.origin_id(), "m": {"users": [1]}}))
+        assert users.get(1) == "a"
+
+        bus.handle(json.dumps({"o": "other", "m": {"users": [1]}}))
+        assert users.get(1) is None
+
+    def test_commit_callbacks_run_in_committing_process(self, bus):
+        """Test shared caches are notified once, by the committing process."""
+        bus, _, _ = bus
+        notified = []
+        bus.on_commit(["users", "roles"], notified.append)
+        bus.on_commit("features", lambda changes: 1 / 0)
+
+        bus.after_commit(FakeSession({"users": {2, 1}}))
+        bus.after_commit(FakeSession({"features": {1}}))
+        bus.handle(json.dumps({"o": "other", "m": {"roles": [1]}}))
+
+        assert notified == [{"users": [1, 2]}]
+
+    def test_malformed_messages_flush_everything(self, bus):
+        """Test unreadable messages fall back to a full flush."""
+        bus, users, roles = bus
+        users.set(1, "a")
+        roles.set("admin", True)
+
+        bus.handle(b"not json")
+
+        assert len(users) == 0
+        assert len(roles) == 0
+
+    def test_listener_receives_other_processes(self, bus):
+        """Test the listener thread evicts entries published elsewhere."""
+        bus, users, _ = bus
+        server = fakeredis.FakeServer()
+        publisher = fakeredis.FakeRedis(server=server)
+        users.set(5, "e")
+
+        bus.ensure_listener(None, lambda: fakeredis.FakeRedis(server=server))
+        assert wait_until(lambda: bus.connected)
+
+        publisher.publish(CHANNEL, json.dumps({"o": "pod-2", "m": {"users": [5]}}))
+
+        assert wait_until(lambda: users.get(5) is None)
+
+    def test_listener_reconnects_and_flushes(self, bus):
+        """Test a dropped connection flushes caches and reconnects."""
+        bus, users, _ = bus
+        server = fakeredis.FakeServer()
+        bus.ensure_listener(None, lambda: fakeredis.FakeRedis(server=server))
+        assert wait_until(lambda: bus.connected)
+
+        users.set(1, "a")
+        server.connected = False
+        assert wait_until(lambda: not bus.connected)
+        assert users.get(1) is None
+
+        server.connected = True
+        assert wait_until(lambda: bus.connected, timeout=5)
+
+    def test_commit_hooks_evict_principals(self, app):
+        """Test committing a user evicts it from the principal cache."""
+        from app.factory import db
+        from app.models.user import User
+        from app.support.auth_helper import principals
+
+        principals.set(2, {"id": 2, "email": "test@test.com"})
+
+        user = db.session.get(User, 2)
+        user.active = False
+        db.session.commit()
+
+        assert principals.get(2) is None
+
+    def test_rollback_publishes_nothing(self, app):
+        """Test rolled back changes do not invalidate anything."""
+        from app.factory import db
+        from app.models.user import User
+        from app.support.auth_helper import principals
+
+        principals.set(2, {"id": 2, "email": "test@test.com"})
+
+        user = db.session.get(User, 2)
+        user.name = "Rolled Back"
+        db.session.flush()
+        db.session.rollback()
+
+        assert principals.get(2) == {"id": 2, "email": "test@test.com"}
+
+    def test_commit_publishes_compact_message(self, app):
+        """Test commits publish table ids over redis."""
+        from app.factory import db
+        from app.models.role import Role
+
+        client = fakeredis.FakeRedis()
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(CHANNEL)
+
+        with patch("app.support.invalidation.get_redis", return_value=client):
+            role = Role.query.filter_by(name="agent").first()
+            role.name = "support"
+            db.session.commit()
+
+        messages = [pubsub.get_message(timeout=0.1) for _ in range(3)]
+        message = next(m for m in messages if m is not None)
+        assert json.loads(message["data"]) == {
+            "o": invalidation_bus.origin_id(),
+            "m": {"roles": [role.id]},
+        }
+
+    def test_deactivated_user_is_rejected(self, app, client, auth_headers):
+        """Test cached principals do not outlive a deactivation."""
+        from app.factory import db
+        from app.models.user import User
+
+        assert client.get("/api/users/1", headers=auth_headers).status_code == 200
+
+        user = db.session.get(User, 1)
+        user.active = False
+        db.session.commit()
+
+        assert client.get("/api/users/1", headers=auth_headers).status_code == 401
@@ -0,0 +1,85 @@
+import datetime
+from http import HTTPStatus
+from unittest.mock import patch
+
+import pytest
+
+from app.support import json_provider
+from app.support.json_provider import dumps_bytes, loads_bytes
+from app.support.pagination import decode_cursor, encode_cursor
+from app.support.responses import _envelope_body, envelope_response, json_response
+
+
+@pytest.mark.unit
+class TestJsonProvider:
+    """Test cases for the orjson backed JSON provider."""
+
+    def test_naive_datetimes_are_utc(self, app):
+        """Test naive datetimes are encoded as RFC 3339 UTC strings."""
+        value = datetime.datetime(2025, 6, 29, 16, 15, 26)
+
+        assert app.json.dumps({"at": value}) == '{"at":"2025-06-29T16:15:26Z"}'
+        assert dumps_bytes({"at": value}) == b'{"at":"2025-06-29T16:15:26Z"}'
+
+    def test_round_trip(self, app):
+        """Test loads reverses dumps."""
+        payload = {"status": "success", "users": [{"id": 1, "name": "ü"}]}
+
+        assert app.json.loads(app.json.dumps(payload)) == payload
+
+    @pytest.mark.parametrize("orjson", [json_provider.orjson, None])
+    def test_bytes_helpers(self, orjson):
+        """Test the bytes helpers and cursors work with and without orjson."""
+        at = datetime.datetime(2026, 1, 1, 12, 30)
+        with patch.object(json_provider, "orjson", orjson):
+            assert loads_bytes(dumps_bytes({"name": "ü"})) == {"name": "ü"}
+            assert decode_cursor(encode_cursor(at, 7)) == (at, 7)
+            with pytest.raises(ValueError):
+                decode_cursor("bm90LWpzb24")
+
+    def test_serialized_user_dates(self, client, auth_headers):
+        """Test model datetimes are serialized by the provider."""
+        response = client.get("/api/users/1", headers=auth_headers)
+        user = response.get_json()["user"]
+
+        assert user["created_at"].endswith("Z")
+        datetime.datetime.fromisoformat(user["created_at"].replace("Z", "+00:00"))
+
+
+@pytest.mark.unit
+class TestResponses:
+    """Test cases for the shared response envelope helpers."""
+
+    def test_json_response(self, app):
+        """Test the envelope carries status, message and extra fields."""
+        with app.test_request_context():
+            response, status = json_response(
+                HTTPStatus.CREATED, "success", "done", user={"id": 1}
+            )
+
+        assert status == HTTPStatus.CREATED
+        assert response.get_json() == {
+            "status": "success",
+            "message": "done",
+            "user": {"id": 1},
+        }
+
+    def test_json_response_without_message(self, app):
+        """Test the message key is omitted when not given."""
+        with app.test_request_context():
+            response, _ = json_response(HTTPStatus.ACCEPTED, "success", token="t")
+
+        assert response.get_json() == {"status": "success", "token": "t"}
+
+    def test_envelope_response_is_prebuilt(self, app):
+        """Test constant envelopes reuse the same serialized body."""
+        with app.test_request_context():
+            first, status = envelope_response(HTTPStatus.NOT_FOUND, "failed", "nope")
+            hits = _envelope_body.cache_info().hits
+            second, _ = envelope_response(HTTPStatus.NOT_FOUND, "failed", "nope")
+
+        assert status == HTTPStatus.NOT_FOUND
+        assert first.mimetype == "application/json"
+        assert first.get_json() == {"status": "failed", "message": "nope"}
+        assert second.get_data() == first.get_data()
+        assert _envelope_body.cache_info().hits == hits + 1
@@ -0,0 +1,105 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.support import key_layout, s3_helper
+from app.support.key_layout import build_key, candidate_keys, name_hash
+
+
+@pytest.fixture(autouse=True)
+def empty_key_cache():
+    """Forget keys resolved by other tests."""
+    s3_helper.resolved_keys.clear()
+    yield
+    s3_helper.resolved_keys.clear()
+
+
+@pytest.fixture
+def s3_client():
+    """S3 client storing a single file in the flat layout."""
+    client = MagicMock()
+    client.exists.side_effect = lambda key: key == "files/doc_admin_1700000000.pdf"
+    with patch("app.support.s3_helper.S3_Client", return_value=client):
+        yield client
+
+
+@pytest.mark.unit
+class TestKeyLayout:
+    """Test cases for the S3 key layouts."""
+
+    def test_flat(self):
+        """Test the flat layout keeps keys directly under the folder."""
+        key = build_key("files", "doc_admin_1700000000.pdf", key_layout.FLAT)
+
+        assert key == "files/doc_admin_1700000000.pdf"
+
+    def test_hashed(self):
+        """Test the hashed layout prefixes keys with a short name hash."""
+        key = build_key("files", "doc_admin_1700000000.pdf", key_layout.HASHED)
+        prefix = name_hash("doc_admin_1700000000.pdf")
+
+        assert key == f"files/{prefix}/doc_admin_1700000000.pdf"
+        assert len(prefix) == 4
+
+    def test_hashed_date(self):
+        """Test the date of the upload timestamp follows the hash."""
+        key = build_key("files", "doc_admin_1700000000.pdf", key_layout.HASHED_DATE)
+
+        assert key.endswith("/2023/11/14/doc_admin_1700000000.pdf")
+
+    def test_hashed_date_without_timestamp(self):
+        """Test names without a timestamp fall back to the hashed layout."""
+        assert build_key("files", "doc.pdf", key_layout.HASHED_DATE) == build_key(
+            "files", "doc.pdf", key_layout.HASHED
+        )
+
+    def test_prefixes_are_spread(self):
+        """Test bulk uploads land on many prefixes."""
+        names = [f"file{i}_admin_1700000000.csv" for i in range(1000)]
+
+        assert len({name_hash(name)[:1] for name in names}) == 16
+
+    def test_candidates_start_with_configured_layout(self, app):
+        """Test lookups try the configured layout before the others."""
+        keys = candidate_keys("files", "doc_admin_1700000000.pdf")
+
+        assert keys[0] == build_key("files", "doc_admin_1700000000.pdf")
+        assert keys[-1] == "files/doc_admin_1700000000.pdf"
+        assert len(keys) == 3
+
+
+@pytest.mark.unit
+class TestResolveKey:
+    """Test cases for resolving keys of stored files."""
+
+    def test_new_uploads_use_layout(self, app):
+        """Test uploads are stored under the hashed layout."""
+        client = MagicMock()
+        with patch("app.support.s3_helper.S3_Client", return_value=client):
+            s3_helper.put_object_to_s3("user_file", "doc.pdf", b"", "Admin")
+
+        filepath, filename, _ = client.put_object.call_args[0]
+        assert filepath == build_key(s3_helper.get_s3_folder("user_file"), filename)
+        assert filepath.count("/") == 2
+
+    def test_presign_resolves_old_layout(self, app, s3_client):
+        """Test files uploaded with the flat layout can still be presigned."""
+        with patch("app.support.s3_helper.get_s3_folder", return_value="files"):
+            s3_helper.generate_presigned_s3_url("user_file", "doc_admin_1700000000.pdf")
+            s3_helper.generate_presigned_s3_url("user_file", "doc_admin_1700000000.pdf")
+
+        s3_client.generate_presigned_url.assert_called_with(
+            "files/doc_admin_1700000000.pdf"
+        )
+        # the second lookup is served from the cache
+        assert s3_client.exists.call_count == 3
+
+    def test_missing_file_uses_configured_layout(self, app, s3_client):
+        """Test unknown files resolve to the configured layout."""
+        with patch("app.support.s3_helper.get_s3_folder", return_value="files"):
+            s3_helper.generate_presigned_s3_url("user_file", "other.pdf")
+
+        s3_client.generate_presigned_url.assert_called_with(
+            build_key("files", "other.pdf")
+        )
+        assert len(s3_helper.resolved_keys) == 0
@@ -0,0 +1,232 @@
+from unittest.mock import patch
+
+import pytest
+from werkzeug.test import EnvironBuilder
+
+from app.support.load_shedding import AdaptiveLimit, LoadSheddingMiddleware
+from app.support.metrics import SHED_REQUESTS
+
+
+def ok_app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "application/json")])
+    return [b"{}"]
+
+
+def call(middleware, path, method="GET"):
+    """Start a request and keep it in flight until the result is closed."""
+    captured = {}
+
+    def start_response(status, headers, exc_info=None):
+        captured["status"] = int(status.split(" ", 1)[0])
+        captured["headers"] = dict(headers)
+
+    environ = EnvironBuilder(path=path, method=method).get_environ()
+    body = middleware(environ, start_response)
+    return captured, body
+
+
+class Clock(object):
+    """Monotonic clock advanced by the application instead of by time."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def timed_app(clock, latencies):
+    """App answering after the latency of the request's path."""
+
+    def app(environ, start_response):
+        clock.now += latencies[environ["PATH_INFO"]]
+        return ok_app(environ, start_response)
+
+    return app
+
+
+def serve(middleware, path, method="GET"):
+    _, body = call(middleware, path, method)
+    body.close()
+
+
+@pytest.mark.unit
+class TestAdaptiveLimit:
+    """Test cases for the AIMD concurrency limit."""
+
+    def test_slow_samples_shrink_limit(self):
+        """Test latency well above the baseline backs the limit off."""
+        limit = AdaptiveLimit(initial=10, min_latency=0.01)
+        limit.acquire()
+        limit.release(0.02, now=1.0)
+
+        limit.acquire()
+        limit.release(0.5, now=2.0)
+
+        assert limit.limit == pytest.approx(9)
+
+    def test_fast_samples_grow_busy_limit(self):
+        """Test a limit that is in use grows while latency stays flat."""
+        limit = AdaptiveLimit(initial=4, min_latency=0.01)
+        for _ in range(3):
+            limit.acquire()
+        limit.release(0.02, now=1.0)
+
+        assert limit.limit == pytest.approx(4.25)
+
+    def test_idle_limit_does_not_grow(self):
+        """Test a barely used limit stays where it is."""
+        limit = AdaptiveLimit(initial=10)
+        limit.acquire()
+        limit.release(0.02, now=1.0)
+
+        assert limit.limit == 10
+
+    def test_bounds(self):
+        """Test the limit stays between its minimum and maximum."""
+        limit = AdaptiveLimit(initial=2, min_limit=2, min_latency=0.01)
+        limit.acquire()
+        limit.release(0.02, now=1.0)
+        for second in range(2, 10):
+            limit.acquire()
+            limit.release(1.0, now=float(second))
+
+        assert limit.limit == 2
+
+    def test_sample_baseline(self):
+        """Test samples given a baseline are judged against it alone."""
+        limit = AdaptiveLimit(initial=10, min_latency=0.01)
+        limit.acquire()
+        limit.release(0.02, now=1.0)
+
+        limit.acquire()
+        limit.release(1.0, now=2.0, baseline=0.8)
+        assert limit.limit == 10
+
+        limit.acquire()
+        limit.release(2.0, now=3.0, baseline=0.8)
+        assert limit.limit == pytest.approx(9)
+        assert limit.baseline == 0.02
+
+
+@pytest.mark.unit
+class TestLoadSheddingMiddleware:
+    """Test cases for the load shedding middleware."""
+
+    def test_sheds_over_limit(self):
+        """Test requests over the class limit fail fast with 503."""
+        middleware = LoadSheddingMiddleware(ok_app, initial=2, min_limit=1)
+        before = SHED_REQUESTS.labels(route_class="read")._value.get()
+
+        held = [call(middleware, "/api/users/1") for _ in range(2)]
+        captured, body = call(middleware, "/api/users/1")
+
+        assert [c["status"] for c, _ in held] == [200, 200]
+        assert captured["status"] == 503
+        assert captured["headers"]["Retry-After"] == "1"
+        assert b"Server is busy" in b"".join(body)
+        assert SHED_REQUESTS.labels(route_class="read")._value.get() == before + 1
+
+    def test_closing_releases_slot(self):
+        """Test finished requests give their slot back."""
+        middleware = LoadSheddingMiddleware(ok_app, initial=1, min_limit=1)
+
+        _, body = call(middleware, "/api/users/1")
+        body.close()
+        captured, _ = call(middleware, "/api/users/1")
+
+        assert captured["status"] == 200
+        assert middleware.limits["read"].in_flight == 1
+
+    def test_uploads_are_shed_before_reads(self):
+        """Test uploads only get part of the process wide limit."""
+        middleware = LoadSheddingMiddleware(ok_app, initial=4, min_limit=1)
+
+        uploads = [
+            call(middleware, "/api/files/upload-files", "POST")[0]["status"]
+            for _ in range(3)
+        ]
+        read, _ = call(middleware, "/api/users/1")
+
+        assert uploads == [200, 200, 503]
+        assert read["status"] == 200
+
+    def test_exempt_routes(self):
+        """Test health checks and metrics are never shed."""
+        middleware = LoadSheddingMiddleware(ok_app, initial=1, min_limit=1)
+
+        statuses = [call(middleware, "/healthcheck")[0]["status"] for _ in range(3)]
+
+        assert statuses == [200, 200, 200]
+
+    def test_exhausted_body_releases_slot(self):
+        """Test the slot is given back once the body is consumed."""
+        middleware = LoadSheddingMiddleware(ok_app, initial=1, min_limit=1)
+
+        _, body = call(middleware, "/api/users/1")
+        assert b"".join(body) == b"{}"
+
+        assert middleware.limits["read"].in_flight == 0
+        body.close()
+        assert middleware.total.in_flight == 0
+
+    def test_registered_on_app(self, app, client, auth_headers):
+        """Test the middleware wraps the application from the config."""
+        response = client.get("/api/users/1", headers=auth_headers)
+
+        assert isinstance(app.wsgi_app, LoadSheddingMiddleware)
+        assert response.get_json()["status"] == "success"
+        assert app.wsgi_app.limits["read"].in_flight == 0
+
+    def test_app_errors_release_slot(self):
+        """Test an exception in the app does not leak the slot."""
+
+        def failing_app(environ, start_response):
+            raise RuntimeError("boom")
+
+        middleware = LoadSheddingMiddleware(failing_app, initial=1, min_limit=1)
+
+        with pytest.raises(RuntimeError):
+            call(middleware, "/api/users/1")
+
+        assert middleware.limits["read"].in_flight == 0
+        assert middleware.total.in_flight == 0
+
+    def test_uploads_leave_total_limit(self):
+        """Test long uploads do not shrink the limit reads are served under."""
+        clock = Clock()
+        latencies = {"/api/files/upload-files": 30.0, "/api/users/1": 0.01}
+        middleware = LoadSheddingMiddleware(
+            timed_app(clock, latencies), initial=4, min_limit=1, min_latency=0.005
+        )
+
+        with patch("app.support.load_shedding.time.monotonic", clock):
+            for _ in range(20):
+                serve(middleware, "/api/users/1")
+                serve(middleware, "/api/files/upload-files", "POST")
+
+        assert middleware.total.limit == 4
+
+    def test_total_limit_per_class_baseline(self):
+        """Test classes are slow for the process limit only against themselves."""
+        clock = Clock()
+        latencies = {"/api/users": 1.0, "/api/users/1": 0.01}
+        middleware = LoadSheddingMiddleware(
+            timed_app(clock, latencies), initial=4, min_limit=1, min_latency=0.005
+        )
+
+        with patch("app.support.load_shedding.time.monotonic", clock):
+            for _ in range(5):
+                serve(middleware, "/api/users/1")
+                serve(middleware, "/api/users", "POST")
+            assert middleware.total.limit == 4
+
+            latencies["/api/users"] = 5.0
+            serve(middleware, "/api/users", "POST")
+
+        assert middleware.total.limit == pytest.approx(3.6)
+
+    def test_initial_limit_from_threads(self, app):
+        """Test the limits start at the requests a worker serves at once."""
+        assert app.config["LOAD_SHEDDING_INITIAL_LIMIT"] == app.config["WEB_THREADS"]
+        assert app.wsgi_app.total.limit == app.config["WEB_THREADS"]
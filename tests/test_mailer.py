@@ -0,0 +1,116 @@
+import smtplib
+from unittest.mock import patch
+
+import pytest
+
+from app.models.user import User
+from app.support.mailer import Mailer
+from app.workers.user_worker import user_email_batch_worker
+
+
+class FakeSMTP(object):
+    """SMTP connection recording the messages, optionally failing some."""
+
+    opened = []
+    # the first connection drops after this many messages
+    drop_after = None
+    refuse = set()
+    unreachable = False
+
+    def __init__(self, server, port):
+        if FakeSMTP.unreachable:
+            raise ConnectionRefusedError("Connection refused")
+        self.sent = []
+        if FakeSMTP.opened:
+            self.drop_after = None
+        FakeSMTP.opened.append(self)
+
+    def set_debuglevel(self, level):
+        pass
+
+    def sendmail(self, sender, recipients, message, *options):
+        if self.drop_after is not None and len(self.sent) == self.drop_after:
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        if set(recipients) & self.refuse:
+            raise smtplib.SMTPRecipientsRefused({r: (550, b"no") for r in recipients})
+        self.sent.append((recipients, message))
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def smtp(app):
+    """Let messages go out to a fake SMTP server."""
+    state = app.extensions["mail"]
+    state.suppress, state.default_sender = False, "app@test.com"
+    FakeSMTP.opened, FakeSMTP.drop_after, FakeSMTP.refuse = [], None, set()
+    FakeSMTP.unreachable = False
+    with patch("flask_mail.smtplib.SMTP", FakeSMTP):
+        yield FakeSMTP
+    state.suppress = True
+
+
+def recipients(connections):
+    return [r for connection in connections for r, _ in connection.sent]
+
+
+@pytest.mark.unit
+class TestWelcomeEmails:
+    """Test cases for sending welcome emails in batches."""
+
+    def test_batch_uses_one_connection(self, app, smtp):
+        """Test every user is mailed over a single SMTP connection."""
+        users = User.query.order_by(User.id).all()
+
+        result = Mailer.send_welcome_emails(users)
+
+        assert len(smtp.opened) == 1
+        assert recipients(smtp.opened) == [["admin@test.com"], ["test@test.com"]]
+        assert b"Hi Admin User," in smtp.opened[0].sent[0][1]
+        assert result == {"sent": [u.id for u in users], "failed": []}
+
+    def test_reconnect_after_disconnect(self, app, smtp):
+        """Test a dropped connection is reopened and the message resent."""
+        users = User.query.order_by(User.id).all()
+        smtp.drop_after = 1
+
+        result = Mailer.send_welcome_emails(users)
+
+        assert len(smtp.opened) == 2
+        assert recipients(smtp.opened) == [["admin@test.com"], ["test@test.com"]]
+        assert result["failed"] == []
+
+    def test_unreachable_server_fails_every_message(self, app, smtp):
+        """Test a server that can not be connected to fails each message."""
+        users = User.query.order_by(User.id).all()
+        smtp.unreachable = True
+
+        result = Mailer.send_welcome_emails(users)
+
+        assert result["sent"] == []
+        assert [f["id"] for f in result["failed"]] == [u.id for u in users]
+        assert result["failed"][0]["error"] == "Connection refused"
+
+    def test_refused_recipient_fails_alone(self, app, smtp):
+        """Test errors of one message are reported without stopping the batch."""
+        users = User.query.order_by(User.id).all()
+        smtp.refuse = {"admin@test.com"}
+
+        result = Mailer.send_welcome_emails(users)
+
+        assert result["sent"] == [users[1].id]
+        assert [f["id"] for f in result["failed"]] == [users[0].id]
+        assert len(smtp.opened) == 1
+
+    def test_batch_task(self, app, smtp):
+        """Test the task loads the users and reports unknown ids."""
+        ids = [u.id for u in User.query.all()]
+
+        result = user_email_batch_worker(ids + [9999])
+
+        assert sorted(result["sent"]) == sorted(ids)
+        assert result["missing"] == [9999]
@@ -0,0 +1,257 @@
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import request
+
+from app.support.multipart_stream import stream_parts
+from app.support.s3 import S3_BUCKET, S3_Client
+from config import Config
+
+
+def upload_request(app, data, **kwargs):
+    return app.test_request_context(
+        "/", method="POST", data=data, content_type="multipart/form-data", **kwargs
+    )
+
+
+@pytest.fixture
+def s3():
+    """S3 client with mocked botocore calls and 10 byte parts."""
+    client = S3_Client()
+    client.s3_client = MagicMock()
+    client.s3_client.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+    client.s3_client.upload_part.side_effect = lambda **kwargs: {
+        "ETag": f"etag-{kwargs['PartNumber']}"
+    }
+    client.s3_client.complete_multipart_upload.return_value = {
+        "ETag": '"multi-2"',
+        "ResponseMetadata": {"HTTPStatusCode": 200},
+    }
+    with patch.object(Config, "AWS_S3_MULTIPART_PART_SIZE", 10):
+        yield client
+
+
+@pytest.mark.unit
+class TestStreamParts:
+    """Test cases for the incremental multipart parser."""
+
+    def test_parts_in_small_chunks(self, app):
+        """Test files are yielded in order with their content and headers."""
+        data = {
+            "title": "report",
+            "docs": [
+                (BytesIO(b"first file"), "a.txt", "text/plain"),
+                (BytesIO(b"x" * 1000), "b.csv", "text/csv"),
+            ],
+        }
+        with upload_request(app, data):
+            parts = [
+                (part.name, part.filename, part.content_type, b"".join(part.chunks()))
+                for part in stream_parts(request, chunk_size=7)
+            ]
+
+        assert parts == [
+            ("title", None, None, b"report"),
+            ("docs", "a.txt", "text/plain", b"first file"),
+            ("docs", "b.csv", "text/csv", b"x" * 1000),
+        ]
+
+    def test_unread_parts_are_skipped(self, app):
+        """Test parts the caller does not read are drained."""
+        data = {"a": (BytesIO(b"skipped"), "a.txt"), "b": (BytesIO(b"read"), "b.txt")}
+        with upload_request(app, data):
+            contents = [
+                b"".join(part.chunks())
+                for part in stream_parts(request, chunk_size=4)
+                if part.name == "b"
+            ]
+
+        assert contents == [b"read"]
+
+    def test_truncated_body(self, app):
+        """Test a body ending before the closing boundary is rejected."""
+        body = (
+            b"--x\r\nContent-Disposition: form-data; name=a; filename=a.txt\r\n\r\nabc"
+        )
+        with app.test_request_context(
+            "/",
+            method="POST",
+            data=body,
+            content_type="multipart/form-data; boundary=x",
+        ):
+            with pytest.raises(ValueError):
+                for part in stream_parts(request):
+                    b"".join(part.chunks())
+
+
+@pytest.mark.unit
+class TestStreamUpload:
+    """Test cases for uploading streams to S3."""
+
+    def test_small_body_is_put(self, s3):
+        """Test bodies smaller than a part are sent with one PutObject."""
+        s3.s3_client.put_object.return_value = {
+            "ETag": '"abc"',
+            "ResponseMetadata": {"HTTPStatusCode": 200},
+        }
+
+        response = s3.stream_upload("d/a.txt", "a.txt", [b"abc", b"def"], "text/plain")
+
+        assert response["etag"] == "abc"
+        s3.s3_client.put_object.assert_called_once()
+        assert s3.s3_client.put_object.call_args.kwargs["Body"] == b"abcdef"
+        s3.s3_client.create_multipart_upload.assert_not_called()
+
+    def test_large_body_is_sent_in_parts(self, s3):
+        """Test bodies over a part are uploaded part by part as they arrive."""
+        chunks = [b"0123456", b"789abcd", b"ef"]
+
+        response = s3.stream_upload("d/a.txt", "a.txt", iter(chunks))
+
+        bodies = [c.kwargs["Body"] for c in s3.s3_client.upload_part.call_args_list]
+        assert bodies == [b"0123456789abcd", b"ef"]
+        completed = s3.s3_client.complete_multipart_upload.call_args.kwargs
+        assert completed["MultipartUpload"]["Parts"] == [
+            {"ETag": "etag-1", "PartNumber": 1},
+            {"ETag": "etag-2", "PartNumber": 2},
+        ]
+        assert response["etag"] == "multi-2"
+
+    def test_failed_part_aborts_upload(self, s3):
+        """Test a failing S3 upload is aborted and raised."""
+        from botocore.exceptions import EndpointConnectionError
+
+        s3.s3_client.upload_part.side_effect = EndpointConnectionError(
+            endpoint_url="https://s3"
+        )
+
+        with pytest.raises(EndpointConnectionError):
+            s3.stream_upload("d/a.txt", "a.txt", [b"x" * 20])
+        s3.s3_client.abort_multipart_upload.assert_called_once_with(
+            Bucket=S3_BUCKET, Key="d/a.txt", UploadId="upload-1"
+        )
+
+    def test_failed_request_aborts_upload(self, s3):
+        """Test errors reading the request abort the upload and propagate."""
+
+        def chunks():
+            yield b"x" * 20
+            raise ValueError("Unexpected end of the multipart body")
+
+        with pytest.raises(ValueError):
+            s3.stream_upload("d/a.txt", "a.txt", chunks())
+
+        s3.s3_client.abort_multipart_upload.assert_called_once()
+
+
+@pytest.mark.api
+class TestStreamingUpload:
+    """Test cases for streaming uploads through the upload endpoint."""
+
+    def test_files_are_streamed(self, client, auth_headers):
+        """Test every unique file is piped to S3 without parsing request.files."""
+        received = {}
+
+        def stream(file_type, file_name, chunks, user_name, content_type):
+            received[file_name] = b"".join(chunks)
+            return {"filename": f"s_{file_name}", "key": f"d/s_{file_name}"}
+
+        with (
+            patch("app.support.files_uploader.stream_object_to_s3", side_effect=stream),
+            patch("app.support.files_uploader.FilesUploader.get_filelist") as spooled,
+        ):
+            response = client.post(
+                "/api/files/upload-files",
+                data={
+                    "docs[a]": [(BytesIO(b"one"), "a.txt"), (BytesIO(b"two"), "b.txt")],
+                    "other": (BytesIO(b"one"), "a.txt"),
+                },
+                headers={"Authorization": auth_headers["Authorization"]},
+                content_type="multipart/form-data",
+                buffered=True,
+            )
+
+        assert response.status_code == 201
+        assert received == {"a.txt": b"one", "b.txt": b"two"}
+        assert response.get_json()["file_names"] == {
+            "docs": {"a": ["s_a.txt", "s_b.txt"]},
+            "other": ["s_a.txt"],
+        }
+        spooled.assert_not_called()
+
+    def test_missing_file_name(self, client, auth_headers):
+        """Test parts without a file name fail the schema validation."""
+        with patch("app.support.files_uploader.stream_object_to_s3") as stream:
+            response = client.post(
+                "/api/files/upload-files",
+                data={"docs": (BytesIO(b""), "")},
+                headers={"Authorization": auth_headers["Authorization"]},
+                content_type="multipart/form-data",
+                buffered=True,
+            )
+
+        assert response.status_code == 422
+        stream.assert_not_called()
+
+    def test_missing_file_name_discards_stored_files(self, client, auth_headers):
+        """Test files stored before a part without a name are rolled back."""
+        from app.models.file import File
+
+        def stream(file_type, file_name, chunks, user_name, content_type):
+            b"".join(chunks)
+            return {"filename": file_name, "key": f"d/{file_name}"}
+
+        with (
+            patch(
+                "app.support.files_uploader.stream_object_to_s3", side_effect=stream
+            ) as streamed,
+            patch("app.support.files_uploader.delete_object_from_s3") as deleted,
+            patch(
+                "app.support.files_uploader.upload_quota.add", return_value=None
+            ) as counted,
+        ):
+            response = client.post(
+                "/api/files/upload-files",
+                data={
+                    "docs": [(BytesIO(b"one"), "a.txt"), (BytesIO(b""), "")],
+                    "other": (BytesIO(b"three"), "c.txt"),
+                },
+                headers={"Authorization": auth_headers["Authorization"]},
+                content_type="multipart/form-data",
+                buffered=True,
+            )
+
+        assert response.status_code == 422
+        assert [c.args[1] for c in streamed.call_args_list] == ["a.txt"]
+        deleted.assert_called_once_with("d/a.txt")
+        counted.assert_called_with(1, -3, -1)
+        assert File.query.count() == 0
+
+    def test_concurrent_uploads_keep_their_user(self, app):
+        """Test an upload running during another one records its own files."""
+        from app.models.file import File
+        from app.support.files_uploader import FilesUploader
+
+        def stream(file_type, file_name, chunks, user_name, content_type):
+            b"".join(chunks)
+            if file_name == "a.txt":
+                # the second request is served while the first one streams
+                with upload_request(app, {"b": (BytesIO(b"two"), "b.txt")}):
+                    FilesUploader(request, {"id": 2, "name": "other"}).perform()
+            return {"filename": file_name, "key": f"d/{file_name}"}
+
+        with (
+            patch("app.support.files_uploader.stream_object_to_s3", side_effect=stream),
+            upload_request(app, {"a": (BytesIO(b"one"), "a.txt")}),
+        ):
+            response, status = FilesUploader(
+                request, {"id": 1, "name": "admin"}
+            ).perform()
+
+        assert status == 201
+        assert response.get_json()["file_names"] == {"a": ["a.txt"]}
+        assert {f.name: f.user_id for f in File.query.all()} == {
+            "a.txt": 1,
+            "b.txt": 2,
+        }
@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from kombu.exceptions import OperationalError
+
+from app import celery
+from app.celery_queues import queue_of
+from app.factory import db
+from app.models.outbox_message import OutboxMessage
+from app.support.outbox import outbox
+from app.workers.user_worker import user_email_worker
+
+
+@pytest.fixture
+def send_task():
+    with patch.object(celery, "send_task") as send_task:
+        yield send_task
+
+
+def enqueue(count):
+    task_ids = [outbox.enqueue(user_email_worker, i) for i in range(count)]
+    db.session.commit()
+    return task_ids
+
+
+@pytest.mark.api
+class TestOutboxEnqueue:
+    """Test cases for writing tasks to the outbox with the user."""
+
+    def test_user_creation_enqueues_email(
+        self, client, auth_headers, sample_user_data, mock_celery, send_task
+    ):
+        """Test the email task is stored with the user, not published."""
+        response = client.post(
+            "/api/users", json=sample_user_data, headers=auth_headers
+        )
+
+        message = OutboxMessage.query.one()
+        assert response.status_code == 201
+        assert response.get_json()["job_result"]["job_id"] == message.task_id
+        assert message.task_name == user_email_worker.name
+        assert message.args == [response.get_json()["user"]["id"]]
+        assert message.published_at is None
+        mock_celery.assert_not_called()
+        send_task.assert_not_called()
+
+    def test_failed_creation_enqueues_nothing(
+        self, client, auth_headers, sample_user_data
+    ):
+        """Test a rolled back user leaves no task behind."""
+        with patch.object(db.session, "commit", side_effect=RuntimeError("boom")):
+            response = client.post(
+                "/api/users", json=sample_user_data, headers=auth_headers
+            )
+
+        assert response.status_code == 400
+        assert OutboxMessage.query.count() == 0
+
+
+@pytest.mark.unit
+class TestOutboxRelay:
+    """Test cases for publishing the outbox to the broker."""
+
+    def test_relay_in_batches(self, app, send_task):
+        """Test pending tasks are published in order with their task ids."""
+        task_ids = enqueue(5)
+
+        assert outbox.relay(2) == 5
+
+        calls = send_task.call_args_list
+        assert [c.kwargs["task_id"] for c in calls] == task_ids
+        assert calls[0].args == (user_email_worker.name,)
+        assert calls[0].kwargs["args"] == [0]
+        # one pooled producer per batch
+        assert calls[0].kwargs["producer"] is calls[1].kwargs["producer"]
+        assert OutboxMessage.query.filter_by(published_at=None).count() == 0
+        assert outbox.relay(2) == 0
+
+    def test_broker_failure(self, app, send_task):
+        """Test the rest of the outbox stays pending while the broker is down."""
+        task_ids = enqueue(3)
+        send_task.side_effect = [None, OperationalError("connection refused")]
+
+        assert outbox.relay(10) == 1
+
+        pending = OutboxMessage.query.filter_by(published_at=None).all()
+        assert [m.task_id for m in pending] == task_ids[1:]
+        assert pending[0].attempts == 1
+        assert "connection refused" in pending[0].last_error
+
+        send_task.side_effect = None
+        assert outbox.relay(10) == 2
+
+    def test_empty_outbox(self, app, send_task):
+        """Test an empty outbox takes no producer from the pool."""
+        with patch.object(celery, "producer_or_acquire") as acquire:
+            assert outbox.relay(10) == 0
+
+        acquire.assert_not_called()
+
+    def test_producer_unavailable(self, app, send_task):
+        """Test a broker refusing connections fails the first pending task."""
+        task_ids = enqueue(2)
+        with patch.object(
+            celery,
+            "producer_or_acquire",
+            side_effect=OperationalError("connection refused"),
+        ):
+            assert outbox.relay(10) == 0
+
+        first = OutboxMessage.query.filter_by(task_id=task_ids[0]).one()
+        assert first.attempts == 1
+        send_task.assert_not_called()
+
+    def test_published_to_broker(self, app):
+        """Test relayed tasks reach the queue of their task."""
+        (task_id,) = enqueue(1)
+
+        outbox.relay(10)
+
+        with celery.connection_for_read() as connection:
+            queue = connection.SimpleQueue(queue_of(user_email_worker.name))
+            message = queue.get(timeout=1)
+            message.ack()
+            queue.close()
+        assert message.headers["id"] == task_id
+        assert message.headers["task"] == user_email_worker.name
+
+    def test_purge(self, app, send_task):
+        """Test only messages published before the retention are deleted."""
+        enqueue(3)
+        outbox.relay(10)
+        old = OutboxMessage.query.order_by(OutboxMessage.id).first()
+        old.published_at = datetime.utcnow() - timedelta(days=2)
+        enqueue(1)
+
+        assert outbox.purge(86400) == 1
+        assert OutboxMessage.query.count() == 3
+
+    def test_relay_is_scheduled(self):
+        """Test celery beat runs the relay."""
+        schedule = celery.conf.beat_schedule["relay-outbox"]
+
+        assert schedule["task"] == "app.workers.outbox_worker.relay_outbox"
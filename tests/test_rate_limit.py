@@ -0,0 +1,169 @@
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+import redis
+
+from app.support.rate_limit import Limit, LocalBuckets, rate_limit, rate_limiter
+
+
+@pytest.fixture
+def limited_app(app):
+    """App with rate limiting on and a couple of limited routes."""
+    app.config["RATE_LIMIT_ENABLED"] = True
+
+    app.add_url_rule(
+        "/limited/ip",
+        "limited_ip",
+        rate_limit("2/minute")(lambda: "ok"),
+    )
+    app.add_url_rule(
+        "/limited/windows",
+        "limited_windows",
+        rate_limit("5/second;3/hour", key="route")(lambda: "ok"),
+    )
+    app.add_url_rule(
+        "/limited/retries",
+        "limited_retries",
+        rate_limit("2/minute;100/hour")(lambda: "ok"),
+    )
+    yield app
+    rate_limiter.local.clear()
+    rate_limiter._redis_down_until = 0.0
+
+
+@pytest.fixture
+def redis_client():
+    """Route the limiter to an in-memory redis."""
+    client = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+    with patch("app.support.rate_limit.get_redis", return_value=client):
+        yield client
+
+
+@pytest.mark.unit
+class TestLimit:
+    """Test cases for parsing limit rules."""
+
+    def test_parse(self):
+        """Test rules separated by semicolons are parsed into buckets."""
+        minute, hour = Limit.parse("10/minute; 100/hours")
+
+        assert (minute.count, minute.period) == (10, 60)
+        assert (hour.count, hour.period) == (100, 3600)
+        assert minute.rate == pytest.approx(10 / 60)
+
+    def test_local_bucket_share(self):
+        """Test each worker gets its share of the limit while redis is down."""
+        buckets = LocalBuckets()
+        limit = Limit("10/minute")
+
+        results = [buckets.take(["key"], [limit], 0.5, 1000.0)[0] for _ in range(6)]
+
+        assert results == [True] * 5 + [False]
+
+    def test_local_denied_takes_nothing(self):
+        """Test a request denied by one bucket leaves the others untouched."""
+        buckets = LocalBuckets()
+        minute, hour = Limit.parse("2/minute;100/hour")
+
+        results = [
+            buckets.take(["m", "h"], [minute, hour], 1, 1000.0) for _ in range(5)
+        ]
+
+        assert [allowed for allowed, _ in results] == [True] * 2 + [False] * 3
+        assert results[-1][1] == 30
+        assert buckets._buckets["h"] == (98, 1000.0)
+
+
+@pytest.mark.api
+class TestRateLimit:
+    """Test cases for the rate limit decorator."""
+
+    def test_limit_with_redis(self, client, limited_app, redis_client):
+        """Test requests over the limit get 429 and a Retry-After header."""
+        assert client.get("/limited/ip").status_code == 200
+        assert client.get("/limited/ip").status_code == 200
+
+        response = client.get("/limited/ip")
+
+        assert response.status_code == 429
+        assert response.get_json()["status"] == "failed"
+        assert 1 <= int(response.headers["Retry-After"]) <= 30
+        assert redis_client.keys("ratelimit:*")
+
+    def test_clients_are_limited_separately(self, client, limited_app, redis_client):
+        """Test every ip has its own bucket."""
+        for _ in range(2):
+            client.get("/limited/ip")
+
+        response = client.get(
+            "/limited/ip", environ_overrides={"REMOTE_ADDR": "10.0.0.2"}
+        )
+
+        assert response.status_code == 200
+
+    def test_every_window_applies(self, client, limited_app, redis_client):
+        """Test the strictest of several windows wins."""
+        statuses = [client.get("/limited/windows").status_code for _ in range(4)]
+
+        assert statuses == [200, 200, 200, 429]
+
+    def test_denied_requests_keep_other_windows(
+        self, client, limited_app, redis_client
+    ):
+        """Test retries denied by the short window do not use up the long one."""
+        statuses = [
+            client.get("/limited/retries", buffered=True).status_code for _ in range(5)
+        ]
+
+        assert statuses == [200, 200, 429, 429, 429]
+        (hour,) = redis_client.keys("ratelimit:*:100/hour")
+        assert float(redis_client.hget(hour, "tokens")) == pytest.approx(98, abs=0.1)
+
+    def test_falls_back_to_local_buckets(self, client, limited_app):
+        """Test a failing redis is bypassed with local buckets."""
+        broken = redis.Redis(host="localhost", port=1, socket_timeout=0.01)
+        with patch("app.support.rate_limit.get_redis", return_value=broken):
+            statuses = [client.get("/limited/ip").status_code for _ in range(3)]
+
+        assert statuses == [200, 200, 429]
+        assert rate_limiter._redis_down_until > 0
+
+    def test_token_endpoint_is_limited(self, client, limited_app, redis_client):
+        """Test /api/token is limited per ip."""
+        statuses = [
+            client.post(
+                "/api/token", json={"email": "admin@test.com"}, buffered=True
+            ).status_code
+            for _ in range(11)
+        ]
+
+        assert statuses[:10] == [202] * 10
+        assert statuses[10] == 429
+
+    def test_upload_is_limited_per_user(
+        self, client, limited_app, redis_client, auth_headers
+    ):
+        """Test uploads are limited per authenticated user."""
+        with patch("app.controllers.api.v1.files_controller.FilesUploader") as up:
+            up.return_value.perform.return_value = ("ok", 200)
+            # buffered responses are closed, giving their load shedding slot back
+            statuses = [
+                client.post(
+                    "/api/files/upload-files", headers=auth_headers, buffered=True
+                ).status_code
+                for _ in range(31)
+            ]
+
+        assert statuses[-1] == 429
+        assert redis_client.keys("ratelimit:uploadAPI:user:*")
+
+    def test_disabled(self, app, client, limited_app):
+        """Test nothing is limited when rate limiting is off."""
+        app.config["RATE_LIMIT_ENABLED"] = False
+
+        statuses = [
+            client.get("/limited/ip", buffered=True).status_code for _ in range(5)
+        ]
+
+        assert statuses == [200] * 5
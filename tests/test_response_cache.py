@@ -0,0 +1,146 @@
+import threading
+import time
+from http import HTTPStatus
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+
+from app.support.response_cache import ResponseCache, response_cache
+
+
+@pytest.fixture
+def fake_redis(app):
+    """Back the redis helpers with an in-process fake redis."""
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    app.config["REDIS_URL"] = "redis://fake"
+    with patch("app.support.response_cache.get_redis", return_value=client):
+        yield client
+
+
+@pytest.mark.unit
+class TestResponseCache:
+    """Test cases for the redis read-through response cache."""
+
+    def test_disabled_without_redis(self, app):
+        """Test the loader is called directly when redis is not configured."""
+        cache = ResponseCache()
+        with app.test_request_context():
+            assert cache.fetch("users", {}, lambda: "loaded") == "loaded"
+            assert cache.bump("users") is None
+
+    def test_second_request_is_a_hit(self, client, auth_headers, fake_redis):
+        """Test user records are served from redis once cached."""
+        first = client.get("/api/users/1", headers=auth_headers)
+        with patch("app.controllers.api.v1.users_controller.User") as user_model:
+            second = client.get("/api/users/1", headers=auth_headers)
+
+        user_model.query.filter_by.assert_not_called()
+        assert first.status_code == second.status_code == HTTPStatus.OK
+        assert second.get_json() == first.get_json()
+        assert second.headers["ETag"] == first.headers["ETag"]
+
+    def test_hit_answers_conditional_requests(self, client, auth_headers, fake_redis):
+        """Test cached entries answer If-None-Match with 304."""
+        etag = client.get("/api/users", headers=auth_headers).headers["ETag"]
+
+        response = client.get(
+            "/api/users", headers=dict(auth_headers, **{"If-None-Match": etag})
+        )
+
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    def test_query_parameters_are_part_of_the_key(
+        self, client, auth_headers, fake_redis
+    ):
+        """Test list pages with different parameters are cached apart."""
+        small = client.get("/api/users?pageSize=1", headers=auth_headers)
+        large = client.get("/api/users?pageSize=10", headers=auth_headers)
+
+        assert len(small.get_json()["users"]) == 1
+        assert len(large.get_json()["users"]) == 2
+
+    def test_user_saver_bumps_version(
+        self, client, auth_headers, fake_redis, sample_user_data, mock_celery
+    ):
+        """Test writes make the cached pages unreachable."""
+        before = client.get("/api/users", headers=auth_headers).get_json()
+
+        client.post("/api/users", json=sample_user_data, headers=auth_headers)
+        after = client.get("/api/users", headers=auth_headers).get_json()
+
+        assert fake_redis.get("cache:users:version") == b"1"
+        assert after["pagination"]["total"] == before["pagination"]["total"] + 1
+
+    def test_any_user_or_role_write_bumps_version(
+        self, app, client, auth_headers, fake_redis
+    ):
+        """Test writes outside the user saver make the cached pages unreachable."""
+        from app.factory import db
+        from app.models.role import Role
+        from app.models.user import User
+
+        client.get("/api/users", headers=auth_headers)
+
+        db.session.get(User, 2).active = False
+        db.session.commit()
+        assert fake_redis.get("cache:users:version") == b"1"
+
+        Role.query.filter_by(name="agent").one().name = "operator"
+        db.session.commit()
+        assert fake_redis.get("cache:users:version") == b"2"
+
+        users = client.get("/api/users", headers=auth_headers).get_json()["users"]
+        assert [u["active"] for u in users if u["id"] == 2] == [False]
+
+    def test_stampede_single_loader(self, app, fake_redis):
+        """Test concurrent misses run the loader once and share its entry."""
+        cache = ResponseCache()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.2)
+            response = app.response_class(b'{"status":"success"}')
+            response.set_etag("abc", weak=True)
+            return response
+
+        results = []
+
+        def worker():
+            with app.test_request_context("/api/users"):
+                results.append(cache.fetch("users", {}, loader).get_data())
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == [b'{"status":"success"}'] * 5
+
+    def test_hit_ratio_exported(self, client, auth_headers, fake_redis):
+        """Test hit ratio stats and prometheus metrics."""
+        client.get("/api/users/2", headers=auth_headers)
+        client.get("/api/users/2", headers=auth_headers)
+
+        stats = response_cache.stats()["users"]
+        metrics = client.get("/metrics").get_data(as_text=True)
+
+        assert stats["hits"] >= 1
+        assert 0 < stats["hit_ratio"] <= 1
+        assert 'response_cache_requests_total{resource="users",result="hit"}' in (
+            metrics
+        )
+        assert 'response_cache_hit_ratio{resource="users"}' in metrics
+
+    def test_admin_cache_stats(self, client, auth_headers, fake_redis):
+        """Test the admin endpoint reports cache stats."""
+        client.get("/api/users/1", headers=auth_headers)
+
+        response = client.get("/api/admin/cache", headers=auth_headers)
+
+        assert response.status_code == HTTPStatus.OK
+        assert "users" in response.get_json()["cache"]
@@ -0,0 +1,142 @@
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+
+from app.models.revoked_token import RevokedToken
+from app.support.revocation import KEY, BloomFilter, revocation_list
+
+
+@pytest.fixture
+def redis_client():
+    """Route the revocation list to an in-memory redis."""
+    client = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+    with patch("app.support.revocation.get_redis", return_value=client):
+        yield client
+
+
+def issue_token(client):
+    response = client.post("/api/token", json={"email": "admin@test.com"})
+    return response.get_json()["token"]
+
+
+@pytest.mark.unit
+class TestBloomFilter:
+    """Test cases for the Bloom filter."""
+
+    def test_no_false_negatives(self):
+        """Test every added item is reported as present."""
+        bloom = BloomFilter(1000)
+        items = [uuid.uuid4().hex for _ in range(1000)]
+        for item in items:
+            bloom.add(item)
+
+        assert all(item in bloom for item in items)
+        assert bloom.count == 1000
+
+    def test_false_positive_rate(self):
+        """Test the false positive rate stays near the configured one."""
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for _ in range(1000):
+            bloom.add(uuid.uuid4().hex)
+
+        positives = sum(uuid.uuid4().hex in bloom for _ in range(10000))
+        assert positives < 300
+
+
+@pytest.mark.unit
+class TestRevocationList:
+    """Test cases for the revocation store."""
+
+    def test_revoke_is_stored_in_database_and_redis(self, app, redis_client):
+        """Test revocations land in both stores."""
+        expires_at = datetime.utcnow() + timedelta(days=1)
+        revocation_list.revoke("abc", expires_at)
+
+        assert RevokedToken.query.filter_by(jti="abc").count() == 1
+        assert redis_client.zscore(KEY, "abc") is not None
+        assert revocation_list.is_revoked("abc")
+
+    def test_filter_answers_without_round_trip(self, app, redis_client):
+        """Test a token that was not revoked is cleared by the filter alone."""
+        revocation_list.revoke("abc", datetime.utcnow() + timedelta(days=1))
+        revocation_list.rebuild()
+
+        with patch.object(
+            revocation_list, "confirm", side_effect=AssertionError("round trip")
+        ):
+            assert not revocation_list.is_revoked("not-revoked")
+
+    def test_refresh_picks_up_other_workers(self, app, redis_client):
+        """Test revocations made elsewhere are loaded on refresh."""
+        revocation_list.rebuild()
+        redis_client.zadd(KEY, {"elsewhere": datetime.utcnow().timestamp()})
+        assert "elsewhere" not in revocation_list._filter
+
+        revocation_list.refresh()
+
+        assert "elsewhere" in revocation_list._filter
+
+    def test_rebuild_reseeds_empty_redis(self, app, redis_client):
+        """Test a flushed redis is restored from the database."""
+        revocation_list.revoke("abc", datetime.utcnow() + timedelta(days=1))
+        redis_client.flushall()
+
+        bloom = revocation_list.rebuild()
+
+        assert "abc" in bloom
+        assert redis_client.zscore(KEY, "abc") is not None
+
+    def test_rebuild_prunes_expired_tokens(self, app):
+        """Test expired revocations are dropped from the database."""
+        revocation_list.revoke("old", datetime.utcnow() - timedelta(seconds=1))
+        revocation_list.revoke("new", datetime.utcnow() + timedelta(days=1))
+
+        bloom = revocation_list.rebuild()
+
+        assert "new" in bloom
+        assert RevokedToken.query.filter_by(jti="old").count() == 0
+
+
+@pytest.mark.auth
+class TestRevokeTokenAPI:
+    """Test cases for revoking tokens over the API."""
+
+    def test_revoked_token_is_rejected(self, client):
+        """Test a revoked token can no longer be used."""
+        token = issue_token(client)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        assert client.get("/api/users", headers=headers).status_code == 202
+        response = client.post("/api/token/revoke", headers=headers)
+        assert response.status_code == 200
+
+        response = client.get("/api/users", headers=headers)
+        assert response.status_code == 401
+        assert response.get_json()["message"] == "Token has been revoked"
+
+    def test_other_tokens_stay_valid(self, client):
+        """Test revoking one token leaves the others of the user alone."""
+        revoked, kept = issue_token(client), issue_token(client)
+
+        client.post("/api/token/revoke", headers={"Authorization": f"Bearer {revoked}"})
+
+        response = client.get("/api/users", headers={"Authorization": f"Bearer {kept}"})
+        assert response.status_code == 202
+
+    def test_revoke_twice(self, client):
+        """Test an already revoked token is rejected."""
+        headers = {"Authorization": f"Bearer {issue_token(client)}"}
+
+        client.post("/api/token/revoke", headers=headers)
+        response = client.post("/api/token/revoke", headers=headers)
+
+        assert response.status_code == 401
+
+    def test_missing_token(self, client):
+        """Test revoking without a token."""
+        response = client.post("/api/token/revoke")
+
+        assert response.status_code == 401
@@ -0,0 +1,170 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.support import auth_helper
+from app.support.single_flight import SingleFlight
+
+
+def run_concurrently(target, count=5):
+    results = []
+    errors = []
+
+    def worker():
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+@pytest.mark.unit
+class TestSingleFlight:
+    """Test cases for the single-flight request coalescing utility."""
+
+    def test_concurrent_callers_share_one_call(self):
+        """Test concurrent callers for one key wait on a single computation."""
+        flight = SingleFlight()
+        calls = []
+
+        def lookup():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"id": 1}
+
+        results, errors = run_concurrently(lambda: flight.do("user:1", lookup))
+
+        assert len(calls) == 1
+        assert errors == []
+        assert results == [{"id": 1}] * 5
+        assert flight.in_flight() == 0
+
+    def test_different_keys_run_separately(self):
+        """Test callers for different keys are not coalesced."""
+        flight = SingleFlight()
+
+        assert flight.do("a", lambda: 1) == 1
+        assert flight.do("b", lambda: 2) == 2
+
+    def test_errors_are_shared(self):
+        """Test the leader's exception is raised in every waiter."""
+        flight = SingleFlight()
+
+        def lookup():
+            time.sleep(0.2)
+            raise LookupError("db down")
+
+        results, errors = run_concurrently(lambda: flight.do("user:1", lookup))
+
+        assert results == []
+        assert len(errors) == 5
+        assert all(isinstance(e, LookupError) for e in errors)
+
+    def test_waiters_time_out_and_run_their_own_call(self):
+        """Test a stuck leader only blocks its waiters for the timeout."""
+        flight = SingleFlight()
+        release = threading.Event()
+        leader_started = threading.Event()
+
+        def stuck():
+            leader_started.set()
+            release.wait(5)
+            return "leader"
+
+        leader = threading.Thread(target=lambda: flight.do("key", stuck, 1))
+        leader.start()
+        leader_started.wait(1)
+
+        started = time.monotonic()
+        result = flight.do("key", lambda: "waiter", timeout=0.1)
+        elapsed = time.monotonic() - started
+
+        release.set()
+        leader.join()
+
+        assert result == "waiter"
+        assert elapsed < 1
+
+    def test_stale_flights_are_not_joined(self):
+        """Test callers start a new flight once the current one is too old."""
+        flight = SingleFlight()
+        release = threading.Event()
+        leader_started = threading.Event()
+
+        def stuck():
+            leader_started.set()
+            release.wait(5)
+
+        leader = threading.Thread(target=lambda: flight.do("key", stuck, 0.05))
+        leader.start()
+        leader_started.wait(1)
+        time.sleep(0.1)
+
+        started = time.monotonic()
+        assert flight.do("key", lambda: "fresh", timeout=0.05) == "fresh"
+        assert time.monotonic() - started < 0.05
+
+        release.set()
+        leader.join()
+
+
+@pytest.mark.unit
+class TestAuthHelperCoalescing:
+    """Test cases for coalesced lookups in the auth helper."""
+
+    def test_user_lookups_are_coalesced(self, app):
+        """Test concurrent token checks for one user run one query."""
+        with app.app_context():
+            from app.models.user import User
+
+            user = User.query.filter_by(email="admin@test.com").first()
+            token = auth_helper.encode_jwt_token(user)
+
+        calls = []
+
+        def slow_lookup(email):
+            calls.append(email)
+            time.sleep(0.2)
+            return {"id": 1, "email": email, "role": "admin"}
+
+        def get_user():
+            with app.app_context():
+                return auth_helper.get_user_info(token)
+
+        with patch.object(auth_helper, "find_user_info", side_effect=slow_lookup):
+            results, errors = run_concurrently(get_user)
+
+        assert calls == ["admin@test.com"]
+        assert errors == []
+        assert results == [{"id": 1, "email": "admin@test.com", "role": "admin"}] * 5
+        # callers never share the same dict
+        assert len({id(result) for result in results}) == 5
+
+    def test_permission_lookups_are_coalesced(self, app):
+        """Test concurrent permission checks for one role run one query."""
+        calls = []
+
+        def slow_permission(feature_name, role_name):
+            calls.append((feature_name, role_name))
+            time.sleep(0.2)
+            return True
+
+        def validate():
+            with app.app_context():
+                return auth_helper.validate_user_permission("user_resource", "admin")
+
+        with patch.object(
+            auth_helper, "find_user_permission", side_effect=slow_permission
+        ):
+            results, errors = run_concurrently(validate)
+
+        assert calls == [("user_resource", "admin")]
+        assert results == [True] * 5
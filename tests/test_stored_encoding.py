@@ -0,0 +1,99 @@
+import gzip
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+
+import pytest
+from botocore.response import StreamingBody
+from flask import request
+
+from app.models.file import File
+from app.support import s3_helper
+from app.support.files_bundler import FilesBundler
+from app.support.stored_encoding import gunzip_chunks, gzip_chunks, is_compressible
+
+
+@pytest.fixture
+def s3_client():
+    """S3 client recording the bytes and arguments of streamed uploads."""
+    client = MagicMock()
+
+    def stream_upload(filepath, filename, chunks, *args):
+        client.body = b"".join(chunks)
+        return {"filename": filename, "key": filepath}
+
+    client.stream_upload.side_effect = stream_upload
+    with patch("app.support.s3_helper.S3_Client", return_value=client):
+        yield client
+
+
+@pytest.mark.unit
+class TestStoredEncoding:
+    """Test cases for compressing uploads at rest."""
+
+    @pytest.mark.parametrize(
+        "content_type, expected",
+        [
+            ("text/csv", True),
+            ("application/json; charset=utf-8", True),
+            ("application/vnd.api+json", True),
+            ("image/png", False),
+            ("application/vnd.openxmlformats-officedocument.spreadsheetml", False),
+            (None, False),
+        ],
+    )
+    def test_is_compressible(self, content_type, expected):
+        """Test only text like content types are compressed."""
+        assert is_compressible(content_type) is expected
+
+    def test_round_trip(self):
+        """Test streams decompress to the original bytes in bounded chunks."""
+        original = [b"id,name\n" * 10000, b"0" * 1000000]
+
+        compressed = b"".join(gzip_chunks(iter(original)))
+        chunks = list(gunzip_chunks([compressed[:100], compressed[100:]], 4096))
+
+        assert gzip.decompress(compressed) == b"".join(original)
+        assert b"".join(chunks) == b"".join(original)
+        assert max(len(chunk) for chunk in chunks) <= 4096
+
+    def test_text_is_stored_gzipped(self, app, s3_client):
+        """Test compressible uploads are gzipped on the way to S3."""
+        s3_helper.stream_object_to_s3(
+            "user_file", "a.csv", iter([b"id,name\n"] * 1000), "Admin", "text/csv"
+        )
+
+        args = s3_client.stream_upload.call_args[0]
+        assert args[3:5] == ("text/csv", "gzip")
+        assert args[5]["compression"] == "gzip"
+        assert gzip.decompress(s3_client.body) == b"id,name\n" * 1000
+        assert len(s3_client.body) < 100
+
+    def test_binary_is_stored_as_is(self, app, s3_client):
+        """Test other uploads are stored unchanged."""
+        s3_helper.stream_object_to_s3(
+            "user_file", "a.png", iter([b"\x89PNG"]), "Admin", "image/png"
+        )
+
+        assert s3_client.stream_upload.call_args[0][4] is None
+        assert s3_client.body == b"\x89PNG"
+
+    def test_bundles_hold_original_bytes(self, app):
+        """Test gzipped objects are decompressed into download bundles."""
+        stored = gzip.compress(b"id,name\n" * 1000)
+        s3_client = MagicMock()
+        s3_client.call.side_effect = lambda operation, fn: fn()
+        s3_client.s3_client.get_object.return_value = {
+            "ContentLength": len(stored),
+            "ContentEncoding": "gzip",
+            "Body": StreamingBody(BytesIO(stored), len(stored)),
+        }
+        file = File(key="k", name="a.csv", size=8000, content_encoding="gzip")
+
+        with app.test_request_context("/api/files/bundle?names=a.csv"):
+            bundler = FilesBundler(request, {"id": 1, "name": "Admin"})
+        bundler.s3_client = s3_client
+        entries = bundler.entries([file], bundler.get_object(file))
+        name, size, chunks = next(entries)
+
+        assert size == 8000
+        assert b"".join(chunks) == b"id,name\n" * 1000
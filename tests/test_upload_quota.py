@@ -0,0 +1,164 @@
+from io import BytesIO
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+
+from app import celery
+from app.models.file import File
+from app.models.user import User
+from app.support.upload_quota import QuotaExceeded, upload_quota
+from app.workers.quota_worker import reconcile_upload_quotas
+
+
+@pytest.fixture
+def redis_client(app):
+    """Upload quota of 1000 bytes and 3 files counted in an in-memory redis."""
+    app.config.update(
+        UPLOAD_QUOTA_BYTES=1000, UPLOAD_QUOTA_FILES=3, UPLOAD_QUOTA_FLUSH_BYTES=10
+    )
+    client = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+    with patch("app.support.upload_quota.get_redis", return_value=client):
+        yield client
+
+
+@pytest.fixture
+def admin(app):
+    with app.app_context():
+        return User.query.filter_by(email="admin@test.com").first().id
+
+
+def stream(file_type, file_name, chunks, user_name, content_type):
+    b"".join(chunks)
+    return {"filename": file_name, "key": f"d/{file_name}"}
+
+
+def upload(client, auth_headers, data):
+    return client.post(
+        "/api/files/upload-files",
+        data=data,
+        headers={"Authorization": auth_headers["Authorization"]},
+        content_type="multipart/form-data",
+        buffered=True,
+    )
+
+
+@pytest.mark.unit
+class TestUploadQuota:
+    """Test cases for counting uploads against the quota."""
+
+    def test_add_and_check(self, app, redis_client):
+        """Test counters add up and uploads over either limit are refused."""
+        with app.app_context():
+            assert upload_quota.add(1, 600, 1) == (600, 1)
+            upload_quota.check(1, 400)
+            with pytest.raises(QuotaExceeded) as error:
+                upload_quota.check(1, 401)
+            assert 0 < error.value.retry_after <= 86400
+
+            upload_quota.add(1, 0, 2)
+            with pytest.raises(QuotaExceeded):
+                upload_quota.check(1, 0)
+            upload_quota.check(2, 1000)
+
+    def test_meter_cuts_off_stream(self, app, redis_client):
+        """Test metered chunks stop once the quota is used up."""
+        received = []
+        with app.app_context():
+            with pytest.raises(QuotaExceeded):
+                for chunk in upload_quota.meter(1, iter([b"x" * 300] * 5)):
+                    received.append(chunk)
+
+            assert len(received) == 3
+            assert redis_client.hgetall(upload_quota.key(1)) == {
+                b"bytes": b"1200",
+                b"files": b"1",
+            }
+
+    def test_without_redis(self, app):
+        """Test uploads are not limited without redis."""
+        with app.app_context():
+            upload_quota.check(1, 10**15)
+            assert upload_quota.add(1, 10**15, 1) is None
+
+    def test_reconcile(self, app, redis_client, admin):
+        """Test the counters are reset to the recorded files."""
+        from app.factory import db
+
+        with app.app_context():
+            upload_quota.add(admin, 90, 2)
+            upload_quota.add(12345, 50, 1)
+            db.session.add(
+                File(
+                    key="d/a.txt",
+                    name="a.txt",
+                    file_type="user_file",
+                    size=30,
+                    user_id=admin,
+                )
+            )
+            db.session.commit()
+
+            assert reconcile_upload_quotas() == 1
+
+            assert redis_client.hgetall(upload_quota.key(admin)) == {
+                b"bytes": b"30",
+                b"files": b"1",
+            }
+            assert not redis_client.exists(upload_quota.key(12345))
+
+    def test_reconcile_is_scheduled(self):
+        """Test celery beat runs the reconciliation."""
+        schedule = celery.conf.beat_schedule["reconcile-upload-quotas"]
+
+        assert schedule["task"] == reconcile_upload_quotas.name
+
+
+@pytest.mark.api
+class TestUploadQuotaEndpoint:
+    """Test cases for quota enforcement on the upload endpoint."""
+
+    def test_declared_size_rejected(self, client, auth_headers, redis_client):
+        """Test bodies larger than the quota left are refused before reading."""
+        with patch("app.support.files_uploader.stream_object_to_s3") as stream:
+            response = upload(
+                client, auth_headers, {"docs": (BytesIO(b"x" * 2000), "a.txt")}
+            )
+
+        assert response.status_code == 413
+        assert int(response.headers["Retry-After"]) >= 1
+        stream.assert_not_called()
+
+    def test_stream_cut_off(self, app, client, auth_headers, redis_client, admin):
+        """Test streams are cut off and completed files are kept."""
+        with app.app_context():
+            upload_quota.add(admin, 0, 2)
+        with patch(
+            "app.support.files_uploader.stream_object_to_s3", side_effect=stream
+        ):
+            response = upload(
+                client,
+                auth_headers,
+                {
+                    "a": (BytesIO(b"x" * 40), "a.txt"),
+                    "b": (BytesIO(b"x" * 40), "b.txt"),
+                },
+            )
+
+        assert response.status_code == 413
+        with app.app_context():
+            assert [f.name for f in File.query.all()] == ["a.txt"]
+
+    def test_within_quota(self, app, client, auth_headers, redis_client, admin):
+        """Test uploads within the quota go through and are counted."""
+        with patch(
+            "app.support.files_uploader.stream_object_to_s3", side_effect=stream
+        ):
+            response = upload(client, auth_headers, {"a": (BytesIO(b"abc"), "a.txt")})
+
+        assert response.status_code == 201
+        with app.app_context():
+            assert redis_client.hgetall(upload_quota.key(admin)) == {
+                b"bytes": b"3",
+                b"files": b"1",
+            }
@@ -9,11 +9,11 @@ import pytest
 class TestUsersController:
     """Test cases for users controller endpoints."""
 
-    def test_create_user_success(
-        self, client, auth_headers, sample_user_data, mock_celery
-    ):
+    def test_create_user_success(self, client, auth_headers, sample_user_data):
         """Test successful user creation."""
-        with patch("app.services.users.saver.UserSaver.save") as mock_save:
+        with patch(
+            "app.services.users.saver.UserSaver.save", autospec=True
+        ) as mock_save:
             # Mock user object
             mock_user = type(
                 "MockUser",
@@ -27,7 +27,12 @@ class TestUsersController:
                     },
                 },
             )()
-            mock_save.return_value = mock_user
+
+            def save(saver):
+                saver.task_id = "test-task-id"
+                return mock_user
+
+            mock_save.side_effect = save
 
             response = client.post(
                 "/api/users", json=sample_user_data, headers=auth_headers
@@ -201,3 +206,101 @@ class TestUsersController:
 
         response = client.delete("/api/users/1", headers=auth_headers)
         assert response.status_code == HTTPStatus.METHOD_NOT_ALLOWED
+
+    def test_get_user_returns_weak_etag(self, client, auth_headers):
+        """Test user responses carry a weak ETag."""
+        response = client.get("/api/users/1", headers=auth_headers)
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["ETag"].startswith('W/"')
+
+    def test_get_user_not_modified(self, client, auth_headers):
+        """Test a matching If-None-Match is answered with 304."""
+        etag = client.get("/api/users/1", headers=auth_headers).headers["ETag"]
+
+        response = client.get(
+            "/api/users/1", headers=dict(auth_headers, **{"If-None-Match": etag})
+        )
+
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert response.headers["ETag"] == etag
+        assert response.get_data() == b""
+
+    def test_get_user_etag_changes_on_update(self, app, client, auth_headers):
+        """Test updating a user refreshes updated_at and the ETag."""
+        from app.factory import db
+        from app.models.user import User
+
+        first = client.get("/api/users/2", headers=auth_headers).headers["ETag"]
+
+        user = db.session.get(User, 2)
+        created_updated_at = user.updated_at
+        user.name = "Renamed User"
+        db.session.commit()
+
+        response = client.get(
+            "/api/users/2", headers=dict(auth_headers, **{"If-None-Match": first})
+        )
+
+        assert user.updated_at > created_updated_at
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["ETag"] != first
+        assert response.get_json()["user"]["name"] == "Renamed User"
+
+    def test_get_user_etag_changes_on_role_rename(self, client, auth_headers):
+        """Test the ETag follows the role name the user is served with."""
+        from app.factory import db
+        from app.models.role import Role
+
+        first = client.get("/api/users/2", headers=auth_headers).headers["ETag"]
+
+        role = Role.query.filter_by(name="manager").one()
+        role.name = "supervisor"
+        db.session.commit()
+
+        response = client.get(
+            "/api/users/2", headers=dict(auth_headers, **{"If-None-Match": first})
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.get_json()["user"]["role"] == "supervisor"
+
+    def test_get_all_users_etag_changes_within_a_second(self, client, auth_headers):
+        """Test updates sharing a whole second updated_at still change the ETag."""
+        from datetime import datetime
+
+        from app.factory import db
+        from app.models.user import User
+
+        second = datetime(2026, 1, 1, 12, 0, 0)
+        etags = []
+        for name in ("First", "Second"):
+            user = db.session.get(User, 2)
+            user.name = name
+            db.session.commit()
+            # MySQL DATETIME keeps whole seconds
+            User.query.update({User.updated_at: second}, synchronize_session=False)
+            db.session.commit()
+            etags.append(client.get("/api/users", headers=auth_headers).headers["ETag"])
+
+        assert etags[0] != etags[1]
+
+    def test_get_all_users_not_modified(
+        self, client, auth_headers, sample_user_data, mock_celery
+    ):
+        """Test list pages answer 304 until the collection changes."""
+        etag = client.get("/api/users", headers=auth_headers).headers["ETag"]
+        conditional = dict(auth_headers, **{"If-None-Match": etag})
+
+        response = client.get("/api/users", headers=conditional)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+        # a different page has its own ETag
+        response = client.get("/api/users?pageSize=5", headers=conditional)
+        assert response.status_code == HTTPStatus.ACCEPTED
+
+        client.post("/api/users", json=sample_user_data, headers=auth_headers)
+
+        response = client.get("/api/users", headers=conditional)
+        assert response.status_code == HTTPStatus.ACCEPTED
+        assert response.headers["ETag"] != etag
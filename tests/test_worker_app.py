@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.factory import create_worker_app, db, mail
+from app.models.user import User
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.unit
+class TestWorkerApp:
+    """Test cases for the app celery workers boot."""
+
+    def test_orm_and_mail(self, app):
+        """Test tasks get the database and mail without any web setup."""
+        worker_app = create_worker_app(
+            config_override={"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"}
+        )
+
+        with worker_app.app_context():
+            db.create_all()
+            assert User.query.count() == 0
+            assert mail.connect().mail is worker_app.extensions["mail"]
+
+        assert list(worker_app.blueprints) == []
+        assert [rule.endpoint for rule in worker_app.url_map.iter_rules()] == ["static"]
+
+    def test_web_modules_not_imported(self):
+        """Test booting the worker leaves web only dependencies unimported."""
+        web_only = ["flask_migrate", "flask_swagger_ui", "app.api_routes", "boto3"]
+        code = (
+            "import sys, celery_worker; "
+            f"print([m for m in {web_only!r} if m in sys.modules])"
+        )
+
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+
+        assert output.strip() == "[]"